@@ -0,0 +1,281 @@
+"""ASGI serving mode of the web app, run it with any ASGI server, like: uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+Pages and voicings found in cache are answered directly from the event loop. Uncached page rendering and voicing generation
+run in separate thread pools, so the event loop never blocks and slow generations don't hold back cheap pages.
+Pages of all keys are rendered at startup.
+
+Generation is CPU-bound and the pools are threads, so generations still share the GIL (numpy kernels of the vectorized engine
+release it): the pools keep the server responsive but don't run generations in parallel. Threads are used rather than
+processes because generated voicings fill the in-memory caches of this process and are streamed from generators; run
+several server workers (like uvicorn --workers 4) to use more cores.
+"""
+
+import asyncio
+import json
+import logging
+import mimetypes
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Generator, Iterator
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_accept_header, parse_etags
+
+import flask_app
+
+render_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="render")
+generation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="generation")
+warm_up_tasks: set[asyncio.Future] = set()  # kept until done, so they are not garbage collected and their errors are logged
+logger = logging.getLogger(__name__)
+static_directory = Path("static").resolve()
+static_files: dict[str, bytes] = {}
+nb_lines_per_chunk = 16
+
+
+async def send_response(send, status: int, headers: list[tuple[str, str]], body: bytes = b"", is_head: bool = False):
+    await send({"type": "http.response.start", "status": status, "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]})
+    await send({"type": "http.response.body", "body": b"" if is_head else body})
+
+
+async def send_error(send, status: int, message: str):
+    await send_response(send, status, [("content-type", "text/plain; charset=utf-8")], message.encode("utf-8"))
+
+
+def _render_page(inputs: tuple[str, str, int]) -> tuple[bytes, bytes, str]:
+    # templates use url_for, which needs a request context
+    with flask_app.app.test_request_context("/"):
+        return flask_app.render_page(*inputs)
+
+
+async def get_page(inputs: tuple[str, str, int]) -> tuple[bytes, bytes, str]:
+    """Get rendered page (html, gzipped html, etag) from cache, or render it in a worker thread"""
+    loop = asyncio.get_running_loop()
+    if inputs[1]:
+        # voicings may be generated to count them, in their own pool: rendering threads stay available for other pages
+        inputs = await loop.run_in_executor(generation_executor, flask_app.normalize_page_inputs, *inputs)
+    else:
+        inputs = flask_app.normalize_page_inputs(*inputs)
+
+    cache_key = flask_app.get_page_cache_key(*inputs)
+    page = flask_app.render_cache.get(cache_key)
+    if page is not None:
+        return page
+
+    page = await loop.run_in_executor(render_executor, _render_page, inputs)
+    flask_app.render_cache.put(cache_key, page)
+
+    return page
+
+
+async def send_page(send, args: MultiDict, headers: dict[str, str], is_head: bool):
+    html, gzipped_html, etag = await get_page(flask_app.parse_page_inputs(args))
+
+    # same headers as flask route: pre-compressed page when possible, each encoding has its own strong etag
+    response_headers = [("content-type", "text/html; charset=utf-8"), ("vary", "Accept-Encoding"), ("cache-control", "no-cache")]
+    if parse_accept_header(headers.get("accept-encoding"))["gzip"]:
+        etag, body = etag + "-gzip", gzipped_html
+        response_headers.append(("content-encoding", "gzip"))
+    else:
+        body = html
+    response_headers.append(("etag", f'"{etag}"'))
+
+    if parse_etags(headers.get("if-none-match")).contains(etag):
+        await send_response(send, 304, [(name, value) for name, value in response_headers if name in ("etag", "vary", "cache-control")])
+        return
+
+    response_headers.append(("content-length", str(len(body))))
+    await send_response(send, 200, response_headers, body, is_head)
+
+
+def _next_chunk(chunks: Iterator) -> list:
+    chunk = []
+    for item in chunks:
+        chunk.append(item)
+        if len(chunk) >= nb_lines_per_chunk:
+            break
+
+    return chunk
+
+
+async def send_voicings(send, args: MultiDict, headers: dict[str, str], is_head: bool):
+    try:
+        query = flask_app.parse_voicings_query(args)
+    except LookupError as error:
+        await send_error(send, 404, str(error))
+        return
+    except ValueError as error:
+        await send_error(send, 400, str(error))
+        return
+
+    response_headers = [("content-type", "application/x-ndjson"), ("vary", "Accept-Encoding")]
+    chunks: Generator = flask_app.iter_voicings_as_json_lines(*query)
+    if parse_accept_header(headers.get("accept-encoding"))["gzip"]:
+        chunks = flask_app.compress_stream(chunks)
+        response_headers.append(("content-encoding", "gzip"))
+
+    await send({"type": "http.response.start", "status": 200, "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response_headers]})
+    if not is_head:
+        # voicings are pulled from generation pool a few lines at a time, and sent as soon as they are ready
+        loop = asyncio.get_running_loop()
+        try:
+            while chunk := await loop.run_in_executor(generation_executor, _next_chunk, chunks):
+                body = b"".join(line if isinstance(line, bytes) else line.encode("utf-8") for line in chunk)
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            # a stream stopped early (like a disconnected client) finishes caching its voicings in generation pool too
+            await loop.run_in_executor(generation_executor, chunks.close)
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def send_search(send, args: MultiDict, is_head: bool):
+    try:
+        copedent_name, criteria = flask_app.parse_search_query(args)
+        # index is built by first search, in generation pool
+        index = await asyncio.get_running_loop().run_in_executor(generation_executor, flask_app.get_voicing_query_index, copedent_name)
+        matches = index.query(**criteria)
+    except LookupError as error:
+        await send_error(send, 404, str(error))
+        return
+    except ValueError as error:
+        await send_error(send, 400, str(error))
+        return
+
+    copedent = flask_app.copedents[copedent_name]
+    body = json.dumps([{"key": key, "chord": chord_type, **voicing.to_json(copedent.tuning, key, copedent.pedals)} for key, chord_type, voicing in matches]).encode("utf-8")
+    await send_response(send, 200, [("content-type", "application/json"), ("content-length", str(len(body)))], body, is_head)
+
+
+async def send_identified_chords(send, args: MultiDict, is_head: bool):
+    try:
+        chords = flask_app.identify_chords(args)
+    except LookupError as error:
+        await send_error(send, 404, str(error))
+        return
+    except ValueError as error:
+        await send_error(send, 400, str(error))
+        return
+
+    body = json.dumps(chords).encode("utf-8")
+    await send_response(send, 200, [("content-type", "application/json"), ("content-length", str(len(body)))], body, is_head)
+
+
+async def send_voice_leading(send, args: MultiDict, is_head: bool):
+    try:
+        # voicings of new chords are generated by search, in generation pool
+        voice_leading = await asyncio.get_running_loop().run_in_executor(generation_executor, flask_app.find_voice_leading, args)
+    except LookupError as error:
+        await send_error(send, 404, str(error))
+        return
+    except ValueError as error:
+        await send_error(send, 400, str(error))
+        return
+
+    body = json.dumps(voice_leading).encode("utf-8")
+    await send_response(send, 200, [("content-type", "application/json"), ("content-length", str(len(body)))], body, is_head)
+
+
+async def send_static_file(send, path: str, is_head: bool):
+    filepath = (static_directory / path).resolve()
+    if static_directory not in filepath.parents or not filepath.is_file():
+        await send_error(send, 404, "Not found")
+        return
+
+    if path not in static_files:
+        static_files[path] = filepath.read_bytes()
+    content_type = mimetypes.guess_type(filepath.name)[0] or "application/octet-stream"
+    await send_response(send, 200, [("content-type", content_type), ("content-length", str(len(static_files[path])))], static_files[path], is_head)
+
+
+def warm_up_voicings():
+    for key in flask_app.keys:
+        for chord_type in flask_app.chord_types:
+            flask_app.get_chord_voicings(key, chord_type)
+    flask_app.get_voicing_query_index("E9")
+
+
+async def warm_up():
+    """Render pages of all keys, then generate voicings of all chords in background"""
+    await asyncio.gather(*[get_page((key, "", 0)) for key in flask_app.keys])
+    task = asyncio.get_running_loop().run_in_executor(generation_executor, warm_up_voicings)
+    warm_up_tasks.add(task)
+    task.add_done_callback(on_warm_up_done)
+
+
+def on_warm_up_done(task: asyncio.Future):
+    warm_up_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Voicings warm-up failed", exc_info=task.exception())
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await warm_up()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            render_executor.shutdown(wait=False)
+            generation_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+# routes timed by their path, other paths are grouped
+routes: tuple[str, ...] = ("/", "/api/voicings", "/api/search", "/api/identify", "/api/voice-leading", "/metrics")
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await handle_lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    path = scope["path"]
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    args = MultiDict(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True))
+
+    if not flask_app.metrics.enabled:
+        await handle_request(send, method, path, headers, args)
+        return
+
+    # streamed responses are timed until their last byte
+    status = "500"
+
+    async def send_and_keep_status(message: dict):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = str(message["status"])
+        await send(message)
+
+    start = time.perf_counter()
+    try:
+        await handle_request(send_and_keep_status, method, path, headers, args)
+    finally:
+        route = path if path in routes else "/static/<path>" if path.startswith("/static/") else "unknown"
+        flask_app.metrics.observe("http_request_seconds", time.perf_counter() - start, route=route, method=method, status=status)
+
+
+async def handle_request(send, method: str, path: str, headers: dict[str, str], args: MultiDict):
+    if method not in ("GET", "HEAD"):
+        await send_error(send, 405, "Method not allowed")
+    elif path == "/":
+        await send_page(send, args, headers, method == "HEAD")
+    elif path == "/api/voicings":
+        await send_voicings(send, args, headers, method == "HEAD")
+    elif path == "/api/search":
+        await send_search(send, args, method == "HEAD")
+    elif path == "/api/identify":
+        await send_identified_chords(send, args, method == "HEAD")
+    elif path == "/api/voice-leading":
+        await send_voice_leading(send, args, method == "HEAD")
+    elif path == "/metrics":
+        body = flask_app.metrics.to_prometheus().encode("utf-8")
+        await send_response(send, 200, [("content-type", "text/plain; version=0.0.4"), ("content-length", str(len(body)))], body, method == "HEAD")
+    elif path.startswith("/static/"):
+        await send_static_file(send, path[len("/static/") :], method == "HEAD")
+    else:
+        await send_error(send, 404, "Not found")
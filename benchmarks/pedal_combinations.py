@@ -0,0 +1,59 @@
+"""Benchmark of pedal combination enumeration for copedents with 9, 12 and 16 pedals and levers
+
+Run from repository root: python -m benchmarks.pedal_combinations
+"""
+
+import itertools
+import time
+
+from fretboard.pedal import Pedal
+
+
+def get_changers(nb_changers: int) -> tuple[list[str], list[tuple[str, str]]]:
+    """Synthetic copedent: changers are paired (like knee levers moving the same string in opposite directions),
+    and each pair also conflicts with the next pair"""
+    changers = [f"P{i}" for i in range(nb_changers)]
+    conflicts = [(changers[i], changers[i + 1]) for i in range(0, nb_changers - 1, 2)]
+    conflicts += [(changers[i], changers[i + 2]) for i in range(0, nb_changers - 2, 2)]
+
+    return changers, conflicts
+
+
+def enumerate_naively(changers: list[str], conflicts: list[tuple[str, str]], max_nb_pedals: int) -> list[list[str]]:
+    """Build all combinations then delete conflicting ones, like the former implementation"""
+    combinations = [[]]
+    for i in range(1, max_nb_pedals + 1):
+        combinations += [list(combination) for combination in itertools.combinations(changers, i)]
+
+    return [combination for combination in combinations if not any(a in combination and b in combination for a, b in conflicts)]
+
+
+def run(nb_changers: int, max_nb_pedals: int, repeat: int = 5) -> tuple[int, float, float, float]:
+    changers, conflicts = get_changers(nb_changers)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expected = enumerate_naively(changers, conflicts, max_nb_pedals)
+    naive_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Pedal.clear_combination_cache()
+        combinations = Pedal.get_all_pedal_combinations(changers, conflicts, max_nb_pedals)
+    graph_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Pedal.get_all_pedal_combinations(changers, conflicts, max_nb_pedals)
+    cached_time = (time.perf_counter() - start) / repeat
+
+    assert combinations == expected
+    return len(combinations), naive_time, graph_time, cached_time
+
+
+if __name__ == "__main__":
+    print(f"{'changers':>8} {'max':>4} {'combinations':>12} {'naive (ms)':>11} {'graph (ms)':>11} {'cached (ms)':>12}")
+    for nb_changers in [9, 12, 16]:
+        for max_nb_pedals in [3, 4, 5]:
+            nb_combinations, naive_time, graph_time, cached_time = run(nb_changers, max_nb_pedals)
+            print(f"{nb_changers:>8} {max_nb_pedals:>4} {nb_combinations:>12} {naive_time * 1000:>11.2f} {graph_time * 1000:>11.2f} {cached_time * 1000:>12.3f}")
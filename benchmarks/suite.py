@@ -0,0 +1,279 @@
+"""Benchmark suite of generator, serializer, server and renderer, with baselines to catch regressions
+
+Run from repository root:
+    python -m benchmarks.suite                                      run all benchmarks
+    python -m benchmarks.suite --filter generate_e9_chords flask    run benchmarks whose name contains one of the filters
+    python -m benchmarks.suite --save benchmarks/baseline.json      store results as baseline
+    python -m benchmarks.suite --compare benchmarks/baseline.json   flag benchmarks slower than baseline, exit code is 1 on regression
+
+Timings depend on the machine, so no baseline is committed (benchmarks/baseline.json is ignored by git): save a baseline on the
+machine that runs the comparison, from the commit to compare with, like:
+    git stash && python -m benchmarks.suite --save benchmarks/baseline.json && git stash pop
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from fretboard.chords import Chord
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.chord_importer import import_e9_chords_from_json
+from fretboard.chord_serializer import ChordSerializer
+from fretboard.extended_search import ExtendedVoicingSearch
+from fretboard.fretboard import Fretboard
+
+# median and min time of a call in seconds, number of calls
+BenchmarkResult = dict[str, float]
+
+# benchmark name -> setup, setup returns the function to time
+_BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+class BenchmarkUnavailable(Exception):
+    """Raised by setup of a benchmark whose optional dependency is missing"""
+
+
+def register(name: str, setup: Callable[[], Callable[[], object]]):
+    _BENCHMARKS[name] = setup
+
+
+def benchmark(name: str):
+    """Register decorated setup function under given name"""
+
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        register(name, setup)
+        return setup
+
+    return decorator
+
+
+def _register_generate_voicings(vectorized: bool, chord_type: str):
+    def setup():
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized)
+        chord_generator.generate_voicings(CHORD_FORMULAS[chord_type], "C")  # numpy engine tensors are built once per fretboard
+        return lambda: chord_generator.generate_voicings(CHORD_FORMULAS[chord_type], "C")
+
+    register(f"generate_voicings/{'vectorized' if vectorized else 'loops'}/{chord_type}", setup)
+
+
+for _vectorized in (True, False):
+    for _chord_type in CHORD_FORMULAS:
+        _register_generate_voicings(_vectorized, _chord_type)
+
+
+def _register_extended_search(chord_type: str):
+    def setup():
+        search = ExtendedVoicingSearch(Fretboard.init_as_pedal_steel_e9())
+        return lambda: search.search(CHORD_FORMULAS[chord_type], "C")
+
+    register(f"extended_search/{chord_type}", setup)
+
+
+for _chord_type in ("M", "M7", "M6add9", "M9", "11", "13"):
+    _register_extended_search(_chord_type)
+
+
+@benchmark("generate_e9_chords/vectorized")
+def _generate_e9_chords_vectorized():
+    return lambda: ChordGenerator.generate_e9_chords("C", vectorized=True)
+
+
+@benchmark("generate_e9_chords/loops")
+def _generate_e9_chords_with_loops():
+    return lambda: ChordGenerator.generate_e9_chords("C", vectorized=False)
+
+
+@benchmark("list_to_json")
+def _list_to_json():
+    fretboard = Fretboard.init_as_pedal_steel_e9()
+    chords = ChordGenerator.generate_e9_chords("C", vectorized=True)
+    return lambda: Chord.list_to_json(chords, fretboard.tuning, fretboard.pedals)
+
+
+@benchmark("chord_serializer")
+def _chord_serializer():
+    fretboard = Fretboard.init_as_pedal_steel_e9()
+    chords = ChordGenerator.generate_e9_chords("C", vectorized=True)
+    serializer = ChordSerializer(fretboard.tuning, fretboard.pedals)
+    return lambda: "".join(serializer.iter_json_chunks(chords.values()))
+
+
+@benchmark("import_e9_chords_from_json")
+def _import_e9_chords_from_json():
+    return lambda: import_e9_chords_from_json(Path("data/E9_Chords.json"))
+
+
+@benchmark("flask/index")
+def _flask_index():
+    import flask_app
+
+    client = flask_app.app.test_client()
+
+    def get_page():
+        # page is rendered again, voicings stay in result cache
+        flask_app.render_cache.clear()
+        return client.get("/?key=G&chord=M7&voicing=1")
+
+    return get_page
+
+
+@benchmark("flask/index_cached")
+def _flask_index_cached():
+    import flask_app
+
+    client = flask_app.app.test_client()
+    return lambda: client.get("/?key=G&chord=M7&voicing=1", headers={"Accept-Encoding": "gzip"})
+
+
+def _create_fretboard_widget():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6.QtGui import QImage
+        from PySide6.QtWidgets import QApplication
+    except ImportError as error:
+        raise BenchmarkUnavailable("PySide6 is not installed") from error
+    import qt_app
+
+    application = QApplication.instance() or QApplication([])
+    widget = qt_app.FretboardWidget(None, qt_app.num_strings)
+    widget.resize(1600, 600)
+    widget.set_fretboard_data(qt_app.generate_chord("C", "M7"))
+    image = QImage(widget.size(), QImage.Format.Format_ARGB32_Premultiplied)
+
+    return application, widget, image
+
+
+@benchmark("qt/paint")
+def _qt_paint():
+    application, widget, image = _create_fretboard_widget()
+
+    def paint():
+        widget.render(image)
+        return application  # application must live as long as the widget
+
+    return paint
+
+
+@benchmark("qt/paint_after_resize")
+def _qt_paint_after_resize():
+    application, widget, image = _create_fretboard_widget()
+
+    def paint():
+        # background layer and note sprites are rendered again, as after a resize
+        widget.invalidate_layers()
+        widget.render(image)
+        return application
+
+    return paint
+
+
+def measure(function: Callable[[], object], min_time: float = 0.2, min_runs: int = 3, max_runs: int = 1000) -> BenchmarkResult:
+    """Time calls of a function until min_time is spent, after a warm-up call"""
+    function()
+
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < min_runs or (len(timings) < max_runs and time.perf_counter() - start < min_time):
+        call_start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - call_start)
+
+    return {"median": statistics.median(timings), "min": min(timings), "runs": len(timings)}
+
+
+def run_suite(filters: Optional[list[str]] = None, min_time: float = 0.2, show_progress: bool = True) -> dict[str, BenchmarkResult]:
+    """Run benchmarks whose name contains one of the filters (all benchmarks by default), unavailable benchmarks are skipped"""
+    results: dict[str, BenchmarkResult] = {}
+    for name, setup in _BENCHMARKS.items():
+        if filters and not any(pattern in name for pattern in filters):
+            continue
+        try:
+            function = setup()
+        except BenchmarkUnavailable as error:
+            if show_progress:
+                print(f"{name:<48} skipped: {error}", file=sys.stderr)
+            continue
+
+        results[name] = measure(function, min_time)
+        if show_progress:
+            print(f"{name:<48} {results[name]['median'] * 1000:>10.3f} ms (best {results[name]['min'] * 1000:.3f} ms)", file=sys.stderr)
+
+    return results
+
+
+def save_results(filepath: Path, results: dict[str, BenchmarkResult]):
+    data = {
+        "metadata": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor(), "date": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    with open(filepath, "w") as file:
+        json.dump(data, file, indent=1, sort_keys=True)
+
+
+def load_results(filepath: Path) -> dict[str, BenchmarkResult]:
+    with open(filepath) as file:
+        return json.load(file)["results"]
+
+
+def compare_results(results: dict[str, BenchmarkResult], baseline: dict[str, BenchmarkResult], threshold: float = 0.2) -> dict[str, tuple[str, float]]:
+    """Compare best times with baseline, the best time is less sensitive than the median to other processes of the machine
+
+    Returns:
+        dict[str, tuple[str, float]]: status ("regression", "faster", "ok" or "new") and ratio of time to baseline time, by benchmark name
+    """
+    comparison = {}
+    for name, result in results.items():
+        if name not in baseline:
+            comparison[name] = ("new", 1.0)
+            continue
+
+        ratio = result["min"] / baseline[name]["min"] if baseline[name]["min"] > 0 else 1.0
+        if ratio > 1 + threshold:
+            comparison[name] = ("regression", ratio)
+        elif ratio < 1 / (1 + threshold):
+            comparison[name] = ("faster", ratio)
+        else:
+            comparison[name] = ("ok", ratio)
+
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run benchmarks, save them as baseline or compare them with a baseline")
+    parser.add_argument("--filter", nargs="+", default=None, help="run benchmarks whose name contains one of these strings")
+    parser.add_argument("--save", type=Path, default=None, help="write results to this baseline file")
+    parser.add_argument("--compare", type=Path, default=None, help="compare results with this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown flagged as regression, 0.2 is 20%% slower")
+    parser.add_argument("--min-time", type=float, default=0.5, help="time spent on each benchmark, in seconds")
+    parser.add_argument("--list", action="store_true", help="list benchmarks without running them")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(name for name in _BENCHMARKS if not args.filter or any(pattern in name for pattern in args.filter)))
+        sys.exit(0)
+
+    results = run_suite(args.filter, args.min_time)
+    if args.save is not None:
+        save_results(args.save, results)
+
+    if args.compare is not None:
+        baseline = load_results(args.compare)
+        comparison = compare_results(results, baseline, args.threshold)
+        print(f"{'benchmark (best time)':<48} {'baseline (ms)':>14} {'current (ms)':>13} {'ratio':>7}  status")
+        for name, (status, ratio) in comparison.items():
+            baseline_time = f"{baseline[name]['min'] * 1000:.3f}" if name in baseline else "-"
+            print(f"{name:<48} {baseline_time:>14} {results[name]['min'] * 1000:>13.3f} {ratio:>7.2f}  {status}")
+
+        regressions = [name for name, (status, _) in comparison.items() if status == "regression"]
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
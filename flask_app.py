@@ -1,11 +1,35 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, abort, g, render_template, request
 from fretboard.fretboard import *
 from fretboard.chord_importer import import_e9_chords_from_json
+from fretboard.chords import Chord
+from fretboard.chord_atlas import ChordAtlas
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.chord_serializer import ChordSerializer
+from fretboard.extended_search import ExtendedVoicingSearch
+from fretboard.voicing_filter import filter_dominated_voicings
+from fretboard.voicing_store import VoicingStore
+from fretboard.voicing_query import VoicingQueryIndex
+from fretboard.chord_identifier import ChordIdentifier
+from fretboard.voice_leading import VoiceLeadingPathFinder, parse_roman_progression
+from fretboard.cache import ResultCache
+from fretboard.copedent import Copedent
+from fretboard.metrics import metrics
 
 from pathlib import Path
+from typing import Generator, Iterable, Iterator, Optional
+import gzip
+import hashlib
+import itertools
+import os
+import time
+import zlib
 
 app = Flask(__name__)
 
+# stage and request timings are collected when FRETBOARD_METRICS is set, and exposed on /metrics
+if os.environ.get("FRETBOARD_METRICS"):
+    metrics.enable()
+
 
 # fretboard = Fretboard.init_as_guitar_standard()
 # fretboard = Fretboard.init_as_guitar_open_e()
@@ -17,8 +41,36 @@ fretboard = Fretboard.init_as_pedal_steel_e9()
 keys: list[str] = convert_int_notes_to_str([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11], as_sharps=True)
 initial_key = "E"
 
+# chords are read from the atlas built with "python -m fretboard.chord_atlas data/chords.atlas", or generated when missing
+chord_atlas_file = Path("data/chords.atlas")
+chord_atlas = ChordAtlas.open(chord_atlas_file) if chord_atlas_file.exists() else None
+result_cache = ResultCache()
+copedent_hash = Copedent.init_from_fretboard(fretboard).get_hash()
+chord_types: list[str] = list(CHORD_FORMULAS.keys())
+
+# copedents available through the api, by name
+copedents: dict[str, Copedent] = {copedent.name: copedent for copedent in map(Copedent.load, sorted(Path("data/copedents").glob("*.json")))}
+
+# voicings and voicing counts of all chords in all keys for all copedents (and tensors of each copedent), in their own cache
+# so that scales, extended searches and other results never evict them
+voicing_cache = ResultCache(max_size=(2 * len(keys) * len(chord_types) + 1) * (len(copedents) + 1))
+chord_generators: dict[str, ChordGenerator] = {}  # created on first use
+extended_searches: dict[str, ExtendedVoicingSearch] = {}  # by copedent name, created on first use
+chord_serializers: dict[str, ChordSerializer] = {copedent_name: ChordSerializer(copedent.tuning, copedent.pedals) for copedent_name, copedent in copedents.items()}
+
+# rendered pages (html, gzipped html, etag), by copedent and form inputs
+render_cache = ResultCache(max_size=256)
+
+voicing_query_indexes: dict[str, VoicingQueryIndex] = {}  # by copedent name, created on first search
+chord_identifiers: dict[str, ChordIdentifier] = {}  # by copedent name, created on first use
+voice_leading_path_finders: dict[str, VoiceLeadingPathFinder] = {}  # by copedent name, created on first use
+
 
 def generate_scale(key: str):
+    return result_cache.get_or_compute((copedent_hash, "pentatonic major scale", key), lambda: _generate_scale(key))
+
+
+def _generate_scale(key: str):
     start_fret = 0
     end_fret = 12
     fretboard_data = fretboard.generate_major_pentatonic_scale_as_integers(key, start_fret, end_fret)
@@ -36,27 +88,351 @@ def generate_scale(key: str):
     return fretboard_data, pedals_as_str
 
 
-@app.route("/", methods=["GET", "POST"])
-def display_fretboard():
+def get_chord_voicings(key: str, chord_type: str) -> list[Voicing]:
+    return list(iter_chord_voicings("E9", key, chord_type))
+
 
-    current_key = initial_key
+def generate_chord(key: str, chord_type: str, voicing_nb: int):
+    voicings = get_chord_voicings(key, chord_type)
+    if not voicings:
+        return [[None] * 13 for _ in fretboard.tuning], []
+
+    voicing = voicings[voicing_nb % len(voicings)]
+    fretboard_data = fretboard.generate_voicing(voicing)
+    pedals_to_apply = [Pedal.init_from_name(pedal) for pedal in voicing.pedals]
+    fretboard_data = fretboard.convert_fretboard_scale_to_intervals(key, fretboard_data, pedals_to_apply)
+
+    return fretboard_data, voicing.pedals
 
-    if request.method == "POST":
-        current_key = request.form.get("key")
-        if not current_key:
-            current_key = "E"
 
-    fretboard_data, pedals_as_str = generate_scale(current_key)
+def render_page(current_key: str, current_chord: str, current_voicing: int) -> tuple[bytes, bytes, str]:
+    if current_chord in chord_types:
+        fretboard_data, pedals_as_str = generate_chord(current_key, current_chord, current_voicing)
+    else:
+        fretboard_data, pedals_as_str = generate_scale(current_key)
 
-    return render_template(
+    html = render_template(
         "fretboard.html",
         tuning=fretboard.get_tuning_as_str(),
         fretboard_data=fretboard_data,
         nb_strings=len(fretboard_data),
         keys=keys,
         current_key=current_key,
+        chord_types=chord_types,
+        current_chord=current_chord,
+        current_voicing=current_voicing,
         pedals_to_apply=pedals_as_str,
-    )
+    ).encode("utf-8")
+
+    return html, gzip.compress(html, compresslevel=9, mtime=0), hashlib.sha256(html).hexdigest()
+
+
+def parse_page_inputs(values) -> tuple[str, str, int]:
+    """Get key, chord type ("" for scale) and voicing number from request values, invalid ones are replaced by defaults"""
+    current_key = values.get("key")
+    if current_key not in keys:
+        current_key = initial_key
+    current_chord = values.get("chord", "")
+    if current_chord not in chord_types:
+        current_chord = ""
+    current_voicing = values.get("voicing", 0, type=int)
+
+    return current_key, current_chord, current_voicing
+
+
+def get_nb_voicings(key: str, chord_type: str) -> int:
+    return voicing_cache.get_or_compute((copedent_hash, "nb voicings", key, chord_type), lambda: len(get_chord_voicings(key, chord_type)))
+
+
+def normalize_page_inputs(current_key: str, current_chord: str, current_voicing: int) -> tuple[str, str, int]:
+    """Get voicing number modulo number of voicings of the chord (0 for scale), so equivalent inputs share a rendered page"""
+    if not current_chord:
+        return current_key, current_chord, 0
+
+    nb_voicings = get_nb_voicings(current_key, current_chord)
+    return current_key, current_chord, current_voicing % nb_voicings if nb_voicings else 0
+
+
+def get_page_cache_key(current_key: str, current_chord: str, current_voicing: int) -> tuple:
+    return (copedent_hash, "page", current_key, current_chord, current_voicing)
+
+
+@app.route("/", methods=["GET", "POST"])
+def display_fretboard():
+
+    # inputs are read from query string (GET, cacheable by browsers) or form (POST)
+    current_key, current_chord, current_voicing = normalize_page_inputs(*parse_page_inputs(request.values))
+
+    cache_key = get_page_cache_key(current_key, current_chord, current_voicing)
+    html, gzipped_html, etag = render_cache.get_or_compute(cache_key, lambda: render_page(current_key, current_chord, current_voicing))
+
+    # serve pre-compressed page when possible, each encoding has its own strong etag
+    if request.accept_encodings["gzip"]:
+        response = Response(gzipped_html, mimetype="text/html")
+        response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(etag + "-gzip")
+    else:
+        response = Response(html, mimetype="text/html")
+        response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.no_cache = True  # always revalidate with etag
+
+    return response.make_conditional(request)
+
+
+def iter_chord_voicings(copedent_name: str, key: str, chord_type: str) -> Iterator[Voicing]:
+    """Yield voicings from chord atlas, or as they are generated"""
+    if chord_atlas is not None and chord_atlas.has_voicings(copedent_name, key, chord_type):
+        yield from chord_atlas.get_voicings(copedent_name, key, chord_type)
+        return
+
+    if copedent_name not in chord_generators:
+        chord_generators[copedent_name] = ChordGenerator(copedents[copedent_name].to_fretboard(), vectorized=True, cache=voicing_cache)
+
+    # generated voicings are played at a single fret, so a voicing can only be part of voicings at the same fret:
+    # filtering fret by fret gives the same voicings as filtering the whole list
+    voicings = chord_generators[copedent_name].iter_voicings(CHORD_FORMULAS[chord_type], key)
+    try:
+        for _, fret_voicings in itertools.groupby(voicings, key=lambda voicing: max(note for note in voicing.notes if note is not None)):
+            yield from filter_dominated_voicings(list(fret_voicings))
+    finally:
+        # generator caches voicings when closed early, like when offset and limit cut the stream
+        voicings.close()
+
+
+def get_extended_voicings(copedent_name: str, key: str, chord_type: str) -> list[Voicing]:
+    """Voicings of slanted and straight bars with open strings up to fret 24 (see ExtendedVoicingSearch), memoized"""
+    if copedent_name not in extended_searches:
+        extended_searches[copedent_name] = ExtendedVoicingSearch(copedents[copedent_name].to_fretboard())
+    cache_key = (copedents[copedent_name].get_hash(), "extended voicings", key, chord_type)
+
+    return result_cache.get_or_compute(cache_key, lambda: extended_searches[copedent_name].search(CHORD_FORMULAS[chord_type], key))
+
+
+def compress_stream(chunks: Iterator[str]) -> Iterator[bytes]:
+    """Gzip chunks, flushing after each one so clients can decode them as soon as they arrive"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+# voicing filters of the api -> predicates of VoicingStore.get_mask
+voicing_filters: dict[str, str] = {"min_notes": "min_nb_notes", "max_notes": "max_nb_notes", "max_pedals": "max_nb_pedals", "min_fret": "min_fret", "max_fret": "max_fret"}
+
+
+def parse_voicings_query(args) -> tuple[str, str, str, int, Optional[int], dict[str, int], bool]:
+    """Get copedent name, key, chord type, offset, limit, voicing filters and extended search mode from request args, raise LookupError for unknown copedent and ValueError for invalid args"""
+    copedent_name = args.get("copedent", "E9")
+    key = args.get("key", initial_key)
+    chord_type = args.get("chord", "M")
+    offset = args.get("offset", 0, type=int)
+    limit = args.get("limit", None, type=int)
+    filters = {predicate: args.get(name, type=int) for name, predicate in voicing_filters.items() if name in args}
+    extended = args.get("extended", "0")
+
+    if copedent_name not in copedents:
+        raise LookupError(f"Unknown copedent: {copedent_name}")
+    if key not in keys or chord_type not in chord_types:
+        raise ValueError("Invalid key or chord")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("Invalid offset or limit")
+    if any(value is None for value in filters.values()):
+        raise ValueError("Invalid voicing filter")
+    if extended not in ("0", "1"):
+        raise ValueError("Invalid extended mode")
+
+    return copedent_name, key, chord_type, offset, limit, filters, extended == "1"
+
+
+def iter_voicings_as_json_lines(
+    copedent_name: str, key: str, chord_type: str, offset: int, limit: Optional[int], filters: Optional[dict[str, int]] = None, extended: bool = False
+) -> Iterator[str]:
+    copedent = copedents[copedent_name]
+    chord_serializer = chord_serializers[copedent_name]
+    voicings: Iterable[Voicing] = get_extended_voicings(copedent_name, key, chord_type) if extended else iter_chord_voicings(copedent_name, key, chord_type)
+    if filters:
+        # filtered voicings are not streamed as they are generated, but all filters run at once on columns
+        voicings = VoicingStore.init_from_voicings(list(voicings), len(copedent.tuning)).select(**filters).to_voicings()
+    try:
+        for voicing in itertools.islice(voicings, offset, offset + limit if limit is not None else None):
+            yield chord_serializer.voicing_to_json_text(voicing, key) + "\n"
+    finally:
+        if isinstance(voicings, Generator):
+            voicings.close()
+
+
+@app.route("/api/voicings")
+def stream_voicings():
+    """Stream voicings of a chord as newline delimited json, like /api/voicings?copedent=E9&key=F%23&chord=m7&offset=0&limit=20
+    Voicings can be filtered with min_notes, max_notes, max_pedals, min_fret and max_fret, like &max_pedals=2&min_fret=3&max_fret=8&min_notes=5
+    With extended=1, voicings also include slanted bars and open strings against the bar, up to fret 24 (see ExtendedVoicingSearch)"""
+    try:
+        copedent_name, key, chord_type, offset, limit, filters, extended = parse_voicings_query(request.args)
+    except LookupError as error:
+        abort(404, str(error))
+    except ValueError as error:
+        abort(400, str(error))
+
+    lines = iter_voicings_as_json_lines(copedent_name, key, chord_type, offset, limit, filters, extended)
+
+    if request.accept_encodings["gzip"]:
+        response = Response(compress_stream(lines), mimetype="application/x-ndjson")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(lines, mimetype="application/x-ndjson")
+    response.vary.add("Accept-Encoding")
+
+    return response
+
+
+def get_voicing_query_index(copedent_name: str) -> VoicingQueryIndex:
+    """Index of voicings of all chords in all keys, built on first search"""
+    if copedent_name not in voicing_query_indexes:
+        copedent = copedents[copedent_name]
+        chords = []
+        for key in keys:
+            for chord_type in chord_types:
+                chord = Chord(key=key, type=chord_type)
+                chord.voicings = list(iter_chord_voicings(copedent_name, key, chord_type))
+                chords.append(chord)
+        voicing_query_indexes[copedent_name] = VoicingQueryIndex(chords, copedent.tuning, copedent.pedals)
+
+    return voicing_query_indexes[copedent_name]
+
+
+def parse_search_query(args) -> tuple[str, dict]:
+    """Get copedent name and criteria of VoicingQueryIndex.query from request args, raise LookupError for unknown copedent and ValueError for invalid args"""
+    copedent_name = args.get("copedent", "E9")
+    if copedent_name not in copedents:
+        raise LookupError(f"Unknown copedent: {copedent_name}")
+
+    criteria: dict = {"limit": args.get("limit", 20, type=int)}
+    for name in ["key", "chord_type", "top_interval", "bass_interval"]:
+        if name in args:
+            criteria[name] = args[name]
+    for name in ["fret", "top_string", "near_fret"]:
+        if name in args:
+            criteria[name] = args.get(name, type=int)
+    for name in ["with_pedals", "without_pedals", "pedals"]:
+        if name in args:
+            criteria[name] = [pedal for pedal in args[name].split(",") if pedal]
+    if "strings" in args:
+        criteria["strings"] = [int(string) for string in args["strings"].split(",") if string.isdigit()]
+
+    if any(value is None for value in criteria.values()) or criteria["limit"] < 0:
+        raise ValueError("Invalid search")
+    if criteria.get("key", keys[0]) not in keys or criteria.get("chord_type", chord_types[0]) not in chord_types:
+        raise ValueError("Invalid key or chord")
+
+    return copedent_name, criteria
+
+
+@app.route("/api/search")
+def search_voicings():
+    """Search voicings of all chords, like /api/search?near_fret=8&without_pedals=C or /api/search?key=G&chord_type=M7&top_interval=3&with_pedals=A,B
+    Criteria are the arguments of VoicingQueryIndex.query, lists are comma separated"""
+    try:
+        copedent_name, criteria = parse_search_query(request.args)
+        matches = get_voicing_query_index(copedent_name).query(**criteria)
+    except LookupError as error:
+        abort(404, str(error))
+    except ValueError as error:
+        abort(400, str(error))
+
+    copedent = copedents[copedent_name]
+    return [{"key": key, "chord": chord_type, **voicing.to_json(copedent.tuning, key, copedent.pedals)} for key, chord_type, voicing in matches]
+
+
+def identify_chords(args) -> list[dict]:
+    """Name chords played at a fret with pedals and picked strings from request args, raise LookupError for unknown copedent and ValueError for invalid args"""
+    copedent_name = args.get("copedent", "E9")
+    if copedent_name not in copedents:
+        raise LookupError(f"Unknown copedent: {copedent_name}")
+    if copedent_name not in chord_identifiers:
+        chord_identifiers[copedent_name] = ChordIdentifier(copedents[copedent_name].to_fretboard())
+    chord_identifier = chord_identifiers[copedent_name]
+
+    fret = args.get("fret", None, type=int)
+    pedals = [pedal for pedal in args.get("pedals", "").split(",") if pedal]
+    strings = [int(string) for string in args.get("strings", "").split(",") if string.isdigit()]
+    if fret is None or any(string >= len(chord_identifier.fretboard.tuning) for string in strings):
+        raise ValueError("Invalid fret or strings")
+
+    # all strings are picked by default, as in ChordIdentifier.annotate
+    return [{"key": key, "chord": chord_type} for key, chord_type in chord_identifier.identify(fret, pedals, strings or None)]
+
+
+@app.route("/api/identify")
+def identify_chord():
+    """Name chords played at a fret with pedals, picking some strings (all strings by default), like /api/identify?fret=3&pedals=A,B&strings=2,4,5,6,7"""
+    try:
+        return identify_chords(request.args)
+    except LookupError as error:
+        abort(404, str(error))
+    except ValueError as error:
+        abort(400, str(error))
+
+
+def find_voice_leading(args) -> dict:
+    """Find voicings of a progression with the smoothest voice leading from request args, raise LookupError for unknown copedent and ValueError for invalid args"""
+    copedent_name = args.get("copedent", "E9")
+    if copedent_name not in copedents:
+        raise LookupError(f"Unknown copedent: {copedent_name}")
+    if copedent_name not in voice_leading_path_finders:
+        voice_leading_path_finders[copedent_name] = VoiceLeadingPathFinder(ChordGenerator(copedents[copedent_name].to_fretboard(), vectorized=True, cache=voicing_cache))
+
+    key = args.get("key", initial_key)
+    numerals = [numeral for numeral in args.get("progression", "").split(",") if numeral]
+    filters = {predicate: args.get(name, type=int) for name, predicate in voicing_filters.items() if name in args}
+    if key not in keys or not numerals or len(numerals) > 256:
+        raise ValueError("Invalid key or progression")
+    if any(value is None for value in filters.values()):
+        raise ValueError("Invalid voicing filter")
+
+    progression = parse_roman_progression(numerals, key)
+    voicings, cost = voice_leading_path_finders[copedent_name].find_path(progression, **filters)
+    copedent = copedents[copedent_name]
+
+    return {"cost": cost, "chords": [{"key": key, "chord": chord_type, **voicing.to_json(copedent.tuning, key, copedent.pedals)} for (key, chord_type), voicing in zip(progression, voicings)]}
+
+
+@app.route("/api/voice-leading")
+def voice_leading():
+    """Voicings of a progression in a key with the least bar movement and pedal changes, like /api/voice-leading?key=G&progression=I,IV,V7,I&min_notes=4
+    Voicings can be filtered with the arguments of /api/voicings"""
+    try:
+        return find_voice_leading(request.args)
+    except LookupError as error:
+        abort(404, str(error))
+    except ValueError as error:
+        abort(400, str(error))
+
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_timing(response: Response) -> Response:
+    if metrics.enabled and "request_start" in g:
+        start = g.request_start
+        labels = {"route": request.url_rule.rule if request.url_rule is not None else "unknown", "method": request.method, "status": str(response.status_code)}
+        if response.is_streamed:
+            # streamed responses are timed until their last byte, when the server closes them
+            response.call_on_close(lambda: metrics.observe("http_request_seconds", time.perf_counter() - start, **labels))
+        else:
+            metrics.observe("http_request_seconds", time.perf_counter() - start, **labels)
+
+    return response
+
+
+@app.route("/metrics")
+def get_metrics():
+    """Generation stage and request metrics in Prometheus text format"""
+    return Response(metrics.to_prometheus(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
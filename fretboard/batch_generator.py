@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+from fretboard.chords import Chord
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS, FILTER_SUBSETS_BY_TUNING
+from fretboard.chord_serializer import ChordSerializer
+from fretboard.copedent import Copedent
+from fretboard.fretboard import Fretboard, FRETBOARD_NAMES
+from fretboard.notes_utils import convert_int_notes_to_str
+from fretboard.voicing_filter import filter_dominated_voicings
+
+ALL_KEYS: list[str] = convert_int_notes_to_str(list(range(12)), as_sharps=True)
+
+# (tuning, key, chord type)
+BatchTask = tuple[str, str, str]
+
+# chord generators and serializers of worker process, one for each tuning
+_chord_generators: dict[str, ChordGenerator] = {}
+_chord_serializers: dict[str, ChordSerializer] = {}
+_output_directory: Path = Path("data")
+_min_nb_notes: int = 0
+_vectorized: bool = True
+_copedents: dict[str, dict] = {}  # copedents loaded from files, as json, by name
+
+
+def get_output_filepath(output_directory: Path, task: BatchTask) -> Path:
+    """Get file where voicings of a task are written, like data/E9/F#/m7.json"""
+    tuning, key, chord_type = task
+    return output_directory / tuning / key / (chord_type.replace("/", "_") + ".json")
+
+
+def _init_worker(output_directory: Path, min_nb_notes: int, vectorized: bool, copedents: dict[str, dict]):
+    global _output_directory, _min_nb_notes, _vectorized, _copedents
+    _output_directory = output_directory
+    _min_nb_notes = min_nb_notes
+    _vectorized = vectorized
+    _copedents = copedents
+    _chord_generators.clear()
+    _chord_serializers.clear()
+
+
+def run_task(task: BatchTask) -> tuple[BatchTask, int]:
+    """Generate voicings of a chord and write them as json, returns task and number of voicings"""
+    tuning, key, chord_type = task
+    if tuning not in _chord_generators:
+        fretboard = Copedent.init_from_json(_copedents[tuning]).to_fretboard() if tuning in _copedents else Fretboard.init_from_name(tuning)
+        _chord_generators[tuning] = ChordGenerator(fretboard, _vectorized)
+        _chord_serializers[tuning] = ChordSerializer(fretboard.tuning, fretboard.pedals)
+    chord_generator = _chord_generators[tuning]
+
+    # same voicings as generate_*_chords: subsets of other voicings are filtered out depending on tuning, copedents are filtered like E9
+    chord = Chord(key=key, type=chord_type)
+    chord.voicings = chord_generator.generate_voicings(CHORD_FORMULAS[chord_type], key)
+    if tuning in _copedents or FILTER_SUBSETS_BY_TUNING.get(tuning, True):
+        chord.voicings = filter_dominated_voicings(chord.voicings, _min_nb_notes)
+    elif _min_nb_notes > 0:
+        chord.voicings = [voicing for voicing in chord.voicings if voicing.get_number_of_notes() >= _min_nb_notes]
+    json_text = _chord_serializers[tuning].chord_to_json_text(chord, {"key": key, "tuning": tuning})
+
+    # write atomically so readers never see a partial file
+    filepath = get_output_filepath(_output_directory, task)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_filepath = filepath.with_name(filepath.name + f".{os.getpid()}.tmp")
+    with open(tmp_filepath, "w") as file:
+        file.write(json_text)
+    os.replace(tmp_filepath, filepath)
+
+    return task, len(chord.voicings)
+
+
+def generate_batch(
+    tunings: list[str],
+    keys: list[str],
+    chord_types: list[str],
+    output_directory: Path,
+    min_nb_notes: int = 0,
+    vectorized: bool = True,
+    processes: int | None = None,
+    show_progress: bool = True,
+    copedents: list[Copedent] | None = None,
+) -> dict[BatchTask, int]:
+    """Generate voicings for all (tuning, key, chord type) with a process pool, one file per task
+
+    Tunings are names of FRETBOARD_NAMES, or names of given copedents.
+
+    Returns:
+        dict[BatchTask, int]: number of voicings of each task
+    """
+    tasks: list[BatchTask] = [(tuning, key, chord_type) for tuning in tunings for key in keys for chord_type in chord_types]
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (processes * 4))
+    results: dict[BatchTask, int] = {}
+    start_time = time.perf_counter()
+
+    copedents_as_json = {copedent.name: copedent.to_json() for copedent in copedents or []}
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(output_directory, min_nb_notes, vectorized, copedents_as_json)) as pool:
+        for task, nb_voicings in pool.imap_unordered(run_task, tasks, chunksize):
+            results[task] = nb_voicings
+            if show_progress:
+                elapsed = time.perf_counter() - start_time
+                print(f"\r[{len(results)}/{len(tasks)}] {elapsed:.1f}s {' '.join(task):<24}", end="", file=sys.stderr, flush=True)
+
+    if show_progress:
+        print(file=sys.stderr)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate voicings of all chords for several tunings and keys in parallel")
+    parser.add_argument("output", type=Path, help="output directory, voicings are written to <output>/<tuning>/<key>/<chord type>.json")
+    parser.add_argument("--tunings", nargs="+", default=[], choices=FRETBOARD_NAMES)
+    parser.add_argument("--copedents", nargs="+", type=Path, default=[], help="copedent files (see fretboard.copedent), like data/copedents/e9.json")
+    parser.add_argument("--keys", nargs="+", default=ALL_KEYS)
+    parser.add_argument("--chords", nargs="+", default=list(CHORD_FORMULAS.keys()), choices=list(CHORD_FORMULAS.keys()))
+    parser.add_argument("--min-nb-notes", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes, defaults to number of cores")
+    parser.add_argument("--python-engine", action="store_true", help="use python loops instead of numpy engine")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    copedents = [Copedent.load(filepath) for filepath in args.copedents]
+    tunings = args.tunings + [copedent.name for copedent in copedents]
+    if not tunings:
+        tunings = ["E9"]
+
+    generate_batch(tunings, args.keys, args.chords, args.output, args.min_nb_notes, not args.python_engine, args.processes, not args.quiet, copedents)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_MISSING = object()  # marker of results missing from disk, results can be None
+
+
+class ResultCache:
+    """Memoize expensive products (pedal combinations, interval tensors, voicings, rendered fretboards...) under keys starting with a copedent hash
+    (see Copedent.get_hash), in memory with LRU eviction and optionally on disk"""
+
+    max_size: int = 256
+    directory: Optional[Path] = None  # pickled results are also stored in this directory when set
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, max_size: int = 256, directory: Optional[Path] = None):
+        self.max_size = max_size
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], T]) -> T:
+        """Return cached result for given key, compute and store it when missing"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+
+        result = self._load(key)
+        if result is _MISSING:
+            result = compute()
+            with self._lock:
+                self.misses += 1
+            self.put(key, result)
+        else:
+            with self._lock:
+                self.hits += 1
+            self._store_in_memory(key, result)
+
+        return result
+
+    def get(self, key: tuple) -> Any:
+        """Return cached result for given key from memory, None when missing"""
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key: tuple, result: Any):
+        """Store a result computed outside of get_or_compute, like one produced incrementally"""
+        self._save(key, result)
+        self._store_in_memory(key, result)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._items or (self.directory is not None and self._get_filepath(key).exists())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clear(self, on_disk: bool = False):
+        with self._lock:
+            self._items.clear()
+
+        if on_disk and self.directory is not None:
+            for filepath in self.directory.glob("*.pickle"):
+                filepath.unlink()
+
+    def _get_filepath(self, key: tuple) -> Path:
+        assert self.directory is not None
+        return self.directory / (hashlib.sha256(repr(key).encode("utf-8")).hexdigest() + ".pickle")
+
+    def _load(self, key: tuple) -> Any:
+        """Result stored on disk, _MISSING when missing"""
+        if self.directory is None:
+            return _MISSING
+
+        filepath = self._get_filepath(key)
+        if not filepath.exists():
+            return _MISSING
+
+        try:
+            with open(filepath, "rb") as file:
+                stored_key, result = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return _MISSING
+
+        return result if stored_key == key else _MISSING
+
+    def _save(self, key: tuple, result: Any):
+        if self.directory is None:
+            return
+
+        # write atomically so concurrent processes never read a partial file
+        filepath = self._get_filepath(key)
+        tmp_filepath = filepath.with_name(filepath.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_filepath, "wb") as file:
+            pickle.dump((key, result), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filepath, filepath)
+
+    def _store_in_memory(self, key: tuple, result: Any):
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
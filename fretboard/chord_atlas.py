@@ -0,0 +1,168 @@
+"""Precomputed chord atlas: voicings of all chord formulas in all keys for several tunings, in a binary file loaded by memory mapping
+
+File layout (little endian):
+    header: magic, version, number of tunings, number of entries
+    tunings: one fixed size record per tuning (name, number of strings, pedal names)
+    entries: one fixed size record per (tuning, key, chord type) with offset and number of voicings
+    voicings: one fixed size record per voicing (fret per string, 0xFF for muted strings, then pedal bitmask)
+"""
+
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Optional
+
+from fretboard.chords import Voicing
+from fretboard.chord_generator import ChordGenerator, FILTER_SUBSETS_BY_TUNING
+from fretboard.fretboard import Fretboard, FRETBOARD_NAMES
+from fretboard.notes_utils import convert_int_note_to_str, convert_str_note_to_int
+
+ATLAS_MAGIC: bytes = b"FBATLAS\0"
+ATLAS_VERSION: int = 1
+MAX_NB_PEDALS: int = 32  # pedal combinations are stored as uint32 bitmasks
+MUTED_FRET: int = 0xFF
+
+_HEADER = struct.Struct("<8sHHI")  # magic, version, number of tunings, number of entries
+_TUNING = struct.Struct("<32sBB" + "8s" * MAX_NB_PEDALS)  # name, number of strings, number of pedals, pedal names
+_ENTRY = struct.Struct("<HB16sII")  # tuning index, key, chord type, voicings offset, number of voicings
+
+
+def _encode_name(name: str, size: int) -> bytes:
+    encoded = name.encode("utf-8")
+    if len(encoded) > size:
+        raise ValueError(f"Name too long for chord atlas: {name}")
+    return encoded
+
+
+def _decode_name(encoded: bytes) -> str:
+    return encoded.rstrip(b"\0").decode("utf-8")
+
+
+def build_chord_atlas(filepath: Path, fretboards: dict[str, Fretboard], min_nb_notes: int = 0) -> None:
+    """Generate voicings of all chords in all keys for given fretboards and write them to an atlas file, subsets of other voicings are filtered out
+    for tunings whose chord generators filter them (see FILTER_SUBSETS_BY_TUNING), so the atlas has the same voicings as generate_*_chords
+
+    Args:
+        filepath (Path): output file, written atomically
+        fretboards (dict[str, Fretboard]): fretboards by tuning name (like "E9")
+        min_nb_notes (int): voicings with less notes are filtered out
+    """
+    tunings = []
+    entries = []
+    voicings_data = bytearray()
+
+    for i_tuning, (name, fretboard) in enumerate(fretboards.items()):
+        pedal_names = fretboard.get_pedals_as_str()
+        if len(pedal_names) > MAX_NB_PEDALS:
+            raise ValueError("Too many pedals for chord atlas!")
+        pedal_bits = {pedal: 1 << i for i, pedal in enumerate(pedal_names)}
+        padded_pedal_names = [_encode_name(pedal, 8) for pedal in pedal_names] + [b""] * (MAX_NB_PEDALS - len(pedal_names))
+        tunings.append(_TUNING.pack(_encode_name(name, 32), len(fretboard.tuning), len(pedal_names), *padded_pedal_names))
+
+        voicing_struct = struct.Struct(f"<{len(fretboard.tuning)}BI")
+        chord_generator = ChordGenerator(fretboard, vectorized=True)
+
+        for key_as_int in range(12):
+            chords = chord_generator.generate_chords(convert_int_note_to_str(key_as_int, as_sharps=True), min_nb_notes, FILTER_SUBSETS_BY_TUNING.get(name, True))
+
+            for chord_type, chord in chords.items():
+                entries.append((i_tuning, key_as_int, _encode_name(chord_type, 16), len(voicings_data), len(chord.voicings)))
+                for voicing in chord.voicings:
+                    frets = [note if note is not None else MUTED_FRET for note in voicing.notes]
+                    pedal_mask = 0
+                    for pedal in voicing.pedals:
+                        pedal_mask |= pedal_bits[pedal]
+                    voicings_data += voicing_struct.pack(*frets, pedal_mask)
+
+    # voicing offsets are relative to end of index
+    voicings_offset = _HEADER.size + len(tunings) * _TUNING.size + len(entries) * _ENTRY.size
+
+    data = bytearray(_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, len(tunings), len(entries)))
+    for tuning in tunings:
+        data += tuning
+    for i_tuning, key_as_int, chord_type, offset, nb_voicings in entries:
+        data += _ENTRY.pack(i_tuning, key_as_int, chord_type, voicings_offset + offset, nb_voicings)
+    data += voicings_data
+
+    tmp_filepath = filepath.with_name(filepath.name + ".tmp")
+    with open(tmp_filepath, "wb") as file:
+        file.write(data)
+    os.replace(tmp_filepath, filepath)
+
+
+class ChordAtlas:
+    """Read-only access to a chord atlas file, memory mapped so it can be shared by several processes"""
+
+    tunings: dict[str, tuple[int, list[str]]] = {}  # tuning name -> number of strings, pedal names
+    _mmap: Optional[mmap.mmap] = None
+    _entries: dict[tuple[str, int, str], tuple[int, int]] = {}  # (tuning, key, chord type) -> voicings offset, number of voicings
+
+    @staticmethod
+    def open(filepath: Path) -> ChordAtlas:
+        atlas = ChordAtlas()
+        atlas.tunings = {}
+        atlas._entries = {}
+
+        with open(filepath, "rb") as file:
+            atlas._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, nb_tunings, nb_entries = _HEADER.unpack_from(atlas._mmap, 0)
+        if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+            raise ValueError("Invalid chord atlas file!")
+
+        tuning_names = []
+        offset = _HEADER.size
+        for _ in range(nb_tunings):
+            name, nb_strings, nb_pedals, *pedal_names = _TUNING.unpack_from(atlas._mmap, offset)
+            tuning_names.append(_decode_name(name))
+            atlas.tunings[tuning_names[-1]] = (nb_strings, [_decode_name(pedal) for pedal in pedal_names[:nb_pedals]])
+            offset += _TUNING.size
+
+        for i_tuning, key_as_int, chord_type, voicings_offset, nb_voicings in _ENTRY.iter_unpack(atlas._mmap[offset : offset + nb_entries * _ENTRY.size]):
+            atlas._entries[(tuning_names[i_tuning], key_as_int, _decode_name(chord_type))] = (voicings_offset, nb_voicings)
+
+        return atlas
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def get_chord_types(self, tuning: str) -> list[str]:
+        return [chord_type for (entry_tuning, key_as_int, chord_type) in self._entries.keys() if entry_tuning == tuning and key_as_int == 0]
+
+    def has_voicings(self, tuning: str, key: str, chord_type: str) -> bool:
+        return (tuning, convert_str_note_to_int(key), chord_type) in self._entries
+
+    def get_voicings(self, tuning: str, key: str, chord_type: str) -> list[Voicing]:
+        """Get voicings of given chord, like ("E9", "F#", "m7")"""
+        if self._mmap is None:
+            raise ValueError("Chord atlas is closed!")
+
+        entry = (tuning, convert_str_note_to_int(key), chord_type)
+        if entry not in self._entries:
+            raise KeyError(f"No voicings in chord atlas for {chord_type} in {key} on {tuning}")
+
+        voicings_offset, nb_voicings = self._entries[entry]
+        nb_strings, pedal_names = self.tunings[tuning]
+        voicing_struct = struct.Struct(f"<{nb_strings}BI")
+
+        voicings: list[Voicing] = []
+        for *frets, pedal_mask in voicing_struct.iter_unpack(self._mmap[voicings_offset : voicings_offset + nb_voicings * voicing_struct.size]):
+            voicings.append(Voicing([fret if fret != MUTED_FRET else None for fret in frets], [pedal for i, pedal in enumerate(pedal_names) if pedal_mask >> i & 1]))
+
+        return voicings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build chord atlas with voicings of all chords in all keys")
+    parser.add_argument("output", type=Path, help="atlas file to write, like data/chords.atlas")
+    parser.add_argument("--tunings", nargs="+", default=["E9", "Open E"], choices=FRETBOARD_NAMES)
+    parser.add_argument("--min-nb-notes", type=int, default=0)
+    args = parser.parse_args()
+
+    build_chord_atlas(args.output, {tuning: Fretboard.init_from_name(tuning) for tuning in args.tunings}, args.min_nb_notes)
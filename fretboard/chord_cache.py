@@ -0,0 +1,214 @@
+"""Persistent cache of generated chords, content-addressed: each entry is keyed by a digest of everything that changes its voicings
+(copedent hash, key, formula intervals, min_nb_notes, subset filtering, generator version), so editing a formula or a copedent only
+regenerates the chords that depend on it
+
+Directory layout:
+    manifest.json: description of each entry by digest (copedent hash, key, chord type, formula, min_nb_notes, version...)
+    manifest.lock: file locked while the manifest is updated, so processes sharing the directory merge their entries
+    <digest>.voicings: voicings of an entry, as a voicing library with a single chord (see fretboard.voicing_library)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, the manifest is then only locked between threads
+    fcntl = None
+
+from fretboard.chords import Chord, Voicing
+from fretboard.notes_utils import PitchClassSet, convert_str_note_to_int
+from fretboard.voicing_library import iter_voicing_library, write_voicing_library
+
+MANIFEST_FILENAME: str = "manifest.json"
+LOCK_FILENAME: str = "manifest.lock"
+
+
+class ChordCache:
+    """Generated voicings of chords stored on disk, with a manifest to inspect and prune entries"""
+
+    directory: Path
+    manifest: dict[str, dict] = {}  # entry digest -> entry description
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    @staticmethod
+    def get_digest(copedent_hash: str, key: str, formula: list[str], min_nb_notes: int, filter_subsets: bool, version: int) -> str:
+        """Digest of the inputs of a generated chord, formula is compared as a set of intervals so equivalent spellings share an entry"""
+        canonical = {
+            "copedent": copedent_hash,
+            "key": convert_str_note_to_int(key),
+            "formula": PitchClassSet.from_str_intervals(formula).mask,
+            "min_nb_notes": min_nb_notes,
+            "filter_subsets": filter_subsets,
+            "version": version,
+        }
+        encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+        return hashlib.sha256(encoded).hexdigest()
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.manifest
+
+    def __len__(self) -> int:
+        return len(self.manifest)
+
+    def get(self, digest: str) -> Optional[list[Voicing]]:
+        """Voicings of an entry, None when missing or unreadable"""
+        if digest not in self.manifest and self._get_filepath(digest).exists():
+            # entry may have been added by another process
+            with self._lock:
+                self.manifest.update(self._load_manifest())
+        if digest not in self.manifest:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            voicings = [voicing for chord in iter_voicing_library(self._get_filepath(digest)) for voicing in chord.voicings]
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return voicings
+
+    def put(self, digest: str, chord: Chord, nb_strings: int, copedent_hash: str, formula: list[str], min_nb_notes: int, filter_subsets: bool, version: int):
+        """Store voicings of a chord under the digest of its inputs (see get_digest), inputs are written to the manifest"""
+        with self._lock_manifest():
+            write_voicing_library(self._get_filepath(digest), [chord], nb_strings)
+            self.manifest[digest] = {
+                "copedent": copedent_hash,
+                "key": chord.key,
+                "chord_type": chord.type,
+                "formula": formula,
+                "min_nb_notes": min_nb_notes,
+                "filter_subsets": filter_subsets,
+                "version": version,
+                "nb_voicings": len(chord.voicings),
+                "created": time.time(),
+            }
+            self._save_manifest()
+
+    def prune(self, formulas: Optional[dict[str, list[str]]] = None, version: Optional[int] = None, copedent_hashes: Optional[list[str]] = None) -> list[str]:
+        """Remove entries that cannot be used anymore, and files missing from the manifest that are older than it (files
+        being written by other processes are newer)
+
+        Args:
+            formulas (Optional[dict[str, list[str]]]): current chord formulas, entries of other formulas are removed
+            version (Optional[int]): current generator version, entries of other versions are removed
+            copedent_hashes (Optional[list[str]]): entries of other copedents are removed
+
+        Returns:
+            list[str]: digests of removed entries
+        """
+        masks = {PitchClassSet.from_str_intervals(formula).mask for formula in formulas.values()} if formulas is not None else None
+
+        with self._lock_manifest() as manifest_time:
+            removed = []
+            for digest, entry in self.manifest.items():
+                if (
+                    (masks is not None and PitchClassSet.from_str_intervals(entry["formula"]).mask not in masks)
+                    or (version is not None and entry["version"] != version)
+                    or (copedent_hashes is not None and entry["copedent"] not in copedent_hashes)
+                ):
+                    removed.append(digest)
+            for digest in removed:
+                del self.manifest[digest]
+                self._get_filepath(digest).unlink(missing_ok=True)
+            self._save_manifest()
+
+            for filepath in self.directory.glob("*.voicings"):
+                if filepath.stem not in self.manifest and filepath.stat().st_mtime < manifest_time:
+                    filepath.unlink(missing_ok=True)
+
+        return removed
+
+    def clear(self):
+        with self._lock_manifest():
+            self.manifest.clear()
+            self._save_manifest()
+            for filepath in self.directory.glob("*.voicings"):
+                filepath.unlink(missing_ok=True)
+
+    @contextmanager
+    def _lock_manifest(self) -> Iterator[float]:
+        """Lock manifest between threads and processes, and merge entries written by other processes since it was loaded
+
+        Yields:
+            float: modification time of the manifest file when locked, 0 when missing
+        """
+        with self._lock, open(self.directory / LOCK_FILENAME, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                manifest_filepath = self.directory / MANIFEST_FILENAME
+                manifest_time = manifest_filepath.stat().st_mtime if manifest_filepath.exists() else 0.0
+                # entries whose file was removed by another process are dropped
+                self.manifest = {digest: entry for digest, entry in self.manifest.items() if self._get_filepath(digest).exists()}
+                self.manifest.update(self._load_manifest())
+                yield manifest_time
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _get_filepath(self, digest: str) -> Path:
+        return self.directory / (digest + ".voicings")
+
+    def _load_manifest(self) -> dict[str, dict]:
+        filepath = self.directory / MANIFEST_FILENAME
+        if not filepath.exists():
+            return {}
+
+        try:
+            with open(filepath) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        # entries whose file was removed by hand are missing
+        return {digest: entry for digest, entry in manifest.items() if self._get_filepath(digest).exists()}
+
+    def _save_manifest(self):
+        # write atomically so concurrent processes never read a partial file
+        filepath = self.directory / MANIFEST_FILENAME
+        tmp_filepath = filepath.with_name(filepath.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_filepath, "w") as file:
+            json.dump(self.manifest, file, indent=1, sort_keys=True)
+        os.replace(tmp_filepath, filepath)
+
+
+if __name__ == "__main__":
+    from fretboard.chord_generator import CHORD_FORMULAS, GENERATOR_VERSION
+
+    parser = argparse.ArgumentParser(description="Inspect or prune a cache of generated chords")
+    parser.add_argument("directory", type=Path, help="cache directory, like data/chord_cache")
+    parser.add_argument("--prune", action="store_true", help="remove entries of formulas not in CHORD_FORMULAS anymore and of previous generator versions")
+    args = parser.parse_args()
+
+    chord_cache = ChordCache(args.directory)
+    if args.prune:
+        removed = chord_cache.prune(CHORD_FORMULAS, GENERATOR_VERSION)
+        print(f"Removed {len(removed)} entries")
+    for digest, entry in sorted(chord_cache.manifest.items(), key=lambda item: (item[1]["copedent"], item[1]["key"], item[1]["chord_type"])):
+        print(f"{digest[:12]} {entry['copedent'][:12]} {entry['key']:<2} {entry['chord_type']:<8} {' '.join(entry['formula']):<20} min_nb_notes={entry['min_nb_notes']} version={entry['version']} voicings={entry['nb_voicings']}")
@@ -1,11 +1,21 @@
-from copy import copy
-from typing import Optional
+import time
+from typing import Iterator, Optional
 
-from fretboard.chords import Chord, Voicing
+import numpy as np
+
+from fretboard.cache import ResultCache
+from fretboard.chord_cache import ChordCache
+from fretboard.chords import Chord, Voicing, MUTED_FRET, get_pedal_mask
+from fretboard.copedent import Copedent
+from fretboard.metrics import metrics
 from fretboard.fretboard import Fretboard
 from fretboard.pedal import Pedal, E9_PEDAL_CHANGES
+from fretboard.voicing_filter import filter_dominated_voicings
+
+from fretboard.notes_utils import PitchClassSet, convert_str_note_to_int
 
-from fretboard.notes_utils import convert_str_interval_to_int
+# whether voicings that are part of other voicings are filtered out of generated chords, by tuning name (see FRETBOARD_NAMES), True for other tunings
+FILTER_SUBSETS_BY_TUNING: dict[str, bool] = {"Standard": True, "Open E": False, "E9": True}
 
 CHORD_FORMULAS: dict[str, list[str]] = {
     "M": ["1", "3", "5"],
@@ -38,47 +48,117 @@ CHORD_FORMULAS: dict[str, list[str]] = {
     "13": ["1", "3", "5", "7", "2", "4", "6"],
 }
 
+# bump when generated voicings change for the same inputs, so cached chords (see ChordCache) are regenerated
+GENERATOR_VERSION: int = 1
+
+# formulas compiled once as pitch class sets
+CHORD_FORMULA_PITCH_CLASS_SETS: dict[str, PitchClassSet] = {name: PitchClassSet.from_str_intervals(formula) for name, formula in CHORD_FORMULAS.items()}
+
 
 class ChordGenerator:
 
     fretboard: Fretboard
+    vectorized: bool = False  # use numpy engine to generate voicings
+    cache: Optional[ResultCache] = None  # memoize tensors and voicings under copedent hash when set
+    chord_cache: Optional[ChordCache] = None  # store chords of generate_chords on disk when set
+    copedent_hash: str = ""
 
-    def __init__(self, fretboard: Fretboard):
+    # numpy engine data, computed once per fretboard
+    _pedal_combinations: Optional[list[list[str]]] = None
+    _intervals_tensor: Optional[np.ndarray] = None  # intervals in C, shape is (fret, pedal combination, string)
+    _pedal_strings: Optional[np.ndarray] = None  # strings changed by each pedal of each combination, shape is (pedal combination, pedal, string)
+    _pedal_is_used: Optional[np.ndarray] = None  # shape is (pedal combination, pedal)
+
+    def __init__(self, fretboard: Fretboard, vectorized: bool = False, cache: Optional[ResultCache] = None, chord_cache: Optional[ChordCache] = None):
         self.fretboard = fretboard
+        self.vectorized = vectorized
+        self.cache = cache
+        self.chord_cache = chord_cache
+        if cache is not None or chord_cache is not None:
+            self.copedent_hash = Copedent.init_from_fretboard(fretboard).get_hash()
+
+    def generate_voicings(self, formula: list[str] | PitchClassSet, key: str) -> list[Voicing]:
+        if self.cache is not None:
+            formula_as_set = formula if isinstance(formula, PitchClassSet) else PitchClassSet.from_str_intervals(formula)
+            return list(self.cache.get_or_compute(self._get_cache_key(formula_as_set, key), lambda: self._generate_voicings(formula_as_set, key)))
+
+        return self._generate_voicings(formula, key)
+
+    def iter_voicings(self, formula: list[str] | PitchClassSet, key: str) -> Iterator[Voicing]:
+        """Yield same voicings as generate_voicings, fret by fret, so first voicings are available before all frets are searched"""
+        formula_as_set = formula if isinstance(formula, PitchClassSet) else PitchClassSet.from_str_intervals(formula)
+        if self.cache is not None and self._get_cache_key(formula_as_set, key) in self.cache:
+            yield from self.generate_voicings(formula_as_set, key)
+            return
+
+        voicings: list[Voicing] = []
+        frets = iter(range(0, 12))
+        try:
+            for fret in frets:
+                fret_voicings = self._generate_voicings(formula_as_set, key, range(fret, fret + 1))
+                voicings += fret_voicings
+                yield from fret_voicings
+        except GeneratorExit:
+            # consumer stopped early (like a stream cut by a limit): remaining frets are generated so that voicings are cached anyway
+            if self.cache is not None:
+                for fret in frets:
+                    voicings += self._generate_voicings(formula_as_set, key, range(fret, fret + 1))
+                self.cache.put(self._get_cache_key(formula_as_set, key), voicings)
+            raise
+
+        if self.cache is not None:
+            self.cache.put(self._get_cache_key(formula_as_set, key), voicings)
+
+    def _get_cache_key(self, formula_as_set: PitchClassSet, key: str) -> tuple:
+        return (self.copedent_hash, "voicings", formula_as_set.mask, convert_str_note_to_int(key))
+
+    def _generate_voicings(self, formula: list[str] | PitchClassSet, key: str, frets: range = range(0, 12)) -> list[Voicing]:
+        if self.vectorized:
+            return self.generate_voicings_vectorized(formula, key, frets)
 
-    def generate_voicings(self, formula: list[str], key: str) -> list[Voicing]:
+        return self.generate_voicings_with_loops(formula, key, frets)
 
-        formula_as_int = [convert_str_interval_to_int(note) for note in formula]
+    def generate_voicings_with_loops(self, formula: list[str] | PitchClassSet, key: str, frets: range = range(0, 12)) -> list[Voicing]:
+        formula_as_set = formula if isinstance(formula, PitchClassSet) else PitchClassSet.from_str_intervals(formula)
         pedal_combinations = self.fretboard.get_all_pedal_combinations()
+        pedals_by_name = {pedal.name: pedal for pedal in self.fretboard.pedals}
         voicings: list[Voicing] = []
 
+        # stage timings and counters, only measured when metrics are enabled
+        is_measured = metrics.enabled
+        clock = time.perf_counter
+        intervals_time = completeness_time = voicings_time = necessity_time = 0.0
+        nb_incomplete = nb_unnecessary_pedal = 0
+
         # loop on frets to find voicings
-        for fret in range(0, 12):
+        for fret in frets:
 
             # loop on pedals to try all combinations
             for pedal_combination in pedal_combinations:
-                pedals_to_apply: list[Pedal] = [Pedal.init_from_name(pedal_as_str) for pedal_as_str in pedal_combination]
+                if is_measured:
+                    start = clock()
+                pedals_to_apply: list[Pedal] = [pedals_by_name[pedal_as_str] for pedal_as_str in pedal_combination]
                 intervals_at_fret = self.fretboard.get_intervals_at_fret(fret, pedals_to_apply, key=key)
+                if is_measured:
+                    intervals_time += clock() - start
+                    start = clock()
 
                 # Check chord is actually complete
-                chord_not_complete = False
-                for interval in formula_as_int:
-                    if interval not in intervals_at_fret:
-                        chord_not_complete = True
-                        break
-
-                if chord_not_complete:
+                is_complete = formula_as_set.issubset(PitchClassSet.from_ints(intervals_at_fret))
+                if is_measured:
+                    completeness_time += clock() - start
+                if not is_complete:
+                    nb_incomplete += 1
                     continue
 
+                if is_measured:
+                    start = clock()
+
                 # Keep only strings actually played
-                voicing = Voicing()
-                voicing.pedals = pedal_combination
-                voicing.notes = copy(intervals_at_fret)  # type: ignore
-                for i, _ in enumerate(voicing.notes):
-                    if voicing.notes[i] in formula_as_int:
-                        voicing.notes[i] = fret
-                    else:
-                        voicing.notes[i] = None  # type: ignore
+                voicing = Voicing([fret if interval in formula_as_set else None for interval in intervals_at_fret], pedal_combination)
+                if is_measured:
+                    voicings_time += clock() - start
+                    start = clock()
 
                 # Check if all pedals are actually necessary for this voicing
                 pedal_not_necessary = False
@@ -95,52 +175,150 @@ class ChordGenerator:
                     if pedal_not_necessary:
                         break
 
+                if is_measured:
+                    necessity_time += clock() - start
                 if pedal_not_necessary:
+                    nb_unnecessary_pedal += 1
                     continue
 
                 voicings.append(voicing)
 
+        if is_measured:
+            self._record_generation(len(frets) * len(pedal_combinations), nb_incomplete, nb_unnecessary_pedal, len(voicings), "loops")
+            metrics.observe("generation_stage_seconds", intervals_time, stage="intervals", engine="loops")
+            metrics.observe("generation_stage_seconds", completeness_time, stage="completeness", engine="loops")
+            metrics.observe("generation_stage_seconds", necessity_time, stage="pedal_necessity", engine="loops")
+            metrics.observe("generation_stage_seconds", voicings_time, stage="voicings", engine="loops")
+
+        return voicings
+
+    def generate_voicings_vectorized(self, formula: list[str] | PitchClassSet, key: str, frets: range = range(0, 12)) -> list[Voicing]:
+        """Same as generate_voicings, but all frets and pedal combinations are checked at once with numpy arrays"""
+        self._init_tensors()
+        assert self._pedal_combinations is not None and self._intervals_tensor is not None
+        assert self._pedal_strings is not None and self._pedal_is_used is not None
+
+        formula_mask = (formula if isinstance(formula, PitchClassSet) else PitchClassSet.from_str_intervals(formula)).mask
+        with metrics.timer("generation_stage_seconds", stage="intervals", engine="vectorized"):
+            intervals = (self._intervals_tensor[list(frets)] - convert_str_note_to_int(key)) % 12
+            interval_bits = np.left_shift(1, intervals)
+
+        # Check chord is actually complete
+        with metrics.timer("generation_stage_seconds", stage="completeness", engine="vectorized"):
+            masks_at_fret = np.bitwise_or.reduce(interval_bits, axis=2)
+            is_complete = (masks_at_fret & formula_mask) == formula_mask
+
+        # Keep only strings actually played
+        is_played = (interval_bits & formula_mask) != 0
+
+        # Check if all pedals are actually necessary for this voicing
+        with metrics.timer("generation_stage_seconds", stage="pedal_necessity", engine="vectorized"):
+            has_necessary_change = (is_played[:, :, None, :] & self._pedal_strings[None, :, :, :]).any(axis=3)
+            is_necessary = (has_necessary_change | ~self._pedal_is_used[None, :, :]).all(axis=2)
+
+        with metrics.timer("generation_stage_seconds", stage="voicings", engine="vectorized"):
+            # packed frets of all voicings at once
+            packed_frets = np.where(is_played, np.array(frets, dtype=np.uint8)[:, None, None], np.uint8(MUTED_FRET))
+            pedal_masks = [get_pedal_mask(pedal_combination) for pedal_combination in self._pedal_combinations]
+
+            voicings: list[Voicing] = []
+            for i_fret, i_combination in zip(*np.nonzero(is_complete & is_necessary)):
+                voicings.append(Voicing.init_from_packed(packed_frets[i_fret, i_combination].tobytes(), pedal_masks[i_combination]))
+
+        if metrics.enabled:
+            nb_incomplete = int(is_complete.size - np.count_nonzero(is_complete))
+            self._record_generation(is_complete.size, nb_incomplete, is_complete.size - nb_incomplete - len(voicings), len(voicings), "vectorized")
+
         return voicings
 
     @staticmethod
-    def generate_e9_chords(key_as_str: str, min_nb_notes: int = 0) -> dict[str, Chord]:
-        """Return dict of e9 chords with associated voicings
+    def _record_generation(nb_candidates: int, nb_incomplete: int, nb_unnecessary_pedal: int, nb_voicings: int, engine: str):
+        metrics.increment("generation_candidates", nb_candidates, engine=engine)
+        metrics.increment("generation_rejected", nb_incomplete, engine=engine, reason="incomplete_chord")
+        metrics.increment("generation_rejected", nb_unnecessary_pedal, engine=engine, reason="unnecessary_pedal")
+        metrics.increment("generation_voicings", nb_voicings, engine=engine)
+
+    def _init_tensors(self):
+        """Build interval and pedal tensors used by the numpy engine, only once per fretboard"""
+        if self._intervals_tensor is not None:
+            return
+
+        if self.cache is not None:
+            tensors = self.cache.get_or_compute((self.copedent_hash, "tensors"), self._build_tensors)
+        else:
+            tensors = self._build_tensors()
+        self._pedal_combinations, self._pedal_strings, self._pedal_is_used, self._intervals_tensor = tensors
+
+    def _build_tensors(self) -> tuple[list[list[str]], np.ndarray, np.ndarray, np.ndarray]:
+        pedal_combinations = self.fretboard.get_all_pedal_combinations()
+        pedals_by_name = {pedal.name: pedal for pedal in self.fretboard.pedals}
+        max_nb_pedals = max([len(pedal_combination) for pedal_combination in pedal_combinations] + [1])
+
+        pedal_strings = np.zeros((len(pedal_combinations), max_nb_pedals, len(self.fretboard.tuning)), dtype=bool)
+        pedal_is_used = np.zeros((len(pedal_combinations), max_nb_pedals), dtype=bool)
+        for i_combination, pedal_combination in enumerate(pedal_combinations):
+            for i_pedal, pedal_name in enumerate(pedal_combination):
+                pedal_is_used[i_combination, i_pedal] = True
+                for change in pedals_by_name[pedal_name].changes:
+                    pedal_strings[i_combination, i_pedal, change[0]] = True
+
+        return pedal_combinations, pedal_strings, pedal_is_used, self.fretboard.get_intervals_tensor(pedal_combinations, key="C")
+
+    def generate_chords(self, key_as_str: str, min_nb_notes: int = 0, filter_subsets: bool = True) -> dict[str, Chord]:
+        """Return dict of chords (one for each formula) with associated voicings
+
+        With a chord cache, only chords whose inputs changed (formula, copedent, min_nb_notes...) are generated, others are read from disk.
+
+        Args:
+            key_as_str (str): key of chords
+            min_nb_notes (int): voicings with less notes are filtered out
+            filter_subsets (bool): filter out voicings that are part of another voicing
 
         Returns:
             dict[str, Chord]: chords
         """
-        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9())
         chords: dict[str, Chord] = {}
 
         for key, value in CHORD_FORMULAS.items():
             chords[key] = Chord(key=key_as_str, type=key)
-            chords[key].voicings = chord_generator.generate_voicings(value, key_as_str)
+            if self.chord_cache is not None:
+                digest = ChordCache.get_digest(self.copedent_hash, key_as_str, value, min_nb_notes, filter_subsets, GENERATOR_VERSION)
+                voicings = self.chord_cache.get(digest)
+                if voicings is not None:
+                    chords[key].voicings = voicings
+                    continue
+
+            chords[key].voicings = self.generate_voicings(value, key_as_str)
 
             # filter out sparse voicings and subsets of other voicings
-            to_delete = []
-            for i, voicing in enumerate(chords[key].voicings):
-                if voicing.get_number_of_notes() < min_nb_notes:
-                    to_delete.append(i)
-                elif voicing.is_part_of_other_voicings(chords[key].voicings):
-                    to_delete.append(i)
+            if filter_subsets:
+                chords[key].voicings = filter_dominated_voicings(chords[key].voicings, min_nb_notes)
+            elif min_nb_notes > 0:
+                chords[key].voicings = [voicing for voicing in chords[key].voicings if voicing.get_number_of_notes() >= min_nb_notes]
 
-            for i in sorted(to_delete, reverse=True):
-                del chords[key].voicings[i]
+            if self.chord_cache is not None:
+                self.chord_cache.put(digest, chords[key], len(self.fretboard.tuning), self.copedent_hash, value, min_nb_notes, filter_subsets, GENERATOR_VERSION)
 
         return chords
 
     @staticmethod
-    def generate_open_e_chords(key_as_str: str) -> dict[str, Chord]:
-        """Return dict of open e chords with associated voicings
+    def generate_e9_chords(key_as_str: str, min_nb_notes: int = 0, vectorized: bool = False, chord_cache: Optional[ChordCache] = None) -> dict[str, Chord]:
+        """Return dict of e9 chords with associated voicings, unchanged chords are read from chord cache when given
 
         Returns:
             dict[str, Chord]: chords
         """
-        chord_generator = ChordGenerator(Fretboard.init_as_guitar_open_e())
-        chords: dict[str, Chord] = {}
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized, chord_cache=chord_cache)
 
-        for key, value in CHORD_FORMULAS.items():
-            chords[key] = Chord(key=key_as_str, type=key)
-            chords[key].voicings = chord_generator.generate_voicings(value, key_as_str)
+        return chord_generator.generate_chords(key_as_str, min_nb_notes)
 
-        return chords
+    @staticmethod
+    def generate_open_e_chords(key_as_str: str, vectorized: bool = False) -> dict[str, Chord]:
+        """Return dict of open e chords with associated voicings
+
+        Returns:
+            dict[str, Chord]: chords
+        """
+        chord_generator = ChordGenerator(Fretboard.init_as_guitar_open_e(), vectorized)
+
+        return chord_generator.generate_chords(key_as_str, filter_subsets=FILTER_SUBSETS_BY_TUNING["Open E"])
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from fretboard.chords import Voicing
+from fretboard.chord_generator import CHORD_FORMULA_PITCH_CLASS_SETS
+from fretboard.fretboard import Fretboard
+from fretboard.notes_utils import PitchClassSet, convert_int_note_to_str
+
+# (key, chord type), like ("F#", "m7")
+ChordName = tuple[str, str]
+
+
+def _build_chord_names_by_mask() -> list[tuple[ChordName, ...]]:
+    chord_names_by_mask: list[list[ChordName]] = [[] for _ in range(1 << 12)]
+    for root in range(12):
+        for chord_type, formula in CHORD_FORMULA_PITCH_CLASS_SETS.items():
+            chord_names_by_mask[formula.transpose(root).mask].append((convert_int_note_to_str(root, as_sharps=True), chord_type))
+
+    return [tuple(chord_names) for chord_names in chord_names_by_mask]
+
+
+# chords of CHORD_FORMULAS made of exactly the pitch classes of a 12-bit mask (see PitchClassSet), for all roots
+CHORD_NAMES_BY_MASK: list[tuple[ChordName, ...]] = _build_chord_names_by_mask()
+_CHORD_NAMES_BY_MASK_ARRAY: np.ndarray = np.empty(1 << 12, dtype=object)
+for _mask, _chord_names in enumerate(CHORD_NAMES_BY_MASK):
+    _CHORD_NAMES_BY_MASK_ARRAY[_mask] = _chord_names
+
+
+def identify_pitch_class_set(pitch_class_set: PitchClassSet) -> list[ChordName]:
+    """Get names of chords made of exactly these pitch classes (absolute notes, C is 0)"""
+    return list(CHORD_NAMES_BY_MASK[pitch_class_set.mask])
+
+
+class ChordIdentifier:
+    """Name chords played on a fretboard, from a fret with pedals applied and the strings picked"""
+
+    fretboard: Fretboard
+    _shifts_by_pedals: dict[tuple[str, ...], list[int]] = {}  # pedal combination -> shift of each string
+
+    def __init__(self, fretboard: Fretboard):
+        self.fretboard = fretboard
+        self._shifts_by_pedals = {}
+
+    def identify(self, fret: int, pedals: list[str], strings: Optional[list[int]] = None) -> list[ChordName]:
+        """Get names of chords played by picking given strings (all strings by default) at given fret (bar position) with given pedals applied"""
+        shifts = self._get_shifts(pedals)
+        mask = 0
+        for string in strings if strings is not None else range(len(self.fretboard.tuning)):
+            mask |= 1 << ((self.fretboard.tuning[string] + fret + shifts[string]) % 12)
+
+        return list(CHORD_NAMES_BY_MASK[mask])
+
+    def identify_voicing(self, voicing: Voicing) -> list[ChordName]:
+        shifts = self._get_shifts(voicing.pedals)
+        mask = 0
+        for string, note in enumerate(voicing.notes):
+            if note is not None:
+                mask |= 1 << ((self.fretboard.tuning[string] + note + shifts[string]) % 12)
+
+        return list(CHORD_NAMES_BY_MASK[mask])
+
+    def annotate(self, strings: Optional[list[int]] = None, nb_frets: int = 12) -> tuple[list[list[str]], np.ndarray]:
+        """Name chords of all frets and pedal combinations at once, picking given strings (all strings by default)
+
+        Returns:
+            list[list[str]]: pedal combinations of the fretboard
+            np.ndarray: chord names (tuple[ChordName, ...]) with shape (fret, pedal combination)
+        """
+        pedal_combinations = self.fretboard.get_all_pedal_combinations()
+        notes = self.fretboard.get_intervals_tensor(pedal_combinations, key="C", nb_frets=nb_frets)  # (fret, pedal combination, string)
+        if strings is not None:
+            notes = notes[:, :, strings]
+        masks = np.bitwise_or.reduce(np.left_shift(1, notes), axis=2)
+
+        return pedal_combinations, _CHORD_NAMES_BY_MASK_ARRAY[masks]
+
+    def _get_shifts(self, pedals: list[str]) -> list[int]:
+        key = tuple(pedals)
+        if key not in self._shifts_by_pedals:
+            pedals_by_name = {pedal.name: pedal for pedal in self.fretboard.pedals}
+            shifts = [0] * len(self.fretboard.tuning)
+            for pedal in pedals:
+                if pedal not in pedals_by_name:
+                    raise ValueError("Invalid pedal")
+                for string, shift in pedals_by_name[pedal].changes:
+                    shifts[string] += shift
+            self._shifts_by_pedals[key] = shifts
+
+        return self._shifts_by_pedals[key]
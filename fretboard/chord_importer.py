@@ -1,11 +1,15 @@
 from fretboard.chords import Chord, Voicing
+from fretboard.voicing_filter import filter_dominated_voicings
+from fretboard.voicing_library import iter_voicing_library, write_voicing_library
 
 from pathlib import Path
+from typing import Optional
+import argparse
 import json
 
 
 @staticmethod
-def import_e9_chords_from_json(filepath: Path) -> list[Chord]:
+def import_e9_chords_from_json(filepath: Path, filter_dominated: bool = False) -> list[Chord]:
 
     with open(filepath) as file:
         data = json.load(file)
@@ -13,12 +17,42 @@ def import_e9_chords_from_json(filepath: Path) -> list[Chord]:
     chords: list[Chord] = []
 
     for chord_json in data["chords"]:
-        chord = Chord(key="E", type=chord_json["type"])
+        chord = Chord(key="E", type=chord_json["type"] if "type" in chord_json else chord_json["name"])
 
         for voicing_json in chord_json["voicings"]:
             voicing = Voicing.from_e9_json(voicing_json)
             chord.voicings.append(voicing)
 
+        if filter_dominated:
+            chord.voicings = filter_dominated_voicings(chord.voicings)
+
+        chords.append(chord)
+
+    return chords
+
+
+def import_e9_chords_from_library(filepath: Path, filter_dominated: bool = False, chord_types: Optional[list[str]] = None, min_nb_notes: int = 0) -> list[Chord]:
+    """Import chords from a binary voicing library (see fretboard.voicing_library), only given chord types when set"""
+    chords: list[Chord] = []
+
+    for chord in iter_voicing_library(filepath, chord_types, min_nb_notes):
+        if filter_dominated:
+            chord.voicings = filter_dominated_voicings(chord.voicings)
+
         chords.append(chord)
 
     return chords
+
+
+def convert_json_to_voicing_library(json_filepath: Path, library_filepath: Path, nb_strings: int = 10) -> None:
+    write_voicing_library(library_filepath, import_e9_chords_from_json(json_filepath), nb_strings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a json voicing library to a binary voicing library")
+    parser.add_argument("input", type=Path, help="json library, like data/e9_chords_final_wip.json")
+    parser.add_argument("output", type=Path, help="binary library to write, like data/e9_chords_final_wip.voicings")
+    parser.add_argument("--nb-strings", type=int, default=10)
+    args = parser.parse_args()
+
+    convert_json_to_voicing_library(args.input, args.output, args.nb_strings)
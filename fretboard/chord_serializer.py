@@ -0,0 +1,109 @@
+"""Streaming JSON serializer of chords, writes the same text as json.dumps(Chord.list_to_json(...)) chord by chord
+
+Intervals are computed from a shift vector per pedal combination and JSON fragments are looked up in tables,
+so text is produced without building dicts or applying pedal changes string by string.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO
+
+from fretboard.chords import Chord, Voicing, MUTED_FRET, get_pedal_names
+from fretboard.notes_utils import INTERVAL_NAMES, MUTED_STRING_CHAR, convert_int_notes_to_str, convert_str_note_to_int
+from fretboard.pedal import Pedal
+
+_MUTED_FRAGMENT: str = json.dumps(MUTED_STRING_CHAR)
+_INTERVAL_FRAGMENTS: list[str] = [json.dumps(name) for name in INTERVAL_NAMES]  # indexed by interval
+_NOTE_FRAGMENTS: list[str] = [str(fret) if fret != MUTED_FRET else _MUTED_FRAGMENT for fret in range(256)]  # indexed by fret byte
+
+
+class ChordSerializer:
+    """Serialize chords of a tuning (and copedent pedals) as JSON text, in the format of Chord.to_json"""
+
+    tuning: list[int] = []
+    pedals: Optional[list[Pedal]] = None  # pedals of the copedent, E9 pedals by default (see Voicing.get_intervals)
+    _pedals_by_name: dict[str, Pedal] = {}
+    _combinations: dict[int, tuple[str, list[int]]] = {}  # pedal mask -> pedal names as JSON, pitch shift of each string (open note + pedal changes)
+
+    def __init__(self, tuning: list[int], pedals: Optional[list[Pedal]] = None):
+        self.tuning = tuning
+        self.pedals = pedals
+        self._pedals_by_name = {pedal.name: pedal for pedal in pedals} if pedals is not None else {}
+        self._combinations = {}
+
+    def voicing_to_json_text(self, voicing: Voicing, key: str) -> str:
+        return self._voicing_to_json_text(voicing, convert_str_note_to_int(key))
+
+    def chord_to_json_text(self, chord: Chord, extra: Optional[dict] = None) -> str:
+        """Chord as JSON object, extra fields are written after voicings (like {"key": "C"})"""
+        key_as_int = convert_str_note_to_int(chord.key)
+        voicings = ", ".join([self._voicing_to_json_text(voicing, key_as_int) for voicing in chord.voicings])
+        extra_fields = "".join(f", {json.dumps(name)}: {json.dumps(value)}" for name, value in extra.items()) if extra else ""
+
+        return f'{{"name": {json.dumps(chord.type)}, "voicings": [{voicings}]{extra_fields}}}'
+
+    def iter_json_chunks(self, chords: Iterable[Chord], with_key: bool = False) -> Iterator[str]:
+        """Text of {"chords": [...]} a chord at a time, chords can be a generator so they are never all in memory
+
+        Args:
+            with_key (bool): add key of each chord, for chords of several keys
+        """
+        yield '{"chords": ['
+        for i, chord in enumerate(chords):
+            yield (", " if i else "") + self.chord_to_json_text(chord, {"key": chord.key} if with_key else None)
+        yield "]}"
+
+    def write_chords(self, file: TextIO, chords: Iterable[Chord], with_key: bool = False):
+        """Write chords to a text file or stream (like socket.makefile("w")) as they are serialized"""
+        for chunk in self.iter_json_chunks(chords, with_key):
+            file.write(chunk)
+
+    def _voicing_to_json_text(self, voicing: Voicing, key_as_int: int) -> str:
+        pedals_fragment, shifts = self._get_combination(voicing.pedal_mask)
+        notes = ", ".join([_NOTE_FRAGMENTS[fret] for fret in voicing.frets])
+        intervals = ", ".join([_INTERVAL_FRAGMENTS[(fret + shift - key_as_int) % 12] if fret != MUTED_FRET else _MUTED_FRAGMENT for fret, shift in zip(voicing.frets, shifts)])
+
+        return f'{{"pedals": {pedals_fragment}, "notes": [{notes}], "intervals": [{intervals}]}}'
+
+    def _get_combination(self, pedal_mask: int) -> tuple[str, list[int]]:
+        if pedal_mask not in self._combinations:
+            pedal_names = get_pedal_names(pedal_mask)
+            shifts = list(self.tuning)
+            for pedal_name in pedal_names:
+                pedal = self._pedals_by_name[pedal_name] if self.pedals is not None else Pedal.init_from_name(pedal_name)
+                for string, change in pedal.changes:
+                    shifts[string] += change
+            self._combinations[pedal_mask] = (json.dumps(pedal_names), shifts)
+
+        return self._combinations[pedal_mask]
+
+
+def write_chords_json(filepath: Path, chords: Iterable[Chord], tuning: list[int], pedals: Optional[list[Pedal]] = None, with_key: bool = False):
+    """Write chords as JSON to a file, chord by chord, written atomically (the file is left unchanged when serialization fails)"""
+    tmp_filepath = filepath.with_name(filepath.name + f".{os.getpid()}.tmp")
+    try:
+        with open(tmp_filepath, "w") as file:
+            ChordSerializer(tuning, pedals).write_chords(file, chords, with_key)
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        tmp_filepath.unlink(missing_ok=True)
+        raise
+
+
+if __name__ == "__main__":
+    from fretboard.chord_generator import ChordGenerator
+    from fretboard.fretboard import Fretboard
+
+    parser = argparse.ArgumentParser(description="Export generated E9 chords of several keys to a JSON file, chords are written as they are generated")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--keys", nargs="+", default=convert_int_notes_to_str(list(range(12)), as_sharps=True))
+    parser.add_argument("--min-nb-notes", type=int, default=0)
+    args = parser.parse_args()
+
+    chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True)
+    chords = (chord for key in args.keys for chord in chord_generator.generate_chords(key, args.min_nb_notes).values())
+    write_chords_json(args.output, chords, chord_generator.fretboard.tuning, chord_generator.fretboard.pedals, with_key=True)
@@ -1,47 +1,171 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Iterable, Optional
+from weakref import WeakValueDictionary
+import threading
 
 
-from fretboard.notes_utils import convert_int_interval_to_str, convert_str_note_to_int, MUTED_STRING_CHAR
-from fretboard.pedal import Pedal
+from fretboard.notes_utils import PitchClassSet, convert_int_interval_to_str, convert_str_note_to_int, MUTED_STRING_CHAR
+from fretboard.pedal import Pedal, E9_PEDAL_CHANGES
+
+
+MUTED_FRET: int = 0xFF
+MAX_NB_PEDAL_NAMES: int = 64  # pedal masks fit in 64 bits (see VoicingStore)
+
+# bit of each pedal name in voicing pedal masks, E9 pedals first ; shared by all copedents so that pedal masks of any voicings can be compared
+_pedal_names: list[str] = list(E9_PEDAL_CHANGES.keys())
+_pedal_bits: dict[str, int] = {name: 1 << i for i, name in enumerate(_pedal_names)}
+_pedal_names_by_mask: dict[int, list[str]] = {}
+_pedal_lock = threading.Lock()
+
+
+def get_pedal_mask(pedals: Iterable[str]) -> int:
+    """Get pedals as a bitmask, unknown pedal names (from other copedents) get the next free bit, raise ValueError when all bits are taken
+    Only pedal names of copedents and voicings are registered, use find_pedal_mask to look up other names"""
+    mask = 0
+    for pedal in pedals:
+        if pedal not in _pedal_bits:
+            with _pedal_lock:
+                if pedal not in _pedal_bits:
+                    if len(_pedal_names) >= MAX_NB_PEDAL_NAMES:
+                        raise ValueError("Too many pedal names!")
+                    _pedal_bits[pedal] = 1 << len(_pedal_names)
+                    _pedal_names.append(pedal)
+        mask |= _pedal_bits[pedal]
+
+    return mask
+
+
+def find_pedal_mask(pedals: Iterable[str]) -> Optional[int]:
+    """Get pedals as a bitmask without registering names, None when a pedal name is unknown (for untrusted names, like query args)"""
+    mask = 0
+    for pedal in pedals:
+        if pedal not in _pedal_bits:
+            return None
+        mask |= _pedal_bits[pedal]
+
+    return mask
+
+
+def get_pedal_names(pedal_mask: int) -> list[str]:
+    """Get pedal names of a bitmask, in bit order"""
+    if pedal_mask not in _pedal_names_by_mask:
+        _pedal_names_by_mask[pedal_mask] = [name for i, name in enumerate(list(_pedal_names)) if pedal_mask >> i & 1]
+
+    return list(_pedal_names_by_mask[pedal_mask])
 
 
 class Voicing:
-    """Representation of a chord voicing"""
+    """Representation of a chord voicing, immutable and interned: creating a voicing identical to an existing one returns the existing one
 
-    pedals: list[str] = []
-    notes: list[Optional[int]] = []  # as fret number, or None ; one for each string
+    Frets are packed in bytes (one per string, MUTED_FRET for muted strings) and pedals in a bitmask (see get_pedal_mask),
+    notes and pedals give them back as lists.
+    """
 
-    def __init__(self):
-        self.pedals = []
-        self.notes = []
+    __slots__ = ("frets", "pedal_mask", "__weakref__")
+
+    frets: bytes
+    pedal_mask: int
+
+    _interned: WeakValueDictionary[tuple[bytes, int], Voicing] = WeakValueDictionary()
+
+    def __new__(cls, notes: Iterable[Optional[int]] = (), pedals: Iterable[str] = ()) -> Voicing:
+        """
+        Args:
+            notes (Iterable[Optional[int]]): fret number of each string, or None
+            pedals (Iterable[str]): pedal names
+        """
+        return Voicing.init_from_packed(bytes(note if note is not None else MUTED_FRET for note in notes), get_pedal_mask(pedals))
 
     @staticmethod
-    def from_e9_json(voicing_json: dict) -> Voicing:
-        voicing = Voicing()
-        voicing.pedals = voicing_json["pedals"]
-        for json_note in voicing_json["notes"]:
-            voicing.notes.append(int(json_note) if json_note != MUTED_STRING_CHAR else None)
+    def init_from_packed(frets: bytes, pedal_mask: int) -> Voicing:
+        key = (frets, pedal_mask)
+        voicing = Voicing._interned.get(key)
+        if voicing is None:
+            voicing = object.__new__(Voicing)
+            object.__setattr__(voicing, "frets", frets)
+            object.__setattr__(voicing, "pedal_mask", pedal_mask)
+            voicing = Voicing._interned.setdefault(key, voicing)
 
         return voicing
 
+    @staticmethod
+    def from_e9_json(voicing_json: dict) -> Voicing:
+        notes = [int(json_note) if json_note != MUTED_STRING_CHAR else None for json_note in voicing_json["notes"]]
+
+        return Voicing(notes, voicing_json["pedals"])
+
+    @property
+    def notes(self) -> list[Optional[int]]:
+        """As fret number, or None ; one for each string"""
+        return [fret if fret != MUTED_FRET else None for fret in self.frets]
+
+    @property
+    def pedals(self) -> list[str]:
+        return get_pedal_names(self.pedal_mask)
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError("Voicing is immutable!")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Voicing) and self.frets == other.frets and self.pedal_mask == other.pedal_mask
+
+    def __hash__(self) -> int:
+        return hash((self.frets, self.pedal_mask))
+
+    def __reduce__(self):
+        # pedal bits depend on the order pedal names were seen, names are pickled instead
+        return (Voicing, (self.notes, self.pedals))
+
+    def __repr__(self) -> str:
+        return f"Voicing({self.notes}, {self.pedals})"
+
     def get_number_of_notes(self) -> int:
-        n = 0
-        for note in self.notes:
-            if note is not None:
-                n += 1
-        return n
+        return len(self.frets) - self.frets.count(MUTED_FRET)
+
+    def get_intervals(self, tuning: list[int], key: str, pedals: Optional[list[Pedal]] = None) -> list[Optional[int]]:
+        """Get intervals (as int) played on each string with pedals applied, None for muted strings
+
+        Args:
+            tuning (list[int]): open strings notes
+            key (str): key the intervals are relative to
+            pedals (Optional[list[Pedal]]): pedals of the copedent, E9 pedals by default
+        """
+        key_as_int = convert_str_note_to_int(key)
+        intervals = [(note + tuning[i_string] - key_as_int) % 12 if note is not None else None for i_string, note in enumerate(self.notes)]
+        pedals_by_name = {pedal.name: pedal for pedal in pedals} if pedals is not None else {}
+
+        # Apply pedal change
+        for pedal in self.pedals:
+            pedal_object = pedals_by_name[pedal] if pedals is not None else Pedal.init_from_name(pedal)
+
+            for i, _ in enumerate(intervals):
+                for change in pedal_object.changes:
+                    if change[0] == i:
+
+                        if intervals[i] is not None:
+                            intervals[i] = (intervals[i] + change[1]) % 12  # type:ignore
+
+        return intervals
+
+    def get_pitch_class_set(self, tuning: list[int], key: str, pedals: Optional[list[Pedal]] = None) -> PitchClassSet:
+        """Get intervals played by the voicing as a pitch class set"""
+        return PitchClassSet.from_ints(self.get_intervals(tuning, key, pedals))
+
+    def to_json(self, tuning: list[int], key: str, pedals: Optional[list[Pedal]] = None) -> dict:
+        voicing_dict = {}
+        voicing_dict["pedals"] = self.pedals
+        voicing_dict["notes"] = [note if note is not None else MUTED_STRING_CHAR for note in self.notes]
+        voicing_dict["intervals"] = [convert_int_interval_to_str(interval) if interval is not None else MUTED_STRING_CHAR for interval in self.get_intervals(tuning, key, pedals)]
+
+        return voicing_dict
 
     def is_part_of_other_voicing(self, other: Voicing) -> bool:
         """Returns true if voicing is already a part of another voicing"""
-        for pedal in self.pedals:
-            if pedal not in other.pedals:
-                return False
+        if self.pedal_mask & other.pedal_mask != self.pedal_mask:
+            return False
 
-        for i, note in enumerate(self.notes):
-            if note is not None and other.notes[i] is None:
-                return False
-            if note is not None and other.notes[i] is not None and note != other.notes[i]:
+        for fret, other_fret in zip(self.frets, other.frets):
+            if fret != MUTED_FRET and fret != other_fret:
                 return False
 
         return True
@@ -57,50 +181,32 @@ class Voicing:
 class Chord:
     """Representation of a chord and associated voicings"""
 
-    key: str = ""
-    type: str = ""
-    voicings: list[Voicing] = []
+    __slots__ = ("key", "type", "voicings")
+
+    key: str
+    type: str
+    voicings: list[Voicing]
 
     def __init__(self, key: str, type: str):
         self.key = key
         self.type = type
         self.voicings = []
 
-    def to_json(self, tuning: list[int]) -> dict:
+    def to_json(self, tuning: list[int], pedals: Optional[list[Pedal]] = None) -> dict:
         json_dict = {}
         json_dict["name"] = self.type
         json_dict["voicings"] = []
 
-        key_as_int = convert_str_note_to_int(self.key)
-
         for voicing in self.voicings:
-            voicing_dict = {}
-            voicing_dict["pedals"] = voicing.pedals
-            voicing_dict["notes"] = [note if note is not None else MUTED_STRING_CHAR for note in voicing.notes]
-            voicing_dict["intervals"] = [(note + tuning[i_string] - key_as_int) % 12 if note is not None else None for i_string, note in enumerate(voicing.notes)]
-
-            # Apply pedal change
-            for pedal in voicing.pedals:
-                pedal_object = Pedal.init_from_name(pedal)
-
-                for i, _ in enumerate(voicing_dict["intervals"]):
-                    for change in pedal_object.changes:
-                        if change[0] == i:
-
-                            if voicing_dict["intervals"][i] is not None:
-                                voicing_dict["intervals"][i] = (voicing_dict["intervals"][i] + change[1]) % 12  # type:ignore
-
-            voicing_dict["intervals"] = [convert_int_interval_to_str(interval) if interval is not None else MUTED_STRING_CHAR for interval in voicing_dict["intervals"]]
-
-            json_dict["voicings"].append(voicing_dict)
+            json_dict["voicings"].append(voicing.to_json(tuning, self.key, pedals))
 
         return json_dict
 
     @staticmethod
-    def list_to_json(chords: dict[str, Chord], tuning: list[int]) -> dict:
+    def list_to_json(chords: dict[str, Chord], tuning: list[int], pedals: Optional[list[Pedal]] = None) -> dict:
         json_dict = {}
         json_dict["chords"] = []
         for chord in chords.values():
-            json_dict["chords"].append(chord.to_json(tuning))
+            json_dict["chords"].append(chord.to_json(tuning, pedals))
 
         return json_dict
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+from fretboard.fretboard import Fretboard
+from fretboard.notes_utils import convert_str_note_to_int, convert_int_notes_to_str
+from fretboard.pedal import Pedal
+
+
+class Copedent:
+    """Tuning with its pedal and lever changes, as data that can be loaded from a file and identified by a content hash
+
+    File format (json):
+        {
+            "name": "E9",
+            "tuning": ["B", "D", "E", "F#", "G#", "B", "E", "G#", "D#", "F#"],
+            "pedals": [{"name": "A", "changes": [[0, 2], [5, 2]]}, ...],
+            "conflicts": [["A", "A/2"], ...],
+            "max_nb_pedals": 3
+        }
+    """
+
+    name: str = ""
+    tuning: list[int] = []  # notes are represented as integers from 0 to 11
+    pedals: list[Pedal] = []
+    pedal_conflicts: list[tuple[str, str]] = []
+    max_nb_pedals: int = 3
+
+    def __init__(self, name: str, tuning: list[int], pedals: list[Pedal], pedal_conflicts: list[tuple[str, str]], max_nb_pedals: int = 3):
+        self.name = name
+        self.tuning = [note % 12 for note in tuning]
+        self.pedals = pedals
+        self.max_nb_pedals = max_nb_pedals
+
+        # canonical conflicts: sorted pairs of known pedals
+        pedal_names = [pedal.name for pedal in pedals]
+        if len(set(pedal_names)) != len(pedal_names):
+            raise ValueError("Duplicated pedal name!")
+        for pedal in pedals:
+            for string, _ in pedal.changes:
+                if string < 0 or string >= len(self.tuning):
+                    raise ValueError(f"Invalid string number for pedal {pedal.name}!")
+        self.pedal_conflicts = sorted(set((min(a, b), max(a, b)) for a, b in pedal_conflicts if a in pedal_names and b in pedal_names))
+
+    @staticmethod
+    def init_from_fretboard(fretboard: Fretboard, name: str = "") -> Copedent:
+        return Copedent(name, fretboard.tuning, fretboard.pedals, fretboard.pedal_conflicts, fretboard.max_nb_pedals)
+
+    @staticmethod
+    def init_from_json(json_dict: dict) -> Copedent:
+        pedals = [Pedal.init_from_changes(pedal["name"], [(change[0], change[1]) for change in pedal["changes"]]) for pedal in json_dict.get("pedals", [])]
+        conflicts = [(conflict[0], conflict[1]) for conflict in json_dict.get("conflicts", [])]
+        tuning = [convert_str_note_to_int(note) if isinstance(note, str) else note for note in json_dict["tuning"]]
+
+        return Copedent(json_dict.get("name", ""), tuning, pedals, conflicts, json_dict.get("max_nb_pedals", 3))
+
+    @staticmethod
+    def load(filepath: Path) -> Copedent:
+        with open(filepath) as file:
+            return Copedent.init_from_json(json.load(file))
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "tuning": convert_int_notes_to_str(self.tuning, as_sharps=True),
+            "pedals": [{"name": pedal.name, "changes": [list(change) for change in pedal.changes]} for pedal in self.pedals],
+            "conflicts": [list(conflict) for conflict in self.pedal_conflicts],
+            "max_nb_pedals": self.max_nb_pedals,
+        }
+
+    def get_hash(self) -> str:
+        """Stable hash of everything that changes generated voicings: the name is not part of it, but pedal order is
+        since it gives the order of pedal combinations"""
+        canonical = {
+            "tuning": self.tuning,
+            "pedals": [[pedal.name, sorted([list(change) for change in pedal.changes])] for pedal in self.pedals],
+            "conflicts": [list(conflict) for conflict in self.pedal_conflicts],
+            "max_nb_pedals": self.max_nb_pedals,
+        }
+        encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+        return hashlib.sha256(encoded).hexdigest()
+
+    def to_fretboard(self) -> Fretboard:
+        fretboard = Fretboard(list(self.tuning))
+        fretboard.pedals = list(self.pedals)
+        fretboard.pedal_conflicts = list(self.pedal_conflicts)
+        fretboard.max_nb_pedals = self.max_nb_pedals
+
+        return fretboard
@@ -0,0 +1,234 @@
+"""Extended voicing search: besides straight bar positions, open strings played against a fretted bar (split voicings),
+forward and reverse bar slants, and frets up to 24
+
+A bar position is a bar fret, a slant and a range of strings covered by the bar:
+    straight bar: all strings of the range are at the bar fret, strings outside of the range can ring open
+    slanted bar: the bar goes from the bar fret on its first string to bar fret + slant on its last string (forward slant when slant > 0,
+        the bar is at a higher fret on treble strings), only strings where the bar crosses a fret are in tune and can be played
+As in ChordGenerator, each position plays all its strings that are chord tones, so voicings are the largest ones of each position.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+
+from fretboard.chords import Voicing, MUTED_FRET, get_pedal_mask
+from fretboard.fretboard import Fretboard
+from fretboard.metrics import metrics
+from fretboard.notes_utils import PitchClassSet
+
+
+class ExtendedVoicingSearch:
+    """Branch-and-bound search of voicings over (pedal combination, bar fret, slant, strings covered by the bar)
+
+    Each branch is pruned as soon as the chord tones it can still reach, as bitmasks of pitch classes, miss a tone of the chord:
+    a bar fret is skipped when its strings (at any slant) and the open strings can't complete the chord, a range of strings
+    when the strings it covers and the open strings around it can't, and a slant when its end strings are not chord tones.
+    """
+
+    fretboard: Fretboard
+    max_fret: int = 24
+    max_slant: int = 2  # max number of frets between both ends of a slanted bar
+    min_strings_per_fret: int = 1  # a slanted bar moves at most one fret per this number of strings (playability)
+    with_open_strings: bool = True
+    _pedal_combinations: list[list[str]] = []
+    _pedal_masks: list[int] = []
+    _pedal_string_masks: list[list[int]] = []  # (pedal combination, pedal) -> bitmask of strings changed by the pedal
+
+    def __init__(self, fretboard: Fretboard, max_fret: int = 24, max_slant: int = 2, min_strings_per_fret: int = 1, with_open_strings: bool = True):
+        if max_fret < 1 or max_slant < 0 or min_strings_per_fret < 1:
+            raise ValueError("Invalid extended search bounds!")
+
+        self.fretboard = fretboard
+        self.max_fret = max_fret
+        self.max_slant = max_slant
+        self.min_strings_per_fret = min_strings_per_fret
+        self.with_open_strings = with_open_strings
+
+        pedals_by_name = {pedal.name: pedal for pedal in fretboard.pedals}
+        self._pedal_combinations = fretboard.get_all_pedal_combinations()
+        self._pedal_masks = [get_pedal_mask(pedal_combination) for pedal_combination in self._pedal_combinations]
+        self._pedal_string_masks = [
+            [sum({1 << string for string, _ in pedals_by_name[pedal].changes}) for pedal in pedal_combination] for pedal_combination in self._pedal_combinations
+        ]
+
+    def search(self, formula: list[str] | PitchClassSet, key: str) -> list[Voicing]:
+        """Get voicings of a chord at all bar positions, sorted by bar fret
+
+        Fretted strings are at frets 1 to max_fret, open strings at fret 0.
+        """
+        formula_mask = (formula if isinstance(formula, PitchClassSet) else PitchClassSet.from_str_intervals(formula)).mask
+        nb_strings = len(self.fretboard.tuning)
+        slants = [slant for slant in range(-self.max_slant, self.max_slant + 1) if slant != 0]
+
+        # chord tone bit of each string at each fret, 0 when not a chord tone, with shape (pedal combination, fret, string)
+        intervals = self.fretboard.get_intervals_tensor(self._pedal_combinations, key=key, nb_frets=self.max_fret + 1)
+        tones = (np.left_shift(1, intervals) & formula_mask).transpose(1, 0, 2).tolist()
+
+        found: dict[Voicing, int] = {}  # voicing -> bar fret
+        nb_pruned_frets = nb_pruned_ranges = nb_positions = 0
+        for i_combination, combination_tones in enumerate(tones):
+            open_tones = combination_tones[0] if self.with_open_strings else [0] * nb_strings
+            self._add_position(found, formula_mask, i_combination, 0, combination_tones[0], 0, nb_strings - 1, [0] * nb_strings)
+
+            # chord tones of open strings below each string, and above each string
+            open_below = [0] * (nb_strings + 1)
+            open_above = [0] * (nb_strings + 1)
+            for string in range(nb_strings):
+                open_below[string + 1] = open_below[string] | open_tones[string]
+                open_above[nb_strings - 1 - string] = open_above[nb_strings - string] | open_tones[nb_strings - 1 - string]
+            fret_unions = [0] * (self.max_fret + 1)
+            for fret in range(1, self.max_fret + 1):
+                for tone in combination_tones[fret]:
+                    fret_unions[fret] |= tone
+
+            for fret in range(1, self.max_fret + 1):
+                # bound: tones at this fret, at slanted frets and on open strings
+                reachable = open_below[nb_strings]
+                for other_fret in range(max(1, fret - self.max_slant), min(self.max_fret, fret + self.max_slant) + 1):
+                    reachable |= fret_unions[other_fret]
+                if reachable & formula_mask != formula_mask:
+                    nb_pruned_frets += 1
+                    continue
+
+                fret_tones = combination_tones[fret]
+                nb_pruned_ranges += self._search_straight(found, formula_mask, i_combination, fret, fret_tones, open_tones, open_below, open_above)
+                for slant in slants:
+                    if 1 <= fret + slant <= self.max_fret:
+                        nb_positions += self._search_slant(found, formula_mask, i_combination, fret, slant, combination_tones, open_tones, open_below, open_above)
+
+        if metrics.enabled:
+            metrics.increment("extended_search_pruned", nb_pruned_frets, branch="fret")
+            metrics.increment("extended_search_pruned", nb_pruned_ranges, branch="range")
+            metrics.increment("extended_search_slanted_positions", nb_positions)
+            metrics.increment("generation_voicings", len(found), engine="extended")
+
+        return sorted(found, key=found.__getitem__)
+
+    def _search_straight(self, found: dict[Voicing, int], formula_mask: int, i_combination: int, fret: int, fret_tones: list[int], open_tones: list[int], open_below: list[int], open_above: list[int]) -> int:
+        """Add voicings of a straight bar at a fret for all ranges of strings, returns number of pruned ranges"""
+        nb_strings = len(fret_tones)
+        if not self.with_open_strings:
+            self._add_position(found, formula_mask, i_combination, fret, fret_tones, 0, nb_strings - 1, open_tones)
+            return 0
+
+        # tones on fretted strings from each string to the last one
+        fretted_above = [0] * (nb_strings + 1)
+        for string in range(nb_strings - 1, -1, -1):
+            fretted_above[string] = fretted_above[string + 1] | fret_tones[string]
+
+        nb_pruned = 0
+        for lowest in range(nb_strings):
+            # bound: open strings below the bar, and fretted or open strings from its first string
+            if (open_below[lowest] | fretted_above[lowest] | open_above[lowest]) & formula_mask != formula_mask:
+                nb_pruned += 1
+                continue
+
+            covered = open_below[lowest]
+            for highest in range(lowest, nb_strings):
+                covered |= fret_tones[highest]
+                # the bar ends on a played string, else the same voicing is found with a shorter bar
+                if fret_tones[highest] and (covered | open_above[highest + 1]) == formula_mask:
+                    self._add_position(found, formula_mask, i_combination, fret, fret_tones, lowest, highest, open_tones)
+
+        return nb_pruned
+
+    def _search_slant(
+        self,
+        found: dict[Voicing, int],
+        formula_mask: int,
+        i_combination: int,
+        fret: int,
+        slant: int,
+        combination_tones: list[list[int]],
+        open_tones: list[int],
+        open_below: list[int],
+        open_above: list[int],
+    ) -> int:
+        """Add voicings of a bar slanted from fret on its first string to fret + slant on its last string, returns number of positions tried"""
+        nb_strings = len(open_tones)
+        fret_tones = combination_tones[fret]
+        end_tones = combination_tones[fret + slant]
+        nb_positions = 0
+
+        for lowest in range(nb_strings):
+            # both ends of a slanted bar are played
+            if not fret_tones[lowest]:
+                continue
+
+            for highest in range(lowest + abs(slant) * self.min_strings_per_fret, nb_strings):
+                if not end_tones[highest]:
+                    continue
+                nb_positions += 1
+
+                # strings where the bar crosses a fret
+                span = highest - lowest
+                frets = [MUTED_FRET] * nb_strings
+                covered = open_below[lowest] | open_above[highest + 1]
+                for string in range(lowest, highest + 1):
+                    if slant * (string - lowest) % span == 0:
+                        string_fret = fret + slant * (string - lowest) // span
+                        tone = combination_tones[string_fret][string]
+                        if tone:
+                            frets[string] = string_fret
+                            covered |= tone
+                if covered != formula_mask:
+                    continue
+
+                for string in range(nb_strings):
+                    if (string < lowest or string > highest) and open_tones[string]:
+                        frets[string] = 0
+                self._add_voicing(found, i_combination, min(fret, fret + slant), frets)
+
+        return nb_positions
+
+    def _add_position(self, found: dict[Voicing, int], formula_mask: int, i_combination: int, fret: int, fret_tones: list[int], lowest: int, highest: int, open_tones: list[int]):
+        """Add voicing of a straight bar covering strings from lowest to highest, when it is a complete chord"""
+        frets = []
+        covered = 0
+        for string, (fret_tone, open_tone) in enumerate(zip(fret_tones, open_tones)):
+            if lowest <= string <= highest:
+                frets.append(fret if fret_tone else MUTED_FRET)
+                covered |= fret_tone
+            else:
+                frets.append(0 if open_tone else MUTED_FRET)
+                covered |= open_tone
+        if covered == formula_mask:
+            self._add_voicing(found, i_combination, fret, frets)
+
+    def _add_voicing(self, found: dict[Voicing, int], i_combination: int, fret: int, frets: list[int]):
+        # all pedals must change a played string
+        played_strings = 0
+        for string, string_fret in enumerate(frets):
+            if string_fret != MUTED_FRET:
+                played_strings |= 1 << string
+        for pedal_strings in self._pedal_string_masks[i_combination]:
+            if not pedal_strings & played_strings:
+                return
+
+        voicing = Voicing.init_from_packed(bytes(frets), self._pedal_masks[i_combination])
+        if voicing not in found:
+            found[voicing] = fret
+
+
+def generate_extended_voicings(fretboard: Fretboard, formula: list[str] | PitchClassSet, key: str, max_fret: int = 24, max_slant: int = 2) -> list[Voicing]:
+    """Voicings of straight and slanted bars, with open strings, up to max_fret (see ExtendedVoicingSearch)"""
+    return ExtendedVoicingSearch(fretboard, max_fret, max_slant).search(formula, key)
+
+
+if __name__ == "__main__":
+    from fretboard.chord_generator import CHORD_FORMULAS
+
+    parser = argparse.ArgumentParser(description="Print voicings of a chord found by the extended search (slanted bars, open strings, frets up to 24)")
+    parser.add_argument("key")
+    parser.add_argument("chord_type", choices=list(CHORD_FORMULAS))
+    parser.add_argument("--max-fret", type=int, default=24)
+    parser.add_argument("--max-slant", type=int, default=2)
+    parser.add_argument("--no-open-strings", action="store_true")
+    args = parser.parse_args()
+
+    search = ExtendedVoicingSearch(Fretboard.init_as_pedal_steel_e9(), args.max_fret, args.max_slant, with_open_strings=not args.no_open_strings)
+    for voicing in search.search(CHORD_FORMULAS[args.chord_type], args.key):
+        print(" ".join("x" if note is None else str(note) for note in voicing.notes), " ".join(voicing.pedals))
@@ -2,9 +2,18 @@ from __future__ import annotations
 from typing import Optional, Any
 from copy import copy
 
+import numpy as np
+
 from fretboard.chords import Voicing
-from fretboard.pedal import Pedal, E9_PEDAL_CHANGES
-from fretboard.notes_utils import convert_str_note_to_int, convert_str_notes_to_int, convert_int_notes_to_str, convert_int_interval_to_str
+from fretboard.metrics import metrics
+from fretboard.pedal import Pedal, E9_PEDAL_CHANGES, E9_PEDAL_CONFLICTS
+from fretboard.notes_utils import convert_str_note_to_int, convert_str_notes_to_int, convert_int_notes_to_str, convert_int_interval_to_str, INTERVAL_NAMES, PitchClassSet
+
+FRETBOARD_NAMES: list[str] = ["Standard", "Open E", "E9"]
+SCALE_INTERVALS: dict[str, list[int]] = {"Major": [0, 2, 4, 5, 7, 9, 11], "Pentatonic Major": [0, 2, 4, 7, 9]}
+
+# interval labels indexed by interval, -1 (last item) for notes out of scale
+_INTERVAL_LABELS: np.ndarray = np.array(INTERVAL_NAMES + [None], dtype=object)
 
 
 class Fretboard:
@@ -12,15 +21,31 @@ class Fretboard:
 
     tuning: list[int] = []  # notes are represented as integers from 0 to 11
     pedals: list[Pedal] = []  # pedals (or levers)
+    pedal_conflicts: list[tuple[str, str]] = []  # pairs of pedals that can't be applied together
+    max_nb_pedals: int = 3  # max number of pedals applied at the same time
 
     def __init__(self, tuning: list[int]):
         self.tuning = tuning
+        self.pedals = []
+        self.pedal_conflicts = []
 
     @staticmethod
     def init_from_tuning(tuning: list[str]) -> Fretboard:
         fretboard = Fretboard(convert_str_notes_to_int(tuning))
         return fretboard
 
+    @staticmethod
+    def init_from_name(name: str) -> Fretboard:
+        """Init fretboard from tuning name, see FRETBOARD_NAMES"""
+        if name == "Standard":
+            return Fretboard.init_as_guitar_standard()
+        elif name == "Open E":
+            return Fretboard.init_as_guitar_open_e()
+        elif name == "E9":
+            return Fretboard.init_as_pedal_steel_e9()
+
+        raise ValueError("Invalid fretboard name!")
+
     @staticmethod
     def init_as_guitar_standard() -> Fretboard:
         return Fretboard.init_from_tuning(["E", "A", "D", "G", "G", "E"])
@@ -34,6 +59,7 @@ class Fretboard:
         fretboard = Fretboard.init_from_tuning(["B", "D", "E", "F#", "G#", "B", "E", "G#", "D#", "F#"])
         for pedal in E9_PEDAL_CHANGES.keys():
             fretboard.pedals.append(Pedal.init_from_name(pedal))
+        fretboard.pedal_conflicts = list(E9_PEDAL_CONFLICTS)
 
         return fretboard
 
@@ -73,13 +99,13 @@ class Fretboard:
 
     def generate_major_pentatonic_scale_as_integers(self, key: str, start_fret: int, end_fret: int) -> list[list[Optional[int]]]:
         """Generate major pentatonic scale notes for given key ; a fretboard scale contains a string scale for each string (Optional ints)"""
-        intervals = [0, 2, 4, 7, 9]
+        intervals = SCALE_INTERVALS["Pentatonic Major"]
 
         return self.generate_scale_as_integers(key, intervals, start_fret, end_fret)
 
     def generate_major_scale_as_integers(self, key: str, start_fret: int, end_fret: int) -> list[list[Optional[int]]]:
         """Generate major scale notes for given key ; a fretboard scale contains a string scale for each string (Optional ints)"""
-        intervals = [0, 2, 4, 5, 7, 9, 11]
+        intervals = SCALE_INTERVALS["Major"]
 
         return self.generate_scale_as_integers(key, intervals, start_fret, end_fret)
 
@@ -88,6 +114,26 @@ class Fretboard:
 
         return self.convert_fretboard_scale_to_intervals(key, fretboard_scale)
 
+    def generate_scale_grids(self, scale_names: list[str], start_fret: int = 0, end_fret: int = 12) -> tuple[np.ndarray, np.ndarray]:
+        """Generate given scales (names of SCALE_INTERVALS) in all 12 keys at once, batched version of generate_scale_as_integers
+        and convert_fretboard_scale_to_intervals
+
+        Returns:
+            np.ndarray: notes as int with shape (scale, key, string, fret), -1 for notes out of scale
+            np.ndarray: intervals as str (object array) with same shape, None for notes out of scale ; grid[i_scale, key].tolist() is a fretboard scale
+        """
+        frets = np.arange(start_fret, end_fret + 1, dtype=np.int16)
+        notes = (np.array(self.tuning, dtype=np.int16)[:, None] + frets[None, :]) % 12  # (string, fret)
+        intervals = (notes[None, :, :] - np.arange(12, dtype=np.int16)[:, None, None]) % 12  # (key, string, fret)
+
+        scale_masks = np.array([PitchClassSet.from_ints(SCALE_INTERVALS[name]).mask for name in scale_names], dtype=np.int16)
+        is_in_scale = (scale_masks[:, None, None, None] >> intervals[None, :, :, :]) & 1 == 1
+
+        notes_grid = np.where(is_in_scale, notes[None, None, :, :], -1)
+        intervals_grid = np.where(is_in_scale, intervals[None, :, :, :], -1)
+
+        return notes_grid, _INTERVAL_LABELS[intervals_grid]
+
     def generate_voicing(self, voicing: Voicing) -> list[list[Optional[int]]]:
         base_key_as_int = convert_str_note_to_int("C")
         fretboard_scale: list[list[Optional[int]]] = []
@@ -115,7 +161,8 @@ class Fretboard:
         return fretboard_scale
 
     def get_all_pedal_combinations(self) -> list[list[str]]:
-        return Pedal.get_all_pedal_combinations([pedal.name for pedal in self.pedals])
+        with metrics.timer("generation_stage_seconds", stage="pedal_combinations"):
+            return Pedal.get_all_pedal_combinations([pedal.name for pedal in self.pedals], self.pedal_conflicts, self.max_nb_pedals)
 
     def get_intervals_at_fret(self, fret: int, pedals: list[Pedal], key: str = "E") -> list[int]:
         """Get notes as interval (as int) at given fret with given pedals applied
@@ -138,6 +185,39 @@ class Fretboard:
 
         return intervals_at_fret
 
+    def get_intervals_tensor(self, pedal_combinations: list[list[str]], key: str = "E", nb_frets: int = 12) -> np.ndarray:
+        """Get notes as interval (as int) for all frets and pedal combinations at once, batched version of get_intervals_at_fret
+
+        Args:
+            pedal_combinations (list[list[str]]): pedal combinations to apply, as pedal names
+            key (str): key the intervals are relative to
+            nb_frets (int): frets from 0 to nb_frets - 1 are computed
+
+        Returns:
+            np.ndarray: intervals with shape (fret, pedal combination, string)
+        """
+        with metrics.timer("generation_stage_seconds", stage="intervals_tensor"):
+            return self._get_intervals_tensor(pedal_combinations, key, nb_frets)
+
+    def _get_intervals_tensor(self, pedal_combinations: list[list[str]], key: str, nb_frets: int) -> np.ndarray:
+        key_as_int = convert_str_note_to_int(key)
+        pedals_by_name = {pedal.name: pedal for pedal in self.pedals}
+
+        # shift applied to each string by each pedal combination
+        shifts = np.zeros((len(pedal_combinations), len(self.tuning)), dtype=np.int16)
+        for i_combination, pedal_combination in enumerate(pedal_combinations):
+            for pedal_name in pedal_combination:
+                if pedal_name not in pedals_by_name:
+                    raise ValueError("Invalid pedal")
+                for change in pedals_by_name[pedal_name].changes:
+                    shifts[i_combination, change[0]] += change[1]
+
+        frets = np.arange(nb_frets, dtype=np.int16)
+        open_notes = np.array(self.tuning, dtype=np.int16)
+        notes = frets[:, None, None] + open_notes[None, None, :] + shifts[None, :, :]
+
+        return (notes - key_as_int) % 12
+
     @staticmethod
     def convert_fretboard_scale_to_intervals(key: str, fretboard_scale: list[list[Optional[int]]], pedals_to_apply: Optional[list[Pedal]] = None) -> list[list[Optional[str]]]:
         fretboard_scale_as_intervals: list[Any] = copy(fretboard_scale)
@@ -0,0 +1,124 @@
+"""Opt-in instrumentation: counters and timings of generation stages and server requests, exposed as a snapshot or as Prometheus text
+
+Instrumentation is disabled by default, instrumented code checks metrics.enabled before measuring anything so it costs a bool check.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+# metric name and labels, like ("generation_rejected", (("reason", "incomplete_chord"),))
+MetricKey = tuple[str, tuple[tuple[str, str], ...]]
+
+METRICS_PREFIX: str = "fretboard_"
+
+_DISABLED_TIMER = nullcontext()
+
+
+class Metrics:
+    """Registry of counters and timings (count, sum and max of durations in seconds), each identified by a name and labels"""
+
+    enabled: bool = False
+    _counters: dict[MetricKey, float] = {}
+    _timings: dict[MetricKey, list[float]] = {}  # count, sum, max
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._counters = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        """Record a duration"""
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            timing = self._timings.setdefault(key, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def timer(self, name: str, **labels: str):
+        """Context manager recording duration of its block, like: with metrics.timer("generation_stage_seconds", stage="subset_filter")"""
+        if not self.enabled:
+            return _DISABLED_TIMER
+
+        return self._time(name, labels)
+
+    @contextmanager
+    def _time(self, name: str, labels: dict[str, str]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict[str, dict[str, dict]]:
+        """Copy of all metrics, like {"counters": {"generation_rejected": {'reason="incomplete_chord"': 12}}, "timings": {"generation_stage_seconds": {'stage="intervals"': {"count": 3, "sum": 0.01, "max": 0.005}}}}"""
+        snapshot: dict[str, dict[str, dict]] = {"counters": {}, "timings": {}}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                snapshot["counters"].setdefault(name, {})[_format_labels(labels)] = value
+            for (name, labels), (count, total, maximum) in self._timings.items():
+                snapshot["timings"].setdefault(name, {})[_format_labels(labels)] = {"count": count, "sum": total, "max": maximum}
+
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """All metrics in Prometheus text exposition format: counters get a _total suffix, timings are summaries (_count and _sum)
+        with a _max gauge"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, values in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name}_total counter")
+            lines += [f"{METRICS_PREFIX}{name}_total{_wrap_labels(labels)} {_format_value(value)}" for labels, value in sorted(values.items())]
+        for name, values in sorted(snapshot["timings"].items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} summary")
+            for labels, timing in sorted(values.items()):
+                lines.append(f"{METRICS_PREFIX}{name}_count{_wrap_labels(labels)} {timing['count']}")
+                lines.append(f"{METRICS_PREFIX}{name}_sum{_wrap_labels(labels)} {_format_value(timing['sum'])}")
+            lines.append(f"# TYPE {METRICS_PREFIX}{name}_max gauge")
+            lines += [f"{METRICS_PREFIX}{name}_max{_wrap_labels(labels)} {_format_value(timing['max'])}" for labels, timing in sorted(values.items())]
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    escaped = [(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels]
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+def _wrap_labels(labels: str) -> str:
+    return "{" + labels + "}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# registry used by the generator, the fretboard and the servers
+metrics = Metrics()
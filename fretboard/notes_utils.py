@@ -1,5 +1,17 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, Optional
+
+
 MUTED_STRING_CHAR: str = "x"
 
+# lookup tables, indexed by note (or interval) as int
+NOTE_NAMES_AS_SHARPS: list[str] = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+NOTE_NAMES_AS_FLATS: list[str] = ["C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B"]
+INTERVAL_NAMES: list[str] = ["1", "b2", "2", "b3", "3", "4", "b5", "5", "b6", "6", "b7", "7"]
+
+NOTE_MAP: dict[str, int] = {**{name: i for i, name in enumerate(NOTE_NAMES_AS_SHARPS)}, **{name: i for i, name in enumerate(NOTE_NAMES_AS_FLATS)}}
+INTERVAL_MAP: dict[str, int] = {"1": 0, "b2": 1, "2": 2, "b3": 3, "3": 4, "4": 5, "b5": 6, "5": 7, "#5": 8, "b6": 8, "6": 9, "bb7": 9, "b7": 10, "7": 11, "9": 2, "11": 5, "13": 9}
+
 
 def convert_str_notes_to_int(notes: list[str]) -> list[int]:
     return [convert_str_note_to_int(note) for note in notes]
@@ -10,76 +22,92 @@ def convert_int_notes_to_str(notes: list[int], as_sharps: bool = False) -> list[
 
 
 def convert_str_note_to_int(note: str) -> int:
-    if note == "C":
-        return 0
-    elif note == "C#" or note == "Db":
-        return 1
-    elif note == "D":
-        return 2
-    elif note == "D#" or note == "Eb":
-        return 3
-    elif note == "E":
-        return 4
-    elif note == "F":
-        return 5
-    elif note == "F#" or note == "Gb":
-        return 6
-    elif note == "G":
-        return 7
-    elif note == "G#" or note == "Ab":
-        return 8
-    elif note == "A":
-        return 9
-    elif note == "A#" or note == "Bb":
-        return 10
-    elif note == "B":
-        return 11
+    if note in NOTE_MAP:
+        return NOTE_MAP[note]
 
     raise ValueError("Invalid note!")
 
 
 def convert_int_note_to_str(note: int, as_sharps: bool = False) -> str:
-    if note == 0:
-        return "C"
-    elif note == 1:
-        return "Db" if not as_sharps else "C#"
-    elif note == 2:
-        return "D"
-    elif note == 3:
-        return "Eb" if not as_sharps else "D#"
-    elif note == 4:
-        return "E"
-    elif note == 5:
-        return "F"
-    elif note == 6:
-        return "Gb" if not as_sharps else "F#"
-    elif note == 7:
-        return "G"
-    elif note == 8:
-        return "Ab" if not as_sharps else "G#"
-    elif note == 9:
-        return "A"
-    elif note == 10:
-        return "Bb" if not as_sharps else "A#"
-    elif note == 11:
-        return "B"
+    if note in range(12):
+        return NOTE_NAMES_AS_SHARPS[note] if as_sharps else NOTE_NAMES_AS_FLATS[note]
 
     raise ValueError("Invalid note!")
 
 
 def convert_int_interval_to_str(note: int) -> str:
-    reversed_interval_map = {0: "1", 1: "b2", 2: "2", 3: "b3", 4: "3", 5: "4", 6: "b5", 7: "5", 8: "b6", 9: "6", 10: "b7", 11: "7"}
-
-    if note in reversed_interval_map:
-        return reversed_interval_map[note]
+    if note in range(12):
+        return INTERVAL_NAMES[note]
     else:
         raise ValueError("Invalid interval value!")
 
 
 def convert_str_interval_to_int(interval: str) -> int:
-    interval_map = {"1": 0, "b2": 1, "2": 2, "b3": 3, "3": 4, "4": 5, "b5": 6, "5": 7, "#5": 8, "b6": 8, "6": 9, "bb7": 9, "b7": 10, "7": 11, "9": 2, "11": 5, "13": 9}
-
-    if interval in interval_map:
-        return interval_map[interval]
+    if interval in INTERVAL_MAP:
+        return INTERVAL_MAP[interval]
     else:
         raise ValueError("Invalid interval name!")
+
+
+class PitchClassSet:
+    """Set of pitch classes (or intervals) stored as a 12-bit integer: bit i is set when pitch class i is in the set"""
+
+    __slots__ = ("mask",)
+
+    mask: int
+
+    def __init__(self, mask: int = 0):
+        self.mask = mask & 0xFFF
+
+    @staticmethod
+    def from_ints(notes: Iterable[Optional[int]]) -> PitchClassSet:
+        """Build set from notes or intervals as integers, None (muted string) is ignored"""
+        mask = 0
+        for note in notes:
+            if note is not None:
+                mask |= 1 << (note % 12)
+
+        return PitchClassSet(mask)
+
+    @staticmethod
+    def from_str_intervals(intervals: list[str]) -> PitchClassSet:
+        """Build set from intervals as str, like a chord formula (["1", "3", "5"])"""
+        return PitchClassSet.from_ints(convert_str_interval_to_int(interval) for interval in intervals)
+
+    def to_ints(self) -> list[int]:
+        return [i for i in range(12) if self.mask >> i & 1]
+
+    def issubset(self, other: PitchClassSet) -> bool:
+        return self.mask & other.mask == self.mask
+
+    def issuperset(self, other: PitchClassSet) -> bool:
+        return self.mask & other.mask == other.mask
+
+    def transpose(self, semitones: int) -> PitchClassSet:
+        """Return set with all pitch classes shifted by given number of semitones"""
+        shift = semitones % 12
+        return PitchClassSet((self.mask << shift) | (self.mask >> (12 - shift)))
+
+    def __contains__(self, note: int) -> bool:
+        return bool(self.mask >> (note % 12) & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_ints())
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __or__(self, other: PitchClassSet) -> PitchClassSet:
+        return PitchClassSet(self.mask | other.mask)
+
+    def __and__(self, other: PitchClassSet) -> PitchClassSet:
+        return PitchClassSet(self.mask & other.mask)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PitchClassSet) and self.mask == other.mask
+
+    def __hash__(self) -> int:
+        return self.mask
+
+    def __repr__(self) -> str:
+        return f"PitchClassSet({self.to_ints()})"
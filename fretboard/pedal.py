@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-import itertools
+import functools
+from typing import Optional
 
 E9_PEDAL_CHANGES: dict[str, list[tuple[int, int]]] = {
     "A": [(0, 2), (5, 2)],
@@ -14,6 +15,17 @@ E9_PEDAL_CHANGES: dict[str, list[tuple[int, int]]] = {
     "D/2": [(8, -1)],
 }
 
+# pedals that can't be applied at the same time
+E9_PEDAL_CONFLICTS: list[tuple[str, str]] = [
+    ("A", "A/2"),
+    ("D", "D/2"),
+    ("A", "C"),
+    ("A/2", "C"),
+    ("E", "F"),
+    ("D", "G"),
+    ("D/2", "G"),
+]
+
 # PEDAL_COMBINATIONS: list[list[str]] = [["A"], ["B"], ["C"], ["A", "B"], ["B", "C"], ["E"], ["F"], ["A", "E"], ["A", "F"], ["B", "F"], ["B", "F"], ["G"], ""]
 
 
@@ -32,33 +44,62 @@ class Pedal:
         return pedal
 
     @staticmethod
-    def get_all_pedal_combinations(pedals: list[str]) -> list[list[str]]:
-        list = [[]]  # init with no pedal
-        for i in range(1, 3 + 1):
-            list += unique_combinations(pedals, i)
-
-        # Delete impossible combinations
-        to_delete = []
-        for i, combination in enumerate(list):
-            if (
-                ("A" in combination and "A/2" in combination)
-                or ("D" in combination and "D/2" in combination)
-                or ("A" in combination and "C" in combination)
-                or ("A/2" in combination and "C" in combination)
-                or ("E" in combination and "F" in combination)
-                or ("D" in combination and "G" in combination)
-                or ("D/2" in combination and "G" in combination)
-            ):
-                to_delete.append(i)
-
-        for i in sorted(to_delete, reverse=True):
-            del list[i]
-
-        return list
-
-
-def unique_combinations(iterable, r):
-    combinations = itertools.combinations(iterable, r)
-    combinations_as_list = list(combinations)
-    combinations_as_list = [list(combination_as_tuple) for combination_as_tuple in combinations_as_list]
-    return combinations_as_list
+    def init_from_changes(name: str, changes: list[tuple[int, int]]) -> Pedal:
+        """Init pedal or lever which is not part of E9 copedent"""
+        pedal = Pedal()
+        pedal.name = name
+        pedal.changes = changes
+
+        return pedal
+
+    @staticmethod
+    def get_all_pedal_combinations(pedals: list[str], conflicts: Optional[list[tuple[str, str]]] = None, max_nb_pedals: int = 3) -> list[list[str]]:
+        """Get all combinations of up to max_nb_pedals pedals (including no pedal), without conflicting pedals
+
+        Args:
+            pedals (list[str]): pedal names
+            conflicts (Optional[list[tuple[str, str]]]): pairs of pedals that can't be applied together, E9 ones by default
+            max_nb_pedals (int): max number of pedals applied at the same time
+
+        Returns:
+            list[list[str]]: combinations, by number of pedals then in pedals order
+        """
+        if conflicts is None:
+            conflicts = E9_PEDAL_CONFLICTS
+
+        normalized_conflicts = tuple(sorted(set(tuple(sorted(conflict)) for conflict in conflicts)))
+        combinations = _enumerate_pedal_combinations(tuple(pedals), normalized_conflicts, max_nb_pedals)
+
+        return [list(combination) for combination in combinations]
+
+    @staticmethod
+    def clear_combination_cache():
+        """Forget combinations enumerated by get_all_pedal_combinations, like to time their enumeration"""
+        _enumerate_pedal_combinations.cache_clear()
+
+
+@functools.lru_cache(maxsize=64)
+def _enumerate_pedal_combinations(pedals: tuple[str, ...], conflicts: tuple[tuple[str, ...], ...], max_nb_pedals: int) -> tuple[tuple[str, ...], ...]:
+    """Enumerate combinations on the conflict graph: a combination is only extended with pedals not conflicting with any of its pedals,
+    so conflicting combinations are never built. Cached for each copedent."""
+    indices = {pedal: i for i, pedal in enumerate(pedals)}
+    conflict_masks = [0] * len(pedals)  # bit j of conflict_masks[i] is set when pedals i and j conflict
+    for pedal_1, pedal_2 in conflicts:
+        if pedal_1 in indices and pedal_2 in indices:
+            conflict_masks[indices[pedal_1]] |= 1 << indices[pedal_2]
+            conflict_masks[indices[pedal_2]] |= 1 << indices[pedal_1]
+
+    # combinations of n pedals are built by extending those of n - 1 pedals with a later pedal, which keeps itertools.combinations order
+    level: list[tuple[tuple[int, ...], int]] = [((), 0)]  # pedal indices, mask of pedals conflicting with combination
+    combinations: list[tuple[int, ...]] = [()]
+    for _ in range(max_nb_pedals):
+        next_level = []
+        for combination, conflict_mask in level:
+            for i in range(combination[-1] + 1 if combination else 0, len(pedals)):
+                if not conflict_mask >> i & 1:
+                    next_level.append((combination + (i,), conflict_mask | conflict_masks[i]))
+
+        level = next_level
+        combinations += [combination for combination, _ in level]
+
+    return tuple(tuple(pedals[i] for i in combination) for combination in combinations)
@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import json
+import unittest
+from unittest import mock
+
+import asgi_app
+from fretboard.metrics import metrics
+
+
+async def call(method: str, path: str, query_string: bytes = b"", headers: tuple[tuple[bytes, bytes], ...] = ()) -> tuple[int, dict[bytes, bytes], bytes, int]:
+    """Drive the ASGI app with a request, returns status, headers, body and number of body messages"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: dict):
+        messages.append(message)
+
+    await asgi_app.app({"type": "http", "method": method, "path": path, "query_string": query_string, "headers": list(headers)}, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"]), b"".join(message.get("body", b"") for message in messages[1:]), len(messages) - 1
+
+
+class TestAsgiApp(unittest.IsolatedAsyncioTestCase):
+
+    async def test_page(self):
+        status, headers, body, _ = await call("GET", "/", b"key=A&chord=m7&voicing=1")
+        self.assertEqual(status, 200)
+        self.assertEqual(int(headers[b"content-length"]), len(body))
+
+        status, _, body, _ = await call("GET", "/", b"key=A&chord=m7&voicing=1", ((b"if-none-match", headers[b"etag"]),))
+        self.assertEqual((status, body), (304, b""))
+
+        status, gzipped_headers, gzipped_body, _ = await call("GET", "/", b"key=A&chord=m7&voicing=1", ((b"accept-encoding", b"gzip"),))
+        self.assertEqual(gzipped_headers[b"content-encoding"], b"gzip")
+        self.assertEqual(gzip.decompress(gzipped_body), (await call("GET", "/", b"key=A&chord=m7&voicing=1"))[2])
+
+        status, head_headers, body, _ = await call("HEAD", "/", b"key=A&chord=m7&voicing=1")
+        self.assertEqual((status, body, head_headers[b"etag"]), (200, b"", headers[b"etag"]))
+
+    async def test_voicings(self):
+        status, headers, body, nb_messages = await call("GET", "/api/voicings", b"key=C&chord=M7")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b"content-type"], b"application/x-ndjson")
+        lines = body.splitlines()
+        self.assertGreater(nb_messages, 1)
+        self.assertEqual(set(json.loads(lines[0])), {"pedals", "notes", "intervals"})
+
+        _, headers, body, _ = await call("GET", "/api/voicings", b"key=C&chord=M7", ((b"accept-encoding", b"gzip"),))
+        self.assertEqual(headers[b"content-encoding"], b"gzip")
+        self.assertEqual(gzip.decompress(body).splitlines(), lines)
+
+        status, _, body, _ = await call("GET", "/api/voicings", b"key=C&chord=M7&extended=1")
+        self.assertEqual(status, 200)
+        self.assertGreater(len(body.splitlines()), len(lines))
+
+    async def test_errors(self):
+        self.assertEqual((await call("POST", "/"))[0], 405)
+        self.assertEqual((await call("GET", "/nope"))[0], 404)
+        self.assertEqual((await call("GET", "/api/voicings", b"copedent=nope"))[0], 404)
+        self.assertEqual((await call("GET", "/api/voicings", b"key=C&chord=nope"))[0], 400)
+        self.assertEqual((await call("GET", "/api/search", b"chord_type=nope"))[0], 400)
+        self.assertEqual((await call("GET", "/api/identify", b"fret=3&strings=10"))[0], 400)
+        self.assertEqual((await call("GET", "/api/voice-leading", b"progression=VIII"))[0], 400)
+        self.assertEqual((await call("GET", "/static/../flask_app.py"))[0], 404)
+        self.assertEqual((await call("GET", "/static/main.css"))[0], 200)
+
+    async def test_api(self):
+        status, _, body, _ = await call("GET", "/api/search", b"key=G&chord_type=M7&limit=3")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(body)), 3)
+        status, _, body, _ = await call("GET", "/api/identify", b"fret=0&strings=4,5,6")
+        self.assertIn({"key": "E", "chord": "M"}, json.loads(body))
+        status, _, body, _ = await call("GET", "/api/voice-leading", b"key=G&progression=I,V7")
+        self.assertEqual([chord["chord"] for chord in json.loads(body)["chords"]], ["M", "7"])
+
+    async def test_route_labels(self):
+        metrics.reset()
+        metrics.enable()
+        try:
+            await call("GET", "/api/voicings", b"key=C&chord=M&limit=1")
+            await call("GET", "/static/main.css")
+            await call("GET", "/nope/1")
+            _, _, body, _ = await call("GET", "/metrics")
+        finally:
+            metrics.disable()
+            metrics.reset()
+
+        text = body.decode("utf-8")
+        self.assertIn('fretboard_http_request_seconds_count{method="GET",route="/api/voicings",status="200"} 1', text)
+        self.assertIn('fretboard_http_request_seconds_count{method="GET",route="/static/<path>",status="200"} 1', text)
+        self.assertIn('fretboard_http_request_seconds_count{method="GET",route="unknown",status="404"} 1', text)
+
+    async def test_warm_up_errors_are_logged(self):
+        with mock.patch.object(asgi_app, "warm_up_voicings", side_effect=RuntimeError("generation failed")), self.assertLogs("asgi_app", "ERROR") as logs:
+            await asgi_app.warm_up()
+            self.assertEqual(len(asgi_app.warm_up_tasks), 1)
+            await asyncio.gather(*asgi_app.warm_up_tasks, return_exceptions=True)
+            await asyncio.sleep(0)
+
+        self.assertEqual(asgi_app.warm_up_tasks, set())
+        self.assertIn("generation failed", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fretboard import batch_generator
+from fretboard.batch_generator import generate_batch, get_output_filepath
+from fretboard.chord_generator import ChordGenerator
+
+
+class TestBatchGenerator(unittest.TestCase):
+
+    def test_generate_batch(self):
+        with tempfile.TemporaryDirectory() as directory:
+            results = generate_batch(["E9"], ["E", "F#"], ["M", "M7/6"], Path(directory), processes=2, show_progress=False)
+            self.assertEqual(len(results), 4)
+
+            path = get_output_filepath(Path(directory), ("E9", "F#", "M7/6"))
+            self.assertEqual(path, Path(directory) / "E9" / "F#" / "M7_6.json")
+
+            with open(path) as file:
+                data = json.load(file)
+            self.assertEqual(data["name"], "M7/6")
+            self.assertEqual(data["key"], "F#")
+
+            voicings = ChordGenerator.generate_e9_chords("F#")["M7/6"].voicings
+            self.assertEqual(results[("E9", "F#", "M7/6")], len(voicings))
+            self.assertEqual([voicing["pedals"] for voicing in data["voicings"]], [voicing.pedals for voicing in voicings])
+
+    def test_open_e_batch(self):
+        with open("data/open_e_generated_chords.json") as file:
+            open_e_chords = {chord["name"]: chord["voicings"] for chord in json.load(file)["chords"]}
+
+        with tempfile.TemporaryDirectory() as directory:
+            generate_batch(["Open E"], ["E"], list(open_e_chords), Path(directory), processes=2, show_progress=False)
+            for chord_type, voicings in open_e_chords.items():
+                with open(get_output_filepath(Path(directory), ("Open E", "E", chord_type))) as file:
+                    self.assertEqual(json.load(file)["voicings"], voicings)
+
+        # open E voicings are not filtered, like in generate_open_e_chords
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(batch_generator, "filter_dominated_voicings") as filter_dominated_voicings:
+            batch_generator._init_worker(Path(directory), 0, True, {})
+            batch_generator.run_task(("Open E", "A", "M"))
+            filter_dominated_voicings.assert_not_called()
+            batch_generator.run_task(("E9", "A", "M"))
+            filter_dominated_voicings.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
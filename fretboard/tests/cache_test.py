@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from fretboard.cache import ResultCache
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.copedent import Copedent
+from fretboard.fretboard import Fretboard
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_result_cache(self):
+        cache = ResultCache(max_size=2)
+        self.assertEqual(cache.get_or_compute(("hash", "a"), lambda: 1), 1)
+        self.assertEqual(cache.get_or_compute(("hash", "b"), lambda: 2), 2)
+        self.assertEqual(cache.get_or_compute(("hash", "a"), lambda: 3), 1)
+        self.assertEqual(cache.get_or_compute(("hash", "c"), lambda: 4), 4)
+        self.assertTrue(("hash", "b") not in cache)  # least recently used
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 3, 2))
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory=Path(directory))
+            chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True, cache=cache)
+            voicings = chord_generator.generate_voicings(CHORD_FORMULAS["m7"], "D")
+
+            # new process, same copedent
+            other_cache = ResultCache(directory=Path(directory))
+            other_chord_generator = ChordGenerator(Copedent.load(Path("data/copedents/e9.json")).to_fretboard(), cache=other_cache)
+            cached_voicings = other_chord_generator.generate_voicings(CHORD_FORMULAS["m7"], "D")
+            self.assertEqual(other_cache.misses, 0)
+            self.assertEqual([(v.notes, v.pedals) for v in cached_voicings], [(v.notes, v.pedals) for v in voicings])
+
+    def test_none_result(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return None
+
+        cache = ResultCache()
+        self.assertIsNone(cache.get_or_compute(("hash", "none"), compute))
+        self.assertIsNone(cache.get_or_compute(("hash", "none"), compute))
+        self.assertEqual((len(calls), cache.hits, cache.misses), (1, 1, 1))
+
+        with tempfile.TemporaryDirectory() as directory:
+            ResultCache(directory=Path(directory)).get_or_compute(("hash", "none"), compute)
+            other_cache = ResultCache(directory=Path(directory))
+            self.assertIsNone(other_cache.get_or_compute(("hash", "none"), compute))
+            self.assertEqual((len(calls), other_cache.misses), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fretboard.chord_atlas import ChordAtlas, build_chord_atlas
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.fretboard import Fretboard
+
+
+class TestChordAtlas(unittest.TestCase):
+
+    def test_chord_atlas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "chords.atlas"
+            build_chord_atlas(path, {"E9": Fretboard.init_as_pedal_steel_e9(), "Open E": Fretboard.init_as_guitar_open_e()}, min_nb_notes=4)
+            atlas = ChordAtlas.open(path)
+
+            self.assertEqual(atlas.get_chord_types("E9"), list(CHORD_FORMULAS.keys()))
+            self.assertEqual(atlas.tunings["E9"], (10, ["A", "A/2", "B", "C", "E", "F", "G", "D", "D/2"]))
+            self.assertEqual(atlas.tunings["Open E"], (6, []))
+
+            for key in ["E", "F#", "Gb"]:
+                chords = ChordGenerator.generate_e9_chords(key, min_nb_notes=4)
+                for chord_type, chord in chords.items():
+                    voicings = atlas.get_voicings("E9", key, chord_type)
+                    self.assertEqual([(v.notes, v.pedals) for v in voicings], [(v.notes, v.pedals) for v in chord.voicings])
+
+            self.assertFalse(atlas.has_voicings("C6", "E", "M"))
+            with self.assertRaises(KeyError):
+                atlas.get_voicings("E9", "E", "M13")
+
+            atlas.close()
+
+    def test_open_e_voicings_are_not_filtered(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "chords.atlas"
+            with mock.patch.object(ChordGenerator, "generate_chords", autospec=True, side_effect=ChordGenerator.generate_chords) as generate_chords:
+                build_chord_atlas(path, {"Open E": Fretboard.init_as_guitar_open_e()})
+            self.assertEqual({call.args[3] for call in generate_chords.call_args_list}, {False})
+            atlas = ChordAtlas.open(path)
+
+            for key in ["E", "A", "C#"]:
+                chords = ChordGenerator.generate_open_e_chords(key)
+                for chord_type, chord in chords.items():
+                    voicings = atlas.get_voicings("Open E", key, chord_type)
+                    self.assertEqual([(v.notes, v.pedals) for v in voicings], [(v.notes, v.pedals) for v in chord.voicings])
+
+            atlas.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
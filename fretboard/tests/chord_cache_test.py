@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fretboard.chord_cache import ChordCache
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS, GENERATOR_VERSION
+
+
+class TestChordCache(unittest.TestCase):
+
+    def test_same_as_generated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            expected = ChordGenerator.generate_e9_chords("F#", min_nb_notes=4, vectorized=True)
+
+            chord_cache = ChordCache(Path(directory))
+            chords = ChordGenerator.generate_e9_chords("F#", min_nb_notes=4, vectorized=True, chord_cache=chord_cache)
+            self.assertEqual((chord_cache.hits, chord_cache.misses, len(chord_cache)), (0, len(CHORD_FORMULAS), len(CHORD_FORMULAS)))
+
+            # read back by another process
+            chord_cache = ChordCache(Path(directory))
+            cached_chords = ChordGenerator.generate_e9_chords("F#", min_nb_notes=4, vectorized=True, chord_cache=chord_cache)
+            self.assertEqual((chord_cache.hits, chord_cache.misses), (len(CHORD_FORMULAS), 0))
+            for chord_type, chord in expected.items():
+                self.assertEqual(chords[chord_type].voicings, chord.voicings)
+                self.assertEqual(cached_chords[chord_type].voicings, chord.voicings)
+
+            # other inputs are other entries
+            ChordGenerator.generate_e9_chords("F#", min_nb_notes=5, vectorized=True, chord_cache=chord_cache)
+            self.assertEqual(chord_cache.misses, len(CHORD_FORMULAS))
+
+    def test_incremental_regeneration(self):
+        with tempfile.TemporaryDirectory() as directory:
+            chord_cache = ChordCache(Path(directory))
+            ChordGenerator.generate_e9_chords("C", vectorized=True, chord_cache=chord_cache)
+
+            # only edited formula is generated
+            formulas = dict(CHORD_FORMULAS, M=["1", "3", "b7"])
+            with mock.patch.dict(CHORD_FORMULAS, formulas):
+                chord_cache = ChordCache(Path(directory))
+                chords = ChordGenerator.generate_e9_chords("C", vectorized=True, chord_cache=chord_cache)
+                self.assertEqual((chord_cache.hits, chord_cache.misses), (len(CHORD_FORMULAS) - 1, 1))
+                self.assertEqual(chords["M"].voicings, ChordGenerator.generate_e9_chords("C", vectorized=True)["M"].voicings)
+
+                removed = chord_cache.prune(CHORD_FORMULAS, GENERATOR_VERSION)
+                self.assertEqual([chord_cache.manifest.get(digest) for digest in removed], [None])
+                self.assertEqual(len(removed), 1)
+                self.assertEqual(len(chord_cache), len(CHORD_FORMULAS))
+                self.assertEqual(len(list(Path(directory).glob("*.voicings"))), len(CHORD_FORMULAS))
+
+            self.assertEqual(len(chord_cache.prune(version=GENERATOR_VERSION + 1)), len(CHORD_FORMULAS))
+            self.assertEqual(list(Path(directory).glob("*.voicings")), [])
+
+    def test_shared_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # two processes opened the cache before any chord was cached
+            chord_cache = ChordCache(Path(directory))
+            other_chord_cache = ChordCache(Path(directory))
+            ChordGenerator.generate_e9_chords("C", vectorized=True, chord_cache=chord_cache)
+            ChordGenerator.generate_e9_chords("G", vectorized=True, chord_cache=other_chord_cache)
+
+            self.assertEqual(len(ChordCache(Path(directory))), 2 * len(CHORD_FORMULAS))
+            self.assertEqual(len(chord_cache.prune(CHORD_FORMULAS, GENERATOR_VERSION)), 0)
+            self.assertEqual(len(list(Path(directory).glob("*.voicings"))), 2 * len(CHORD_FORMULAS))
+
+            # orphan files are removed, unless newer than the manifest
+            orphan_filepath = Path(directory) / "orphan.voicings"
+            orphan_filepath.write_bytes(b"")
+            os.utime(orphan_filepath, (0, 0))
+            new_filepath = Path(directory) / "new.voicings"
+            new_filepath.write_bytes(b"")
+            os.utime(new_filepath, (time.time() + 60, time.time() + 60))
+            other_chord_cache.prune()
+            self.assertFalse(orphan_filepath.exists())
+            self.assertTrue(new_filepath.exists())
+
+            # entries pruned by another process are not written back
+            chord_cache.prune(version=GENERATOR_VERSION + 1)
+            ChordGenerator.generate_e9_chords("D", vectorized=True, chord_cache=other_chord_cache)
+            self.assertEqual(len(ChordCache(Path(directory))), len(CHORD_FORMULAS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,11 @@
 import unittest
+import itertools
 import json
 from pathlib import Path
 
+from fretboard.cache import ResultCache
 from fretboard.chords import Chord
-from fretboard.chord_generator import ChordGenerator
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
 from fretboard.fretboard import Fretboard
 
 
@@ -106,6 +108,41 @@ class TestChordGenerator(unittest.TestCase):
 
         pass
 
+    def test_vectorized_chord_generator(self):
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9())
+        vectorized_chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True)
+
+        for key in ["E", "F#", "Bb"]:
+            for formula in CHORD_FORMULAS.values():
+                voicings = chord_generator.generate_voicings(formula, key)
+                vectorized_voicings = vectorized_chord_generator.generate_voicings(formula, key)
+                self.assertEqual([(v.notes, v.pedals) for v in voicings], [(v.notes, v.pedals) for v in vectorized_voicings])
+
+        chords = ChordGenerator.generate_open_e_chords("A")
+        vectorized_chords = ChordGenerator.generate_open_e_chords("A", vectorized=True)
+        for key, chord in chords.items():
+            self.assertEqual([(v.notes, v.pedals) for v in chord.voicings], [(v.notes, v.pedals) for v in vectorized_chords[key].voicings])
+
+    def test_iter_voicings(self):
+        for vectorized in [False, True]:
+            chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized)
+            voicings = chord_generator.generate_voicings(CHORD_FORMULAS["M7"], "C")
+            iterated_voicings = list(chord_generator.iter_voicings(CHORD_FORMULAS["M7"], "C"))
+            self.assertEqual([(v.notes, v.pedals) for v in iterated_voicings], [(v.notes, v.pedals) for v in voicings])
+
+    def test_iter_voicings_stopped_early_are_cached(self):
+        cache = ResultCache()
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True, cache=cache)
+        voicings = chord_generator.iter_voicings(CHORD_FORMULAS["M7"], "C")
+        first_voicings = list(itertools.islice(voicings, 5))
+        voicings.close()
+
+        nb_misses = cache.misses
+        all_voicings = chord_generator.generate_voicings(CHORD_FORMULAS["M7"], "C")
+        self.assertEqual(cache.misses, nb_misses)
+        self.assertEqual(all_voicings[:5], first_voicings)
+        self.assertEqual(all_voicings, ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True).generate_voicings(CHORD_FORMULAS["M7"], "C"))
+
 
 if __name__ == "__main__":
     unittest.main()
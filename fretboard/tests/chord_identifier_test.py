@@ -0,0 +1,48 @@
+import unittest
+
+from fretboard.chord_generator import ChordGenerator
+from fretboard.chord_identifier import ChordIdentifier, identify_pitch_class_set
+from fretboard.fretboard import Fretboard
+from fretboard.notes_utils import PitchClassSet
+
+
+class TestChordIdentifier(unittest.TestCase):
+
+    def test_identify_pitch_class_set(self):
+        self.assertEqual(identify_pitch_class_set(PitchClassSet.from_ints([0, 4, 7])), [("C", "M")])
+        self.assertCountEqual(identify_pitch_class_set(PitchClassSet.from_ints([9, 0, 4, 7])), [("C", "M6"), ("A", "m7")])
+        self.assertEqual(identify_pitch_class_set(PitchClassSet.from_ints([0, 1, 2])), [])
+
+    def test_identify(self):
+        chord_identifier = ChordIdentifier(Fretboard.init_as_pedal_steel_e9())
+        self.assertEqual(chord_identifier.identify(3, ["A", "B"], [2, 4, 5, 6, 7]), [("C", "M")])
+        self.assertEqual(chord_identifier.identify(0, [], [4, 5, 6]), [("E", "M")])
+        with self.assertRaises(ValueError):
+            chord_identifier.identify(0, ["Z"], [2])
+
+    def test_annotate(self):
+        chord_identifier = ChordIdentifier(Fretboard.init_as_pedal_steel_e9())
+        strings = [2, 4, 5, 6, 7]
+        pedal_combinations, grid = chord_identifier.annotate(strings)
+        self.assertEqual(grid.shape, (12, len(pedal_combinations)))
+        for fret in range(12):
+            for i_combination, pedals in enumerate(pedal_combinations):
+                self.assertEqual(list(grid[fret, i_combination]), chord_identifier.identify(fret, pedals, strings))
+
+        # all strings by default
+        pedal_combinations, grid = chord_identifier.annotate()
+        for fret in range(12):
+            self.assertEqual(list(grid[fret, pedal_combinations.index(["A", "B"])]), chord_identifier.identify(fret, ["A", "B"]))
+
+    def test_generated_voicings(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        chord_identifier = ChordIdentifier(fretboard)
+        chord_generator = ChordGenerator(fretboard, vectorized=True)
+        for key in ["C", "F#"]:
+            for chord in chord_generator.generate_chords(key).values():
+                for voicing in chord.voicings:
+                    self.assertIn((chord.key, chord.type), chord_identifier.identify_voicing(voicing))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from fretboard.chords import Chord
+from fretboard.chord_generator import ChordGenerator
+from fretboard.chord_importer import import_e9_chords_from_json
+from fretboard.chord_serializer import ChordSerializer, write_chords_json
+from fretboard.copedent import Copedent
+from fretboard.fretboard import Fretboard
+
+
+class TestChordSerializer(unittest.TestCase):
+
+    def test_same_as_list_to_json(self):
+        for fretboard, pedals in [(Fretboard.init_as_pedal_steel_e9(), None), (Fretboard.init_as_guitar_open_e(), None), (Copedent.load(Path("data/copedents/e9.json")).to_fretboard(), "copedent")]:
+            chord_generator = ChordGenerator(fretboard, vectorized=True)
+            for key in ["E", "Bb"]:
+                chords = chord_generator.generate_chords(key)
+                serializer = ChordSerializer(fretboard.tuning, fretboard.pedals if pedals else None)
+                expected = json.dumps(Chord.list_to_json(chords, fretboard.tuning, fretboard.pedals if pedals else None))
+                self.assertEqual("".join(serializer.iter_json_chunks(chords.values())), expected)
+
+                voicing = [voicing for chord in chords.values() for voicing in chord.voicings][-1]
+                self.assertEqual(serializer.voicing_to_json_text(voicing, key), json.dumps(voicing.to_json(fretboard.tuning, key, fretboard.pedals if pedals else None)))
+
+        chords = import_e9_chords_from_json(Path("data/e9_chords_final_wip.json"))
+        tuning = Fretboard.init_as_pedal_steel_e9().tuning
+        self.assertEqual("".join(ChordSerializer(tuning).iter_json_chunks(chords)), json.dumps(Chord.list_to_json(dict(enumerate(chords)), tuning)))
+
+    def test_write_chords(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        chord_generator = ChordGenerator(fretboard, vectorized=True)
+
+        file = io.StringIO()
+        ChordSerializer(fretboard.tuning).write_chords(file, [])
+        self.assertEqual(json.loads(file.getvalue()), {"chords": []})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "chords.json"
+            chords = (chord for key in ["C", "G"] for chord in chord_generator.generate_chords(key).values())
+            write_chords_json(path, chords, fretboard.tuning, fretboard.pedals, with_key=True)
+            with open(path) as file:
+                data = json.load(file)
+
+        expected = [dict(chord.to_json(fretboard.tuning, fretboard.pedals), key=key) for key in ["C", "G"] for chord in chord_generator.generate_chords(key).values()]
+        self.assertEqual(data, {"chords": expected})
+
+    def test_write_chords_failure(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+
+        def iter_chords():
+            yield from ChordGenerator(fretboard, vectorized=True).generate_chords("C").values()
+            raise RuntimeError("generation failed")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "chords.json"
+            path.write_text("previous")
+            with self.assertRaises(RuntimeError):
+                write_chords_json(path, iter_chords(), fretboard.tuning, fretboard.pedals)
+
+            # previous file is kept, partial file is removed
+            self.assertEqual(path.read_text(), "previous")
+            self.assertEqual(list(Path(directory).iterdir()), [path])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import pickle
+from unittest import mock
+
+import fretboard.chords as chords_module
+from fretboard.chords import Voicing, MUTED_FRET, MAX_NB_PEDAL_NAMES, find_pedal_mask, get_pedal_mask
+
+
+class TestVoicing(unittest.TestCase):
+
+    def test_packed_voicing(self):
+        voicing = Voicing.from_e9_json({"pedals": ["B", "A"], "notes": ["7", "x", 7, "x", 7, 7, 7, 7, "x", "x"]})
+        self.assertEqual(voicing.notes, [7, None, 7, None, 7, 7, 7, 7, None, None])
+        self.assertEqual(voicing.pedals, ["A", "B"])  # in copedent order
+        self.assertEqual(voicing.frets, bytes([7, MUTED_FRET, 7, MUTED_FRET, 7, 7, 7, 7, MUTED_FRET, MUTED_FRET]))
+        self.assertEqual(voicing.pedal_mask, get_pedal_mask(["A", "B"]))
+        self.assertEqual(voicing.get_number_of_notes(), 6)
+
+        # interned and hashable
+        same = Voicing([7, None, 7, None, 7, 7, 7, 7, None, None], ["A", "B"])
+        self.assertIs(voicing, same)
+        self.assertEqual(len({voicing, same, Voicing([7, None, 7, None, 7, 7, 7, 7, None, None], ["A"])}), 2)
+        self.assertIs(pickle.loads(pickle.dumps(voicing)), voicing)
+
+        with self.assertRaises(AttributeError):
+            voicing.notes = [0] * 10
+
+        # pedals of other copedents
+        custom = Voicing([0, 1], ["Lever 1", "A"])
+        self.assertEqual(custom.pedals, ["A", "Lever 1"])
+
+    def test_pedal_names_are_bounded(self):
+        with mock.patch.object(chords_module, "_pedal_names", list(chords_module._pedal_names)), mock.patch.object(chords_module, "_pedal_bits", dict(chords_module._pedal_bits)):
+            for i in range(len(chords_module._pedal_names), MAX_NB_PEDAL_NAMES):
+                self.assertEqual(get_pedal_mask([f"Test lever {i}"]), 1 << i)
+            with self.assertRaises(ValueError):
+                get_pedal_mask(["Test lever"])
+            self.assertIsNone(find_pedal_mask(["Test lever"]))
+            self.assertEqual(find_pedal_mask(["A", "B"]), get_pedal_mask(["A", "B"]))
+
+    def test_is_part_of_other_voicing(self):
+        voicing = Voicing([7, None, 7, None, 7], ["A", "B"])
+        self.assertTrue(Voicing([7, None, None, None, 7], ["B"]).is_part_of_other_voicing(voicing))
+        self.assertFalse(Voicing([7, None, None, None, 7], ["C"]).is_part_of_other_voicing(voicing))
+        self.assertFalse(Voicing([7, 7, None, None, None], ["A"]).is_part_of_other_voicing(voicing))
+        self.assertFalse(Voicing([8, None, None, None, None], []).is_part_of_other_voicing(voicing))
+
+
+if __name__ == "__main__":
+    unittest.main()
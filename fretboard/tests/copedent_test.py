@@ -0,0 +1,41 @@
+import unittest
+from pathlib import Path
+
+from fretboard.chord_generator import ChordGenerator
+from fretboard.copedent import Copedent
+from fretboard.fretboard import Fretboard
+
+
+class TestCopedent(unittest.TestCase):
+
+    def test_copedent_hash(self):
+        e9 = Copedent.load(Path("data/copedents/e9.json"))
+        self.assertEqual(e9.name, "E9")
+        self.assertEqual(e9.get_hash(), Copedent.init_from_fretboard(Fretboard.init_as_pedal_steel_e9()).get_hash())
+        self.assertEqual(Copedent.load(Path("data/copedents/open_e.json")).get_hash(), Copedent.init_from_fretboard(Fretboard.init_as_guitar_open_e()).get_hash())
+
+        # hash does not depend on name, order of conflicts or changes
+        json_dict = e9.to_json()
+        json_dict["name"] = "My E9"
+        json_dict["conflicts"] = [list(reversed(conflict)) for conflict in reversed(json_dict["conflicts"])]
+        json_dict["pedals"][0]["changes"].reverse()
+        self.assertEqual(Copedent.init_from_json(json_dict).get_hash(), e9.get_hash())
+
+        # but it depends on pedal changes
+        json_dict["pedals"][-1]["changes"] = [[8, -2]]
+        self.assertNotEqual(Copedent.init_from_json(json_dict).get_hash(), e9.get_hash())
+
+        json_dict["pedals"][-1]["changes"] = [[10, -1]]
+        with self.assertRaises(ValueError):
+            Copedent.init_from_json(json_dict)
+
+    def test_copedent_fretboard(self):
+        fretboard = Copedent.load(Path("data/copedents/e9.json")).to_fretboard()
+        chords = ChordGenerator(fretboard).generate_chords("A")
+        expected_chords = ChordGenerator.generate_e9_chords("A")
+        for chord_type, chord in chords.items():
+            self.assertEqual([(v.notes, v.pedals) for v in chord.voicings], [(v.notes, v.pedals) for v in expected_chords[chord_type].voicings])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.chords import MUTED_FRET
+from fretboard.extended_search import ExtendedVoicingSearch
+from fretboard.fretboard import Fretboard
+from fretboard.metrics import metrics
+from fretboard.notes_utils import PitchClassSet
+
+
+class TestExtendedSearch(unittest.TestCase):
+
+    def test_straight_bars_same_as_generator(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        chord_generator = ChordGenerator(fretboard, vectorized=True)
+        search = ExtendedVoicingSearch(fretboard, max_fret=11, max_slant=0, with_open_strings=False)
+        for chord_type in ["M", "m7", "M6add9", "9", "13"]:
+            self.assertEqual(set(search.search(CHORD_FORMULAS[chord_type], "G")), set(chord_generator.generate_voicings(CHORD_FORMULAS[chord_type], "G")))
+
+    def test_voicings_are_complete_chords(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        pedals_by_name = {pedal.name: pedal for pedal in fretboard.pedals}
+        search = ExtendedVoicingSearch(fretboard)
+        voicings = search.search(CHORD_FORMULAS["M7"], "A")
+        self.assertEqual(len(set(voicings)), len(voicings))
+
+        has_slant = has_open_string_against_bar = has_high_fret = False
+        for voicing in voicings:
+            self.assertEqual(voicing.get_pitch_class_set(fretboard.tuning, "A", fretboard.pedals), PitchClassSet.from_str_intervals(CHORD_FORMULAS["M7"]))
+            played_strings = {string for string, fret in enumerate(voicing.frets) if fret != MUTED_FRET}
+            for pedal in voicing.pedals:
+                self.assertTrue(played_strings & {string for string, _ in pedals_by_name[pedal].changes})
+
+            fretted = {fret for fret in voicing.frets if fret not in (0, MUTED_FRET)}
+            self.assertTrue(all(1 <= fret <= 24 for fret in fretted))
+            self.assertLessEqual(max(fretted, default=0) - min(fretted, default=0), 2)
+            has_slant |= len(fretted) > 1
+            has_open_string_against_bar |= bool(fretted) and 0 in voicing.frets
+            has_high_fret |= max(fretted, default=0) > 12
+
+        self.assertTrue(has_slant and has_open_string_against_bar and has_high_fret)
+
+    def test_pruning_metrics(self):
+        metrics.reset()
+        metrics.enable()
+        try:
+            voicings = ExtendedVoicingSearch(Fretboard.init_as_pedal_steel_e9()).search(CHORD_FORMULAS["13"], "C")
+            counters = metrics.snapshot()["counters"]
+        finally:
+            metrics.disable()
+            metrics.reset()
+
+        self.assertGreater(sum(counters["extended_search_pruned"].values()), 0)
+        self.assertEqual(counters["generation_voicings"]['engine="extended"'], len(voicings))
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            ExtendedVoicingSearch(Fretboard.init_as_pedal_steel_e9(), max_fret=0)
+        with self.assertRaises(ValueError):
+            ExtendedVoicingSearch(Fretboard.init_as_pedal_steel_e9(), max_slant=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import gzip
+import json
+import unittest
+
+import flask_app
+from fretboard.metrics import metrics
+
+
+class TestFlaskApp(unittest.TestCase):
+
+    def setUp(self):
+        self.client = flask_app.app.test_client()
+
+    def test_page(self):
+        response = self.client.get("/?key=G&chord=M7&voicing=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/html")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        etag = response.headers["ETag"]
+
+        # revalidated with etag
+        response = self.client.get("/?key=G&chord=M7&voicing=1", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        # pre-compressed page has its own etag
+        gzipped_response = self.client.get("/?key=G&chord=M7&voicing=1", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(gzipped_response.headers["Content-Encoding"], "gzip")
+        self.assertNotEqual(gzipped_response.headers["ETag"], etag)
+        self.assertEqual(gzip.decompress(gzipped_response.data), self.client.get("/?key=G&chord=M7&voicing=1").data)
+
+        # same page for equivalent voicing numbers, and for invalid inputs
+        nb_voicings = flask_app.get_nb_voicings("G", "M7")
+        self.assertEqual(self.client.get(f"/?key=G&chord=M7&voicing={1 + 10 * nb_voicings}").headers["ETag"], etag)
+        self.assertEqual(self.client.get("/?key=H&chord=nope").headers["ETag"], self.client.get("/?key=E").headers["ETag"])
+        self.assertEqual(self.client.post("/", data={"key": "G", "chord": "M7", "voicing": "1"}).headers["ETag"], etag)
+
+    def test_voicing_cache_holds_all_chords(self):
+        for key in flask_app.keys:
+            for chord_type in flask_app.chord_types:
+                flask_app.get_nb_voicings(key, chord_type)
+                flask_app.generate_scale(key)
+
+        chord_generator = flask_app.chord_generators["E9"]
+        nb_misses = flask_app.voicing_cache.misses
+        for key in flask_app.keys:
+            for chord_type in flask_app.chord_types:
+                flask_app.get_nb_voicings(key, chord_type)
+                chord_generator.generate_voicings(flask_app.CHORD_FORMULAS[chord_type], key)
+        self.assertEqual(flask_app.voicing_cache.misses, nb_misses)
+
+    def test_voicings(self):
+        response = self.client.get("/api/voicings?key=F%23&chord=m7&limit=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertTrue(response.is_streamed)
+        voicings = [json.loads(line) for line in response.data.decode("utf-8").splitlines()]
+        self.assertEqual(len(voicings), 3)
+        self.assertEqual(set(voicings[0]), {"pedals", "notes", "intervals"})
+
+        # offset and filters
+        all_lines = self.client.get("/api/voicings?key=F%23&chord=m7").data.splitlines()
+        self.assertEqual(self.client.get("/api/voicings?key=F%23&chord=m7&offset=1&limit=2").data.splitlines(), all_lines[1:3])
+        for line in self.client.get("/api/voicings?key=F%23&chord=m7&min_notes=4&max_pedals=1").data.splitlines():
+            voicing = json.loads(line)
+            self.assertGreaterEqual(len([note for note in voicing["notes"] if note != "x"]), 4)
+            self.assertLessEqual(len(voicing["pedals"]), 1)
+
+        # gzip stream
+        response = self.client.get("/api/voicings?key=F%23&chord=m7", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data).splitlines(), all_lines)
+
+    def test_limited_voicings_are_cached(self):
+        flask_app.voicing_cache.clear()
+        self.assertEqual(len(self.client.get("/api/voicings?key=D&chord=m7&limit=5").data.splitlines()), 5)
+
+        # next pages are sliced from cached voicings
+        nb_misses = flask_app.voicing_cache.misses
+        self.assertEqual(len(self.client.get("/api/voicings?key=D&chord=m7&offset=5&limit=5").data.splitlines()), 5)
+        flask_app.chord_generators["E9"].generate_voicings(flask_app.CHORD_FORMULAS["m7"], "D")
+        self.assertEqual(flask_app.voicing_cache.misses, nb_misses)
+
+    def test_extended_voicings(self):
+        voicings = [json.loads(line) for line in self.client.get("/api/voicings?key=C&chord=M7&extended=1").data.splitlines()]
+        self.assertGreater(len(voicings), len(self.client.get("/api/voicings?key=C&chord=M7").data.splitlines()))
+        frets = [{note for note in voicing["notes"] if note not in ("x", 0)} for voicing in voicings]
+        self.assertTrue(any(max(voicing_frets, default=0) > 12 for voicing_frets in frets))
+        self.assertTrue(any(len(voicing_frets) > 1 for voicing_frets in frets))  # slanted bars
+
+        # filters apply to extended voicings
+        for line in self.client.get("/api/voicings?key=C&chord=M7&extended=1&min_fret=13&limit=10").data.splitlines():
+            self.assertTrue(all(note == "x" or note >= 13 for note in json.loads(line)["notes"]))
+        self.assertEqual(self.client.get("/api/voicings?key=C&chord=M7&extended=yes").status_code, 400)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get("/api/voicings?copedent=nope").status_code, 404)
+        self.assertEqual(self.client.get("/api/voicings?key=H").status_code, 400)
+        self.assertEqual(self.client.get("/api/voicings?limit=-1").status_code, 400)
+        self.assertEqual(self.client.get("/api/voicings?min_notes=a").status_code, 400)
+        self.assertEqual(self.client.get("/api/search?copedent=nope").status_code, 404)
+        self.assertEqual(self.client.get("/api/search?chord_type=nope").status_code, 400)
+        self.assertEqual(self.client.get("/api/identify?copedent=nope&fret=3").status_code, 404)
+        self.assertEqual(self.client.get("/api/identify?strings=1").status_code, 400)
+        self.assertEqual(self.client.get("/api/identify?fret=3&strings=10").status_code, 400)
+        self.assertEqual(self.client.get("/api/voice-leading?copedent=nope&progression=I").status_code, 404)
+        self.assertEqual(self.client.get("/api/voice-leading?progression=VIII").status_code, 400)
+        self.assertEqual(self.client.get("/api/voice-leading").status_code, 400)
+        self.assertEqual(self.client.get("/static/../flask_app.py").status_code, 404)
+        self.assertEqual(self.client.get("/static/main.css").status_code, 200)
+
+    def test_search(self):
+        matches = self.client.get("/api/search?key=G&chord_type=M7&with_pedals=A&limit=5").get_json()
+        self.assertLessEqual(len(matches), 5)
+        self.assertTrue(matches)
+        for match in matches:
+            self.assertEqual((match["key"], match["chord"]), ("G", "M7"))
+            self.assertIn("A", match["pedals"])
+        self.assertEqual(self.client.get("/api/search?with_pedals=Unknown").get_json(), [])
+
+    def test_identify_and_voice_leading(self):
+        chords = self.client.get("/api/identify?fret=0&strings=4,5,6").get_json()
+        self.assertIn({"key": "E", "chord": "M"}, chords)
+
+        # all strings are picked when none is given
+        all_strings = self.client.get("/api/identify?fret=3&pedals=A,B,D&strings=" + ",".join(map(str, range(10)))).get_json()
+        self.assertEqual(all_strings, [{"key": "C", "chord": "M6"}, {"key": "A", "chord": "m7"}])
+        self.assertEqual(self.client.get("/api/identify?fret=3&pedals=A,B,D").get_json(), all_strings)
+        self.assertEqual(self.client.get("/api/identify?fret=3&pedals=A,B,D&strings=").get_json(), all_strings)
+
+        voice_leading = self.client.get("/api/voice-leading?key=G&progression=I,IV,V7,I&min_notes=4").get_json()
+        self.assertEqual([(chord["key"], chord["chord"]) for chord in voice_leading["chords"]], [("G", "M"), ("C", "M"), ("D", "7"), ("G", "M")])
+        self.assertGreaterEqual(voice_leading["cost"], 0)
+
+    def test_metrics(self):
+        metrics.reset()
+        metrics.enable()
+        try:
+            self.client.get("/?key=A")
+            self.client.get("/api/voicings?key=H").close()
+
+            # streamed response is timed when it is closed, after its last byte
+            response = self.client.get("/api/voicings?key=C&chord=M7")
+            self.assertNotIn('route="/api/voicings",status="200"', metrics.to_prometheus())
+            response.close()
+            text = self.client.get("/metrics").get_data(as_text=True)
+        finally:
+            metrics.disable()
+            metrics.reset()
+
+        self.assertIn('fretboard_http_request_seconds_count{method="GET",route="/",status="200"} 1', text)
+        self.assertIn('fretboard_http_request_seconds_count{method="GET",route="/api/voicings",status="400"} 1', text)
+        self.assertIn('fretboard_http_request_seconds_count{method="GET",route="/api/voicings",status="200"} 1', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from fretboard.fretboard import Fretboard, SCALE_INTERVALS
+from fretboard.notes_utils import convert_int_note_to_str
+
+
+class TestFretboard(unittest.TestCase):
+
+    def test_generate_scale_grids(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        notes_grid, intervals_grid = fretboard.generate_scale_grids(list(SCALE_INTERVALS.keys()), 0, 12)
+        self.assertEqual(notes_grid.shape, (2, 12, 10, 13))
+        self.assertEqual(intervals_grid.shape, (2, 12, 10, 13))
+
+        # same as one key at a time
+        for key_as_int in range(12):
+            key = convert_int_note_to_str(key_as_int)
+            major_scale = fretboard.generate_major_scale_as_integers(key, 0, 12)
+            self.assertEqual(notes_grid[0, key_as_int].tolist(), [[note if note is not None else -1 for note in string] for string in major_scale])
+            self.assertEqual(intervals_grid[0, key_as_int].tolist(), fretboard.generate_major_scale_as_intervals(key, 0, 12))
+
+            pentatonic_scale = fretboard.generate_major_pentatonic_scale_as_integers(key, 0, 12)
+            self.assertEqual(intervals_grid[1, key_as_int].tolist(), Fretboard.convert_fretboard_scale_to_intervals(key, pentatonic_scale))
+
+    def test_pedal_conflicts_are_not_shared(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        fretboard.pedal_conflicts.append(("A", "B"))
+        self.assertNotIn(("A", "B"), Fretboard.init_as_pedal_steel_e9().pedal_conflicts)
+
+
+if __name__ == "__main__":
+    unittest.main()
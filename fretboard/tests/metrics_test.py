@@ -0,0 +1,64 @@
+import unittest
+
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.fretboard import Fretboard
+from fretboard.metrics import Metrics, metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+
+    def test_registry(self):
+        registry = Metrics()
+        registry.increment("requests", route="/")
+        with registry.timer("stage_seconds", stage="a"):
+            pass
+        self.assertEqual(registry.snapshot(), {"counters": {}, "timings": {}})
+        self.assertEqual(registry.to_prometheus(), "")
+
+        registry.enable()
+        registry.increment("requests", route="/")
+        registry.increment("requests", 2, route="/")
+        registry.increment("requests", route='/a"b')
+        registry.observe("stage_seconds", 0.5, stage="a")
+        registry.observe("stage_seconds", 0.25, stage="a")
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["counters"]["requests"], {'route="/"': 3, 'route="/a\\"b"': 1})
+        self.assertEqual(snapshot["timings"]["stage_seconds"], {'stage="a"': {"count": 2, "sum": 0.75, "max": 0.5}})
+
+        lines = registry.to_prometheus().splitlines()
+        self.assertIn("# TYPE fretboard_requests_total counter", lines)
+        self.assertIn('fretboard_requests_total{route="/"} 3', lines)
+        self.assertIn('fretboard_stage_seconds_count{stage="a"} 2', lines)
+        self.assertIn('fretboard_stage_seconds_sum{stage="a"} 0.75', lines)
+        self.assertIn('fretboard_stage_seconds_max{stage="a"} 0.5', lines)
+
+    def test_generation_counters(self):
+        metrics.reset()
+        metrics.enable()
+        for vectorized in (True, False):
+            ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized).generate_chords("A", min_nb_notes=4)
+
+        counters = metrics.snapshot()["counters"]
+        for engine in ("vectorized", "loops"):
+            nb_candidates = counters["generation_candidates"][f'engine="{engine}"']
+            nb_incomplete = counters["generation_rejected"][f'engine="{engine}",reason="incomplete_chord"']
+            nb_unnecessary_pedal = counters["generation_rejected"][f'engine="{engine}",reason="unnecessary_pedal"']
+            nb_voicings = counters["generation_voicings"][f'engine="{engine}"']
+            self.assertEqual(nb_candidates, 12 * 78 * len(CHORD_FORMULAS))
+            self.assertEqual(nb_incomplete + nb_unnecessary_pedal + nb_voicings, nb_candidates)
+            self.assertEqual(nb_voicings, counters["generation_voicings"]['engine="vectorized"'])
+
+        timings = metrics.snapshot()["timings"]["generation_stage_seconds"]
+        for stage in ("pedal_combinations", "intervals_tensor", "subset_filter"):
+            self.assertIn(f'stage="{stage}"', timings)
+        for stage in ("intervals", "completeness", "pedal_necessity", "voicings"):
+            self.assertEqual(timings[f'engine="loops",stage="{stage}"']["count"], len(CHORD_FORMULAS))
+            self.assertEqual(timings[f'engine="vectorized",stage="{stage}"']["count"], len(CHORD_FORMULAS))
+
+
+if __name__ == "__main__":
+    unittest.main()
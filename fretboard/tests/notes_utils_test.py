@@ -0,0 +1,54 @@
+import unittest
+
+from fretboard.notes_utils import PitchClassSet, convert_int_note_to_str, convert_str_note_to_int, convert_int_interval_to_str, convert_str_interval_to_int
+
+
+class TestPitchClassSet(unittest.TestCase):
+
+    def test_pitch_class_set(self):
+        major = PitchClassSet.from_str_intervals(["1", "3", "5"])
+        self.assertEqual(major.mask, 0b000010010001)
+        self.assertEqual(major.to_ints(), [0, 4, 7])
+        self.assertEqual(len(major), 3)
+        self.assertTrue(4 in major)
+        self.assertTrue(3 not in major)
+        self.assertTrue(16 in major)  # modulo 12
+
+        # None (muted strings) and duplicates are ignored
+        strings = PitchClassSet.from_ints([7, None, 0, None, 4, 7, 0, 4, None, 2])
+        self.assertTrue(major.issubset(strings))
+        self.assertTrue(strings.issuperset(major))
+        self.assertFalse(strings.issubset(major))
+        self.assertEqual(strings & major, major)
+        self.assertEqual(major | PitchClassSet.from_ints([2]), strings)
+
+        # G major (as intervals from C) is C major transposed
+        self.assertEqual(major.transpose(7), PitchClassSet.from_ints([7, 11, 2]))
+        self.assertEqual(major.transpose(-5), major.transpose(7))
+        self.assertEqual(major.transpose(12), major)
+
+
+class TestNoteConversions(unittest.TestCase):
+
+    def test_note_conversions(self):
+        self.assertEqual(convert_int_note_to_str(1), "Db")
+        self.assertEqual(convert_int_note_to_str(1, as_sharps=True), "C#")
+        self.assertEqual(convert_str_note_to_int("Db"), 1)
+        self.assertEqual(convert_str_note_to_int("C#"), 1)
+        for note in range(12):
+            self.assertEqual(convert_str_note_to_int(convert_int_note_to_str(note)), note)
+            self.assertEqual(convert_str_interval_to_int(convert_int_interval_to_str(note)), note)
+        self.assertEqual(convert_str_interval_to_int("13"), 9)
+
+        with self.assertRaises(ValueError):
+            convert_int_note_to_str(12)
+        with self.assertRaises(ValueError):
+            convert_str_note_to_int("H")
+        with self.assertRaises(ValueError):
+            convert_int_interval_to_str(-1)
+        with self.assertRaises(ValueError):
+            convert_str_interval_to_int("#4")
+
+
+if __name__ == "__main__":
+    unittest.main()
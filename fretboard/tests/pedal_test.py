@@ -21,6 +21,22 @@ class TestPedal(unittest.TestCase):
         self.assertTrue(["A/2", "A"] not in all_combinations)
         self.assertTrue(["D/2", "D"] not in all_combinations)
 
+    def test_pedal_combinations_conflict_graph(self):
+        pedals = ["P1", "P2", "P3", "P4", "LKL", "LKR"]
+        conflicts = [("LKL", "LKR"), ("P1", "P2")]
+
+        all_combinations = Pedal.get_all_pedal_combinations(pedals, conflicts, max_nb_pedals=4)
+        self.assertEqual(all_combinations[:7], [[], ["P1"], ["P2"], ["P3"], ["P4"], ["LKL"], ["LKR"]])
+        self.assertTrue(["P1", "P3", "P4", "LKL"] in all_combinations)
+        self.assertTrue(["LKL", "LKR"] not in all_combinations)
+        self.assertTrue(["P1", "P2", "P3"] not in all_combinations)
+        self.assertEqual(len(all_combinations), 1 + 6 + 13 + 12 + 4)
+        self.assertEqual(max(len(combination) for combination in all_combinations), 4)
+
+        # conflict pairs are not ordered, results are cached
+        self.assertEqual(Pedal.get_all_pedal_combinations(pedals, [("LKR", "LKL"), ("P2", "P1")], max_nb_pedals=4), all_combinations)
+        self.assertEqual(Pedal.get_all_pedal_combinations(pedals, [], max_nb_pedals=1), [[]] + [[pedal] for pedal in pedals])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,63 @@
+import itertools
+import unittest
+
+from fretboard.chord_generator import ChordGenerator
+from fretboard.fretboard import Fretboard
+from fretboard.voice_leading import VoiceLeadingCost, VoiceLeadingPathFinder, parse_roman_progression
+
+
+class TestVoiceLeading(unittest.TestCase):
+
+    def test_parse_roman_progression(self):
+        self.assertEqual(parse_roman_progression(["I", "IV", "V7", "I"], "G"), [("G", "M"), ("C", "M"), ("D", "7"), ("G", "M")])
+        self.assertEqual(parse_roman_progression(["ii7", "V7", "IM7", "bVII", "vii"], "C"), [("D", "m7"), ("G", "7"), ("C", "M7"), ("A#", "M"), ("B", "m")])
+        with self.assertRaises(ValueError):
+            parse_roman_progression(["VIII"], "C")
+        with self.assertRaises(ValueError):
+            parse_roman_progression(["Iunknown"], "C")
+
+    def test_same_as_exhaustive_search(self):
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True)
+        path_finder = VoiceLeadingPathFinder(chord_generator, VoiceLeadingCost(fret_distance=1.0, pedal_change=0.5, common_string=0.25))
+        progression = parse_roman_progression(["I", "vi", "IV", "V7"], "E")
+        voicings, cost = path_finder.find_path(progression, min_nb_notes=4)
+
+        stores = [path_finder._get_layer(chord, {"min_nb_notes": 4})[1] for chord in progression]
+        transitions = [path_finder.get_transition_costs(store, next_store) for store, next_store in zip(stores, stores[1:])]
+        best_cost = min(sum(transition[i, j] for transition, i, j in zip(transitions, path, path[1:])) for path in itertools.product(*[range(len(store)) for store in stores]))
+        self.assertAlmostEqual(cost, best_cost)
+        self.assertEqual(len(voicings), len(progression))
+        for voicing in voicings:
+            self.assertGreaterEqual(voicing.get_number_of_notes(), 4)
+
+    def test_pedal_moves(self):
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True)
+        progression = parse_roman_progression(["I", "IV", "I"], "G")
+
+        # I and IV can be played at the same fret without pedal changes, on other strings
+        voicings, cost = VoiceLeadingPathFinder(chord_generator, VoiceLeadingCost(common_string=0.0)).find_path(progression)
+        self.assertEqual(cost, 0.0)
+        self.assertEqual(len({min(note for note in voicing.notes if note is not None) for voicing in voicings}), 1)
+        self.assertEqual(len({voicing.pedal_mask for voicing in voicings}), 1)
+
+        # keeping strings is worth a pedal change
+        voicings, cost = VoiceLeadingPathFinder(chord_generator, VoiceLeadingCost(fret_distance=10.0, pedal_change=0.25, common_string=1.0)).find_path(progression)
+        self.assertEqual(len({min(note for note in voicing.notes if note is not None) for voicing in voicings}), 1)
+        self.assertNotEqual(voicings[0].pedals, voicings[1].pedals)
+
+    def test_long_progression(self):
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True)
+        progression = parse_roman_progression(["I", "vi7", "ii7", "V7", "IM7", "IV", "iii", "V9"] * 4, "Bb")
+        voicings, cost = VoiceLeadingPathFinder(chord_generator).find_path(progression)
+        self.assertEqual(len(voicings), 32)
+
+        # beam search is never better than exact search
+        _, beam_cost = VoiceLeadingPathFinder(chord_generator, beam_width=3).find_path(progression)
+        self.assertGreaterEqual(beam_cost, cost)
+
+        with self.assertRaises(ValueError):
+            VoiceLeadingPathFinder(chord_generator, VoiceLeadingCost(max_fret_jump=0)).find_path(progression, min_fret=0, max_fret=0, min_nb_notes=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
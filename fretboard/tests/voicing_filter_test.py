@@ -0,0 +1,40 @@
+import unittest
+from pathlib import Path
+
+from fretboard.chords import Voicing
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.chord_importer import import_e9_chords_from_json
+from fretboard.fretboard import Fretboard
+from fretboard.voicing_filter import filter_dominated_voicings
+
+
+class TestVoicingFilter(unittest.TestCase):
+
+    def test_same_as_pairwise_filter(self):
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True)
+
+        for key in ["E", "G"]:
+            for formula in CHORD_FORMULAS.values():
+                voicings = chord_generator.generate_voicings(formula, key)
+                expected = [voicing for voicing in voicings if not voicing.is_part_of_other_voicings(voicings)]
+                self.assertEqual(filter_dominated_voicings(voicings), expected)
+
+    def test_imported_voicings(self):
+        chords = import_e9_chords_from_json(Path("data/E9_Chords.json"))
+        for chord in chords:
+            voicings = chord.voicings + [Voicing.from_e9_json({"pedals": ["A"], "notes": ["x"] * 10})]
+            expected = [voicing for voicing in voicings if not voicing.is_part_of_other_voicings(voicings)]
+            self.assertEqual(filter_dominated_voicings(voicings), expected)
+
+    def test_duplicates(self):
+        voicing = Voicing.from_e9_json({"pedals": ["A", "B"], "notes": ["7", "x", "7", "x", "7", "7", "7", "7", "x", "x"]})
+        duplicate = Voicing.from_e9_json({"pedals": ["B", "A"], "notes": ["7", "x", "7", "x", "7", "7", "7", "7", "x", "x"]})
+        subset = Voicing.from_e9_json({"pedals": ["B"], "notes": ["x", "x", "7", "x", "7", "x", "x", "x", "x", "x"]})
+        split = Voicing.from_e9_json({"pedals": ["A", "B"], "notes": ["7", "x", "7", "x", "7", "7", "7", "8", "x", "x"]})
+
+        self.assertEqual(filter_dominated_voicings([subset, voicing, duplicate, split]), [voicing, split])
+        self.assertEqual(filter_dominated_voicings([voicing, subset], min_nb_notes=7), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from fretboard.chords import Chord, Voicing
+from fretboard.chord_importer import convert_json_to_voicing_library, import_e9_chords_from_json, import_e9_chords_from_library
+from fretboard.voicing_library import pack_frets, unpack_frets, write_voicing_library
+
+
+class TestVoicingLibrary(unittest.TestCase):
+
+    def test_same_as_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for json_path in [Path("data/E9_Chords.json"), Path("data/e9_chords_final_wip.json")]:
+                path = Path(directory) / "chords.voicings"
+                convert_json_to_voicing_library(json_path, path)
+
+                expected = import_e9_chords_from_json(json_path)
+                chords = import_e9_chords_from_library(path)
+                self.assertEqual([(c.key, c.type) for c in chords], [(c.key, c.type) for c in expected])
+                for chord, expected_chord in zip(chords, expected):
+                    self.assertEqual([(v.notes, sorted(v.pedals)) for v in chord.voicings], [(v.notes, sorted(v.pedals)) for v in expected_chord.voicings])
+
+                # filtered while reading
+                chords = import_e9_chords_from_library(path, chord_types=["m7", "M7"], min_nb_notes=4)
+                self.assertEqual([c.type for c in chords], [c.type for c in expected if c.type in ["m7", "M7"]])
+                for chord in chords:
+                    expected_chord = next(c for c in expected if c.type == chord.type)
+                    self.assertEqual([v.notes for v in chord.voicings], [v.notes for v in expected_chord.voicings if v.get_number_of_notes() >= 4])
+
+    def test_pack_frets(self):
+        for notes in [[0, None, 14, 3, None], [None] * 10, [12, 11, 10, 9, 8, 7, 6, 5, 4, 3]]:
+            packed = pack_frets(notes)
+            self.assertEqual(len(packed), (len(notes) + 1) // 2)
+            self.assertEqual(unpack_frets(packed, len(notes)), notes)
+
+        chord = Chord(key="E", type="M")
+        chord.voicings.append(Voicing.from_e9_json({"pedals": [], "notes": [15, "x", "x", "x", "x", "x", "x", "x", "x", "x"]}))
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                write_voicing_library(Path(directory) / "chords.voicings", [chord], 10)
+
+    def test_name_lengths(self):
+        notes = [0] + [None] * 9
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "chords.voicings"
+
+            chord = Chord(key="E", type="M")
+            chord.voicings.append(Voicing(notes, ["Lever 10"]))
+            write_voicing_library(path, [chord], 10)
+            self.assertEqual(import_e9_chords_from_library(path)[0].voicings[0].pedals, ["Lever 10"])
+
+            # names are not truncated
+            chord.voicings[0] = Voicing(notes, ["Knee lever 1"])
+            with self.assertRaises(ValueError):
+                write_voicing_library(path, [chord], 10)
+            chord = Chord(key="E", type="M7add9add11add13b5")
+            chord.voicings.append(Voicing(notes, []))
+            with self.assertRaises(ValueError):
+                write_voicing_library(path, [chord], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from fretboard import chords as chords_module
+from fretboard.chord_generator import ChordGenerator
+from fretboard.chords import find_pedal_mask
+from fretboard.fretboard import Fretboard
+from fretboard.voicing_query import VoicingQueryIndex
+
+
+class TestVoicingQueryIndex(unittest.TestCase):
+
+    def test_same_as_scan(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        chord_generator = ChordGenerator(fretboard, vectorized=True)
+        chords = list(chord_generator.generate_chords("G").values()) + list(chord_generator.generate_chords("D").values())
+        index = VoicingQueryIndex(chords, fretboard.tuning, fretboard.pedals)
+        matches = [(chord.key, chord.type, voicing) for chord in chords for voicing in chord.voicings]
+        self.assertEqual(len(index), len(matches))
+
+        def get_played_intervals(key, voicing):
+            return [interval for interval in voicing.get_intervals(fretboard.tuning, key, fretboard.pedals) if interval is not None]
+
+        expected = [(k, c, v) for k, c, v in matches if k == "G" and c == "M7" and "A" in v.pedals and get_played_intervals(k, v)[-1] == 4]
+        self.assertEqual(index.query(key="G", chord_type="M7", with_pedals=["A"], top_interval="3"), expected)
+
+        expected = [(k, c, v) for k, c, v in matches if "C" not in v.pedals and v.notes[0] == 3 and get_played_intervals(k, v)[0] == 0]
+        self.assertEqual(index.query(without_pedals=["C"], fret=3, strings=[0], bass_interval="1"), expected)
+
+        expected = [(k, c, v) for k, c, v in matches if v.pedals == ["B"] and max(i for i, note in enumerate(v.notes) if note is not None) == 9]
+        self.assertEqual(index.query(pedals=["B"], top_string=9), expected)
+
+        # sorted by distance from fret, stable
+        results = index.query(chord_type="m", near_fret=8, limit=5)
+        expected = sorted([(k, c, v) for k, c, v in matches if c == "m"], key=lambda match: abs(min(note for note in match[2].notes if note is not None) - 8))
+        self.assertEqual(results, expected[:5])
+
+        self.assertEqual(index.query(fret=20), [])
+        self.assertEqual(index.query(with_pedals=["Lever 9"]), [])
+
+    def test_unknown_pedals_are_not_registered(self):
+        fretboard = Fretboard.init_as_pedal_steel_e9()
+        chords = list(ChordGenerator(fretboard, vectorized=True).generate_chords("G").values())
+        index = VoicingQueryIndex(chords, fretboard.tuning, fretboard.pedals)
+        nb_pedal_names = len(chords_module._pedal_names)
+
+        self.assertEqual(index.query(with_pedals=["Unknown 1"]), [])
+        self.assertEqual(index.query(pedals=["A", "Unknown 2"]), [])
+        self.assertEqual(len(index.query(without_pedals=["Unknown 3"], limit=None)), len(index))
+        self.assertEqual(len(chords_module._pedal_names), nb_pedal_names)
+        self.assertIsNone(find_pedal_mask(["Unknown 1"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+import fretboard.chords as chords_module
+from fretboard.chords import Voicing
+from fretboard.fretboard import Fretboard
+from fretboard.voicing_store import VoicingStore
+
+
+class TestVoicingStore(unittest.TestCase):
+
+    def test_same_as_voicing_filters(self):
+        chord_generator = ChordGenerator(Fretboard.init_as_pedal_steel_e9(), vectorized=True)
+        voicings = [voicing for formula in CHORD_FORMULAS.values() for voicing in chord_generator.generate_voicings(formula, "F")]
+        store = VoicingStore.init_from_voicings(voicings)
+        self.assertEqual(len(store), len(voicings))
+        self.assertEqual(store.to_voicings(), voicings)
+
+        def get_played_frets(voicing: Voicing) -> list[int]:
+            return [note for note in voicing.notes if note is not None]
+
+        expected = [v for v in voicings if len(v.pedals) <= 2 and min(get_played_frets(v)) >= 3 and max(get_played_frets(v)) <= 8 and v.get_number_of_notes() >= 5]
+        self.assertEqual(store.select(max_nb_pedals=2, min_fret=3, max_fret=8, min_nb_notes=5).to_voicings(), expected)
+
+        expected = [v for v in voicings if "A" in v.pedals and "B" not in v.pedals]
+        self.assertEqual(store.select(with_pedals=["A"], without_pedals=["B"]).to_voicings(), expected)
+
+        # unknown pedals are not registered, no voicing has them
+        nb_pedal_names = len(chords_module._pedal_names)
+        self.assertEqual(store.select(with_pedals=["A", "Unknown pedal"]).to_voicings(), [])
+        self.assertEqual(store.select(without_pedals=["Unknown pedal"]).to_voicings(), voicings)
+        self.assertEqual(store.select(with_pedals=["A"], without_pedals=["B", "Unknown pedal"]).to_voicings(), expected)
+        self.assertEqual(len(chords_module._pedal_names), nb_pedal_names)
+
+        self.assertEqual(store.sort_by("nb_pedals", "min_frets").to_voicings(), sorted(voicings, key=lambda v: (len(v.pedals), min(get_played_frets(v)))))
+
+    def test_pedal_mask_width(self):
+        with self.assertRaises(ValueError):
+            VoicingStore(np.zeros((1, 4), dtype=np.uint8), np.array([1 << 64], dtype=object))
+        with self.assertRaises(ValueError):
+            VoicingStore(np.zeros((1, 4), dtype=np.uint8), np.array([-1]))
+        self.assertEqual(VoicingStore(np.zeros((1, 4), dtype=np.uint8), np.array([1 << 63], dtype=object)).pedal_masks.tolist(), [1 << 63])
+
+    def test_columns(self):
+        voicings = [Voicing([None, 3, 5, None], ["B", "A"]), Voicing([None] * 4, []), Voicing([0, None, None, 2], ["C"])]
+        store = VoicingStore.init_from_voicings(voicings)
+        self.assertEqual(store.nb_notes.tolist(), [2, 0, 2])
+        self.assertEqual(store.nb_pedals.tolist(), [2, 0, 1])
+        self.assertEqual(store.lowest_strings.tolist(), [1, -1, 0])
+        self.assertEqual(store.highest_strings.tolist(), [2, -1, 3])
+        self.assertEqual(store.min_frets.tolist(), [3, -1, 0])
+        self.assertEqual(store.max_frets.tolist(), [5, -1, 2])
+        self.assertEqual(store.played_strings_masks.tolist(), [0b0110, 0, 0b1001])
+
+        empty = VoicingStore.init_from_voicings([], nb_strings=4)
+        self.assertEqual(empty.select(min_nb_notes=3).sort_by("nb_notes").to_voicings(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
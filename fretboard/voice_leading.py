@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+import numpy as np
+
+from fretboard.chords import Voicing
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.notes_utils import convert_int_note_to_str, convert_str_note_to_int
+from fretboard.voicing_store import VoicingStore, count_bits
+
+# key, chord type, like ("G", "7")
+ProgressionChord = tuple[str, str]
+
+_ROMAN_NUMERALS: list[str] = ["I", "II", "III", "IV", "V", "VI", "VII"]
+_MAJOR_SCALE_DEGREES: list[int] = [0, 2, 4, 5, 7, 9, 11]
+_ROMAN_NUMERAL_PATTERN = re.compile(r"^([b#]?)(VII|VI|IV|V|III|II|I|vii|vi|iv|v|iii|ii|i)(.*)$")
+
+
+def parse_roman_progression(progression: list[str], key: str) -> list[ProgressionChord]:
+    """Get chords of a progression written with roman numerals in a key, like ["I", "IV", "V7", "I"] or ["ii7", "V7", "IM7"]
+
+    Lowercase numerals are minor chords, the suffix is the chord type ("7", "M7"...) and is made minor for lowercase numerals ("7" is "m7").
+    """
+    key_as_int = convert_str_note_to_int(key)
+    chords = []
+    for numeral in progression:
+        match = _ROMAN_NUMERAL_PATTERN.match(numeral)
+        if match is None:
+            raise ValueError("Invalid roman numeral!")
+        alteration, degree, suffix = match.groups()
+        root = key_as_int + _MAJOR_SCALE_DEGREES[_ROMAN_NUMERALS.index(degree.upper())] + {"": 0, "b": -1, "#": 1}[alteration]
+        if degree.islower():
+            chord_type = suffix if suffix in ("dim", "m7b5") else "m" + suffix
+        else:
+            chord_type = suffix or "M"
+        if chord_type not in CHORD_FORMULAS:
+            raise ValueError("Invalid chord type!")
+        chords.append((convert_int_note_to_str(root % 12, as_sharps=True), chord_type))
+
+    return chords
+
+
+class VoiceLeadingCost:
+    """Weights of the cost of moving from a voicing to the next one"""
+
+    fret_distance: float = 1.0  # per fret of bar movement (lowest played fret)
+    pedal_change: float = 1.0  # per pedal or knee lever engaged or released
+    common_string: float = 0.25  # subtracted per string played by both voicings
+    max_fret_jump: Optional[int] = None  # bar movements larger than this are not allowed
+
+    def __init__(self, fret_distance: float = 1.0, pedal_change: float = 1.0, common_string: float = 0.25, max_fret_jump: Optional[int] = None):
+        self.fret_distance = fret_distance
+        self.pedal_change = pedal_change
+        self.common_string = common_string
+        self.max_fret_jump = max_fret_jump
+
+
+class VoiceLeadingPathFinder:
+    """Find the sequence of voicings of a chord progression with the lowest voice leading cost
+
+    Voicings of each chord are a layer of a graph, with an edge between each voicing and each voicing of the next chord.
+    Paths are found by dynamic programming over the layers (Viterbi): each transition is a (voicing, next voicing) cost matrix
+    and the best path to each voicing only depends on best paths to the previous layer, so the cost is linear in the number of chords
+    instead of exponential in the cross product of voicings. A beam width prunes each layer to its best partial paths.
+    """
+
+    chord_generator: ChordGenerator
+    cost: VoiceLeadingCost
+    beam_width: Optional[int] = None  # keep only this number of best partial paths per chord, exact search when None
+    _layers: dict[ProgressionChord, tuple[list[Voicing], VoicingStore]] = {}  # voicings of chords already used
+
+    def __init__(self, chord_generator: ChordGenerator, cost: Optional[VoiceLeadingCost] = None, beam_width: Optional[int] = None):
+        self.chord_generator = chord_generator
+        self.cost = cost if cost is not None else VoiceLeadingCost()
+        self.beam_width = beam_width
+        self._layers = {}
+
+    def find_path(self, progression: list[ProgressionChord], **filters) -> tuple[list[Voicing], float]:
+        """Find voicings of each chord of a progression with the lowest total transition cost
+
+        Args:
+            progression (list[ProgressionChord]): chords as (key, chord type)
+            filters: predicates of VoicingStore.get_mask applied to voicings of each chord, like min_nb_notes=4
+
+        Returns:
+            list[Voicing]: a voicing per chord
+            float: total cost of the path
+        """
+        if not progression:
+            return [], 0.0
+
+        layers = [self._get_layer(chord, filters) for chord in progression]
+        if any(len(voicings) == 0 for voicings, _ in layers):
+            raise ValueError("No voicing for chord of progression!")
+
+        # best cost of a path ending at each voicing of current layer, and index of previous voicing on this path
+        best_costs = np.zeros(len(layers[0][0]))
+        alive = self._prune(best_costs)
+        backpointers: list[np.ndarray] = []
+        for (_, previous_store), (_, store) in zip(layers, layers[1:]):
+            costs = best_costs[alive, None] + self.get_transition_costs(previous_store.take(alive), store)
+            best_rows = costs.argmin(axis=0)
+            best_costs = costs[best_rows, np.arange(costs.shape[1])]
+            backpointers.append(alive[best_rows])
+            alive = self._prune(best_costs)
+            if len(alive) == 0:
+                raise ValueError("No voice leading path!")
+
+        i_voicing = int(alive[best_costs[alive].argmin()])
+        total_cost = float(best_costs[i_voicing])
+        path = [i_voicing]
+        for rows in reversed(backpointers):
+            i_voicing = int(rows[i_voicing])
+            path.append(i_voicing)
+        path.reverse()
+
+        return [voicings[i] for (voicings, _), i in zip(layers, path)], total_cost
+
+    def get_transition_costs(self, store: VoicingStore, next_store: VoicingStore) -> np.ndarray:
+        """Cost of moving from each voicing of a store to each voicing of next store, with shape (voicing, next voicing)"""
+        fret_distances = np.abs(store.min_frets[:, None].astype(np.int64) - next_store.min_frets[None, :])
+        pedal_changes = count_bits(store.pedal_masks[:, None] ^ next_store.pedal_masks[None, :])
+        common_strings = count_bits(store.played_strings_masks[:, None] & next_store.played_strings_masks[None, :])
+        costs = self.cost.fret_distance * fret_distances + self.cost.pedal_change * pedal_changes - self.cost.common_string * common_strings
+        if self.cost.max_fret_jump is not None:
+            costs[fret_distances > self.cost.max_fret_jump] = np.inf
+
+        return costs
+
+    def _prune(self, best_costs: np.ndarray) -> np.ndarray:
+        """Indices of voicings whose best partial path is kept for next layer"""
+        alive = np.flatnonzero(np.isfinite(best_costs))
+        if self.beam_width is not None and len(alive) > self.beam_width:
+            alive = np.sort(alive[np.argpartition(best_costs[alive], self.beam_width - 1)[:self.beam_width]])
+
+        return alive
+
+    def _get_layer(self, chord: ProgressionChord, filters: dict) -> tuple[list[Voicing], VoicingStore]:
+        if chord not in self._layers:
+            key, chord_type = chord
+            if chord_type not in CHORD_FORMULAS:
+                raise ValueError("Invalid chord type!")
+            voicings = self.chord_generator.generate_voicings(CHORD_FORMULAS[chord_type], key)
+            self._layers[chord] = (voicings, VoicingStore.init_from_voicings(voicings, len(self.chord_generator.fretboard.tuning)))
+
+        voicings, store = self._layers[chord]
+        if not filters:
+            return voicings, store
+        indices = np.flatnonzero(store.get_mask(**filters))
+
+        return [voicings[i] for i in indices], store.take(indices)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from fretboard.chords import Voicing, MUTED_FRET
+from fretboard.metrics import metrics
+
+
+class VoicingDominanceIndex:
+    """Index to find voicings that are part of another voicing (see Voicing.is_part_of_other_voicing) without comparing all pairs
+
+    Voicings are bucketed by fret, pedal set and played strings mask: a voicing can only be part of voicings
+    sharing its fret on its first played string, with a superset of its pedals and of its played strings.
+    Identical voicings are part of each other, only the first one is kept.
+    """
+
+    voicings: list[Voicing] = []
+    _buckets: dict[int | None, dict[int, dict[int, list[int]]]] = {}  # fret -> pedal mask -> played strings mask -> voicing indices
+    _pedal_masks: list[int] = []  # (voicing index) -> pedal mask
+    _pedal_supersets: dict[int, list[int]] = {}  # pedal mask -> indexed pedal masks containing it
+
+    def __init__(self, voicings: list[Voicing]):
+        self.voicings = voicings
+        self._buckets = {}
+        self._pedal_masks = []
+        self._pedal_supersets = {}
+
+        for i, voicing in enumerate(voicings):
+            pedal_mask = voicing.pedal_mask
+            played_strings_mask = VoicingDominanceIndex.get_played_strings_mask(voicing)
+            self._pedal_masks.append(pedal_mask)
+
+            # index under each fret played, muted voicings under None
+            frets = set(fret for fret in voicing.frets if fret != MUTED_FRET) or {None}
+            for fret in frets:
+                self._buckets.setdefault(fret, {}).setdefault(pedal_mask, {}).setdefault(played_strings_mask, []).append(i)
+
+    @staticmethod
+    def get_played_strings_mask(voicing: Voicing) -> int:
+        mask = 0
+        for i, fret in enumerate(voicing.frets):
+            if fret != MUTED_FRET:
+                mask |= 1 << i
+
+        return mask
+
+    def is_dominated(self, i: int) -> bool:
+        """Returns true if voicing at given index is part of another indexed voicing"""
+        voicing = self.voicings[i]
+        pedal_mask = self._pedal_masks[i]
+        played_strings_mask = VoicingDominanceIndex.get_played_strings_mask(voicing)
+        played_notes = [(i_string, fret) for i_string, fret in enumerate(voicing.frets) if fret != MUTED_FRET]
+
+        # a voicing without notes is part of any voicing with more pedals
+        frets = [played_notes[0][1]] if played_notes else list(self._buckets.keys())
+
+        for fret in frets:
+            buckets = self._buckets.get(fret, {})
+            for other_pedal_mask in self._get_pedal_supersets(pedal_mask):
+                for other_played_strings_mask, indices in buckets.get(other_pedal_mask, {}).items():
+                    if other_played_strings_mask & played_strings_mask != played_strings_mask:
+                        continue
+
+                    for j in indices:
+                        if j == i:
+                            continue
+                        other = self.voicings[j]
+                        if any(other.frets[i_string] != fret for i_string, fret in played_notes):
+                            continue
+                        # keep first of identical voicings
+                        if j > i and other_pedal_mask == pedal_mask and other.frets == voicing.frets:
+                            continue
+
+                        return True
+
+        return False
+
+    def _get_pedal_supersets(self, pedal_mask: int) -> list[int]:
+        if pedal_mask not in self._pedal_supersets:
+            indexed_pedal_masks = set(self._pedal_masks)
+            self._pedal_supersets[pedal_mask] = [mask for mask in indexed_pedal_masks if mask & pedal_mask == pedal_mask]
+
+        return self._pedal_supersets[pedal_mask]
+
+
+def filter_dominated_voicings(voicings: list[Voicing], min_nb_notes: int = 0) -> list[Voicing]:
+    """Return voicings that are not part of another voicing and have at least min_nb_notes notes, in the same order"""
+    with metrics.timer("generation_stage_seconds", stage="subset_filter"):
+        index = VoicingDominanceIndex(voicings)
+        kept = [voicing for i, voicing in enumerate(voicings) if voicing.get_number_of_notes() >= min_nb_notes and not index.is_dominated(i)]
+
+    if metrics.enabled:
+        nb_sparse = sum(voicing.get_number_of_notes() < min_nb_notes for voicing in voicings)
+        metrics.increment("generation_pruned", nb_sparse, reason="too_few_notes")
+        metrics.increment("generation_pruned", len(voicings) - nb_sparse - len(kept), reason="subset")
+
+    return kept
@@ -0,0 +1,140 @@
+"""Compact binary voicing library: chords with their voicings (like curated E9 chord libraries), read as a stream
+
+File layout (little endian):
+    header: magic, version, number of strings, number of pedals, number of chords
+    pedals: pedal names, one fixed size record per pedal
+    chords: for each chord, a header (name, key, number of voicings) followed by its voicings
+    voicing: fixed size record with frets packed as nibbles (two strings per byte, first string in low nibble, 0xF for muted strings),
+        then pedal bitmask
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from fretboard.chords import Chord, Voicing, MUTED_FRET, get_pedal_mask
+from fretboard.notes_utils import convert_int_note_to_str, convert_str_note_to_int
+from fretboard.pedal import E9_PEDAL_CHANGES
+
+LIBRARY_MAGIC: bytes = b"FBVOICES"
+LIBRARY_VERSION: int = 1
+MAX_NB_PEDALS: int = 32  # pedal combinations are stored as uint32 bitmasks
+MUTED_NIBBLE: int = 0xF
+MAX_FRET: int = 14
+
+_HEADER = struct.Struct("<8sHBBI")  # magic, version, number of strings, number of pedals, number of chords
+_PEDAL = struct.Struct("<8s")
+_CHORD = struct.Struct("<16sBI")  # chord type, key, number of voicings
+
+# frets of the two strings of a packed byte, and number of played strings of a packed byte
+_UNPACKED_BYTES: list[tuple[Optional[int], Optional[int]]] = [(low if low != MUTED_NIBBLE else None, high if high != MUTED_NIBBLE else None) for high in range(16) for low in range(16)]
+_NB_NOTES_OF_BYTES: list[int] = [(low != MUTED_NIBBLE) + (high != MUTED_NIBBLE) for high in range(16) for low in range(16)]
+_FRETS_OF_BYTES: list[bytes] = [bytes(fret if fret is not None else MUTED_FRET for fret in frets) for frets in _UNPACKED_BYTES]  # as Voicing.frets
+
+
+def _encode_name(name: str, size: int) -> bytes:
+    encoded = name.encode("utf-8")
+    if len(encoded) > size:
+        raise ValueError(f"Name too long for voicing library: {name}")
+    return encoded
+
+
+def _get_voicing_struct(nb_strings: int) -> struct.Struct:
+    return struct.Struct(f"<{(nb_strings + 1) // 2}sI")
+
+
+def pack_frets(notes: list[Optional[int]]) -> bytes:
+    """Pack frets of a voicing as nibbles, two strings per byte"""
+    packed = 0
+    for i_string, note in enumerate(notes):
+        if note is not None and not 0 <= note <= MAX_FRET:
+            raise ValueError("Invalid fret for voicing library!")
+        packed |= (note if note is not None else MUTED_NIBBLE) << (4 * i_string)
+    if len(notes) % 2:
+        packed |= MUTED_NIBBLE << (4 * len(notes))
+
+    return packed.to_bytes((len(notes) + 1) // 2, "little")
+
+
+def unpack_frets(packed: bytes, nb_strings: int) -> list[Optional[int]]:
+    return [fret for byte in packed for fret in _UNPACKED_BYTES[byte]][:nb_strings]
+
+
+def write_voicing_library(filepath: Path, chords: list[Chord], nb_strings: int) -> None:
+    """Write chords and their voicings to a library file, written atomically
+
+    Pedals are stored as bitmasks against the pedal table of the library: E9 pedals first in copedent order, then other pedals by first use.
+    Pedals of voicings read back are in this order.
+    """
+    pedal_names = [pedal for pedal in E9_PEDAL_CHANGES.keys() if any(pedal in voicing.pedals for chord in chords for voicing in chord.voicings)]
+    for chord in chords:
+        for voicing in chord.voicings:
+            if len(voicing.notes) != nb_strings:
+                raise ValueError("Voicing and tuning do not match!")
+            pedal_names += [pedal for pedal in voicing.pedals if pedal not in pedal_names]
+    if len(pedal_names) > MAX_NB_PEDALS:
+        raise ValueError("Too many pedals for voicing library!")
+    pedal_bits = {pedal: 1 << i for i, pedal in enumerate(pedal_names)}
+    voicing_struct = _get_voicing_struct(nb_strings)
+
+    data = bytearray(_HEADER.pack(LIBRARY_MAGIC, LIBRARY_VERSION, nb_strings, len(pedal_names), len(chords)))
+    for pedal in pedal_names:
+        data += _PEDAL.pack(_encode_name(pedal, _PEDAL.size))
+    for chord in chords:
+        data += _CHORD.pack(_encode_name(chord.type, 16), convert_str_note_to_int(chord.key), len(chord.voicings))
+        for voicing in chord.voicings:
+            pedal_mask = 0
+            for pedal in voicing.pedals:
+                pedal_mask |= pedal_bits[pedal]
+            data += voicing_struct.pack(pack_frets(voicing.notes), pedal_mask)
+
+    tmp_filepath = filepath.with_name(filepath.name + ".tmp")
+    with open(tmp_filepath, "wb") as file:
+        file.write(data)
+    os.replace(tmp_filepath, filepath)
+
+
+def iter_voicing_library(filepath: Path, chord_types: Optional[list[str]] = None, min_nb_notes: int = 0) -> Iterator[Chord]:
+    """Read chords of a library file one at a time, voicings are filtered before being decoded
+
+    Args:
+        filepath (Path): library file
+        chord_types (Optional[list[str]]): only these chords are read, other chords are skipped without being read
+        min_nb_notes (int): voicings with less notes are skipped
+    """
+    with open(filepath, "rb") as file:
+        nb_strings, pedal_names, nb_chords = _read_header(file)
+        voicing_struct = _get_voicing_struct(nb_strings)
+
+        # pedal bitmasks of the library -> pedal bitmasks of voicings (see get_pedal_mask)
+        voicing_pedal_masks: dict[int, int] = {}
+
+        for _ in range(nb_chords):
+            chord_type, key_as_int, nb_voicings = _CHORD.unpack(file.read(_CHORD.size))
+            chord_type = chord_type.rstrip(b"\0").decode("utf-8")
+            if chord_types is not None and chord_type not in chord_types:
+                file.seek(nb_voicings * voicing_struct.size, os.SEEK_CUR)
+                continue
+
+            chord = Chord(key=convert_int_note_to_str(key_as_int), type=chord_type)
+            for packed, pedal_mask in voicing_struct.iter_unpack(file.read(nb_voicings * voicing_struct.size)):
+                if min_nb_notes and sum(_NB_NOTES_OF_BYTES[byte] for byte in packed) < min_nb_notes:
+                    continue
+                if pedal_mask not in voicing_pedal_masks:
+                    voicing_pedal_masks[pedal_mask] = get_pedal_mask(pedal for i, pedal in enumerate(pedal_names) if pedal_mask >> i & 1)
+                chord.voicings.append(Voicing.init_from_packed(b"".join([_FRETS_OF_BYTES[byte] for byte in packed])[:nb_strings], voicing_pedal_masks[pedal_mask]))
+
+            yield chord
+
+
+def _read_header(file: BinaryIO) -> tuple[int, list[str], int]:
+    magic, version, nb_strings, nb_pedals, nb_chords = _HEADER.unpack(file.read(_HEADER.size))
+    if magic != LIBRARY_MAGIC or version != LIBRARY_VERSION:
+        raise ValueError("Invalid voicing library file!")
+    pedal_names = [name.rstrip(b"\0").decode("utf-8") for (name,) in _PEDAL.iter_unpack(file.read(nb_pedals * _PEDAL.size))]
+
+    return nb_strings, pedal_names, nb_chords
+
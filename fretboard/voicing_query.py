@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from typing import Hashable, Optional
+
+import numpy as np
+
+from fretboard.chords import Chord, Voicing, MUTED_FRET, find_pedal_mask
+from fretboard.notes_utils import convert_str_interval_to_int, convert_str_note_to_int
+from fretboard.pedal import Pedal
+from fretboard.voicing_store import VoicingStore
+
+# key, chord type, voicing
+VoicingMatch = tuple[str, str, Voicing]
+
+
+class VoicingQueryIndex:
+    """Search voicings of several chords with inverted indexes: each index maps a value (a fret, a pedal, a top interval...)
+    to the bitmap of voicings having it, so conjunctive queries are a few array ANDs
+
+    Strings are numbered as in the tuning: the bass string is the first played string and the top (melody) string the last one.
+    """
+
+    tuning: list[int] = []
+    pedals: Optional[list[Pedal]] = None  # pedals of the copedent, E9 pedals by default (see Voicing.get_intervals)
+    matches: list[VoicingMatch] = []
+    positions: np.ndarray  # lowest played fret of each voicing, -1 when no string is played
+    _indexes: dict[str, dict[Hashable, np.ndarray]] = {}  # index name -> value -> bitmap of voicings
+
+    def __init__(self, chords: list[Chord], tuning: list[int], pedals: Optional[list[Pedal]] = None):
+        self.tuning = tuning
+        self.pedals = pedals
+        self.matches = [(chord.key, chord.type, voicing) for chord in chords for voicing in chord.voicings]
+
+        voicings = [voicing for _, _, voicing in self.matches]
+        store = VoicingStore.init_from_voicings(voicings, len(tuning))
+        self.positions = store.min_frets
+
+        # intervals of top and bass strings, -1 when no string is played
+        top_intervals = []
+        bass_intervals = []
+        for key, _, voicing in self.matches:
+            intervals = [interval for interval in voicing.get_intervals(tuning, key, pedals) if interval is not None]
+            top_intervals.append(intervals[-1] if intervals else -1)
+            bass_intervals.append(intervals[0] if intervals else -1)
+
+        columns: dict[str, np.ndarray] = {
+            "key": np.array([convert_str_note_to_int(key) for key, _, _ in self.matches], dtype=np.int16),
+            "chord_type": np.array([chord_type for _, chord_type, _ in self.matches], dtype=object),
+            "pedals": store.pedal_masks,
+            "top_string": store.highest_strings,
+            "top_interval": np.array(top_intervals, dtype=np.int16),
+            "bass_interval": np.array(bass_intervals, dtype=np.int16),
+        }
+        self._indexes = {name: {value: column == value for value in set(column.tolist())} for name, column in columns.items()}
+
+        # multi-valued indexes
+        is_played = store.frets != MUTED_FRET
+        self._indexes["fret"] = {fret: (store.frets == fret).any(axis=1) for fret in set(store.frets[is_played].tolist())}
+        self._indexes["string"] = {string: is_played[:, string] for string in range(len(tuning))}
+        self._indexes["pedal"] = {}
+        for pedal_mask in self._indexes["pedals"]:
+            pedal_bit = 1
+            while pedal_bit <= pedal_mask:
+                if pedal_mask & pedal_bit and pedal_bit not in self._indexes["pedal"]:
+                    self._indexes["pedal"][pedal_bit] = (store.pedal_masks & np.uint64(pedal_bit)) != 0
+                pedal_bit <<= 1
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def query(
+        self,
+        key: Optional[str] = None,
+        chord_type: Optional[str] = None,
+        fret: Optional[int] = None,
+        with_pedals: Optional[list[str]] = None,
+        without_pedals: Optional[list[str]] = None,
+        pedals: Optional[list[str]] = None,
+        strings: Optional[list[int]] = None,
+        top_string: Optional[int] = None,
+        top_interval: Optional[str] = None,
+        bass_interval: Optional[str] = None,
+        near_fret: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list[VoicingMatch]:
+        """Find voicings matching all given criteria, like index.query(near_fret=8, without_pedals=["C"])
+
+        Args:
+            fret (Optional[int]): a string is played at this fret
+            with_pedals, without_pedals (Optional[list[str]]): pedals that must be, or must not be, applied
+            pedals (Optional[list[str]]): exact pedal combination
+            strings (Optional[list[int]]): strings that must be played
+            top_string (Optional[int]): highest played string
+            top_interval, bass_interval (Optional[str]): interval of highest and lowest played strings, like "3"
+            near_fret (Optional[int]): sort voicings by distance from this fret (lowest played fret), else voicings keep their order
+            limit (Optional[int]): max number of voicings returned
+        """
+        # pedal names are looked up without being registered, unknown pedals are applied by no voicing
+        with_pedal_bits = [find_pedal_mask([pedal]) for pedal in with_pedals or []]
+        pedal_mask = find_pedal_mask(pedals) if pedals is not None else None
+        if None in with_pedal_bits or (pedals is not None and pedal_mask is None):
+            return []
+
+        conditions: list[tuple[str, Hashable]] = []
+        if key is not None:
+            conditions.append(("key", convert_str_note_to_int(key)))
+        if chord_type is not None:
+            conditions.append(("chord_type", chord_type))
+        if fret is not None:
+            conditions.append(("fret", fret))
+        conditions += [("pedal", pedal_bit) for pedal_bit in with_pedal_bits]
+        if pedal_mask is not None:
+            conditions.append(("pedals", pedal_mask))
+        conditions += [("string", string) for string in strings or []]
+        if top_string is not None:
+            conditions.append(("top_string", top_string))
+        if top_interval is not None:
+            conditions.append(("top_interval", convert_str_interval_to_int(top_interval)))
+        if bass_interval is not None:
+            conditions.append(("bass_interval", convert_str_interval_to_int(bass_interval)))
+
+        bitmap = np.ones(len(self.matches), dtype=bool)
+        for name, value in conditions:
+            if value not in self._indexes[name]:
+                return []
+            bitmap &= self._indexes[name][value]
+        for pedal in without_pedals or []:
+            pedal_bit = find_pedal_mask([pedal])
+            if pedal_bit is not None and pedal_bit in self._indexes["pedal"]:
+                bitmap &= ~self._indexes["pedal"][pedal_bit]
+
+        indices = np.flatnonzero(bitmap)
+        if near_fret is not None:
+            indices = indices[np.argsort(np.abs(self.positions[indices] - near_fret), kind="stable")]
+        if limit is not None:
+            indices = indices[:limit]
+
+        return [self.matches[i] for i in indices]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from fretboard.chords import Chord, Voicing, MUTED_FRET, find_pedal_mask
+
+
+class VoicingStore:
+    """Voicings of a chord as columns (one array per attribute, one row per voicing), so they can be filtered and sorted
+    with array operations ; voicings are converted back to Voicing objects only by to_voicings"""
+
+    frets: np.ndarray  # (voicing, string) fret numbers, MUTED_FRET for muted strings
+    pedal_masks: np.ndarray  # pedals as bitmask (see Voicing.pedal_mask)
+    played_strings_masks: np.ndarray  # bit i is set when string i is played
+    nb_notes: np.ndarray
+    nb_pedals: np.ndarray
+    lowest_strings: np.ndarray  # index of first played string, -1 when no string is played
+    highest_strings: np.ndarray  # index of last played string, -1 when no string is played
+    min_frets: np.ndarray  # lowest played fret, -1 when no string is played
+    max_frets: np.ndarray  # highest played fret, -1 when no string is played
+
+    def __init__(self, frets: np.ndarray, pedal_masks: np.ndarray):
+        """
+        Args:
+            frets (np.ndarray): fret numbers with shape (voicing, string), MUTED_FRET for muted strings
+            pedal_masks (np.ndarray): pedal bitmask of each voicing
+        """
+        if pedal_masks.dtype.kind != "u" and len(pedal_masks) and (int(pedal_masks.min()) < 0 or int(pedal_masks.max()) >> 64):
+            raise ValueError("Invalid pedal masks, more than 64 bits!")
+
+        self.frets = frets.astype(np.uint8, copy=False)
+        self.pedal_masks = pedal_masks.astype(np.uint64, copy=False)
+
+        nb_strings = self.frets.shape[1]
+        is_played = self.frets != MUTED_FRET
+        has_notes = is_played.any(axis=1)
+        string_bits = np.left_shift(np.uint64(1), np.arange(nb_strings, dtype=np.uint64))
+        self.played_strings_masks = np.bitwise_or.reduce(np.where(is_played, string_bits, np.uint64(0)), axis=1) if nb_strings else np.zeros(len(self.frets), dtype=np.uint64)
+        self.nb_notes = is_played.sum(axis=1)
+        self.nb_pedals = count_bits(self.pedal_masks)
+        self.lowest_strings = np.where(has_notes, is_played.argmax(axis=1), -1)
+        self.highest_strings = np.where(has_notes, nb_strings - 1 - is_played[:, ::-1].argmax(axis=1), -1)
+        self.min_frets = np.where(has_notes, self.frets.min(axis=1, initial=MUTED_FRET).astype(np.int16), -1)
+        self.max_frets = np.where(has_notes, np.where(is_played, self.frets, 0).max(axis=1, initial=0).astype(np.int16), -1)
+
+    @staticmethod
+    def init_from_voicings(voicings: list[Voicing], nb_strings: int = 0) -> VoicingStore:
+        """Store voicings, nb_strings is only needed when there are no voicings"""
+        nb_strings = len(voicings[0].frets) if voicings else nb_strings
+        frets = np.frombuffer(b"".join(voicing.frets for voicing in voicings), dtype=np.uint8).reshape(len(voicings), nb_strings)
+        try:
+            pedal_masks = np.array([voicing.pedal_mask for voicing in voicings], dtype=np.uint64)
+        except OverflowError:
+            raise ValueError("Invalid pedal masks, more than 64 bits!")
+
+        return VoicingStore(frets, pedal_masks)
+
+    @staticmethod
+    def init_from_chord(chord: Chord, nb_strings: int = 0) -> VoicingStore:
+        return VoicingStore.init_from_voicings(chord.voicings, nb_strings)
+
+    def __len__(self) -> int:
+        return len(self.frets)
+
+    def take(self, indices: np.ndarray) -> VoicingStore:
+        """Get store with voicings at given indices (or boolean mask), in this order"""
+        return VoicingStore(self.frets[indices], self.pedal_masks[indices])
+
+    def get_mask(
+        self,
+        min_nb_notes: Optional[int] = None,
+        max_nb_notes: Optional[int] = None,
+        max_nb_pedals: Optional[int] = None,
+        min_fret: Optional[int] = None,
+        max_fret: Optional[int] = None,
+        with_pedals: Optional[list[str]] = None,
+        without_pedals: Optional[list[str]] = None,
+    ) -> np.ndarray:
+        """Get voicings matching all given predicates, as a boolean mask ; played frets must be between min_fret and max_fret"""
+        mask = np.ones(len(self), dtype=bool)
+        if min_nb_notes is not None:
+            mask &= self.nb_notes >= min_nb_notes
+        if max_nb_notes is not None:
+            mask &= self.nb_notes <= max_nb_notes
+        if max_nb_pedals is not None:
+            mask &= self.nb_pedals <= max_nb_pedals
+        if min_fret is not None:
+            mask &= self.min_frets >= min_fret
+        if max_fret is not None:
+            mask &= self.max_frets <= max_fret
+        if with_pedals:
+            # no voicing has an unknown pedal
+            pedal_mask = find_pedal_mask(with_pedals)
+            if pedal_mask is None:
+                mask[:] = False
+            else:
+                mask &= (self.pedal_masks & np.uint64(pedal_mask)) == np.uint64(pedal_mask)
+        if without_pedals:
+            # no voicing has unknown pedals, so only known ones are excluded
+            known_pedals = [pedal for pedal in without_pedals if find_pedal_mask([pedal]) is not None]
+            mask &= (self.pedal_masks & np.uint64(find_pedal_mask(known_pedals))) == 0
+
+        return mask
+
+    def select(self, **predicates) -> VoicingStore:
+        """Get store with voicings matching predicates of get_mask, like store.select(max_nb_pedals=2, min_fret=3, max_fret=8, min_nb_notes=5)"""
+        return self.take(self.get_mask(**predicates))
+
+    def sort_by(self, *columns: str) -> VoicingStore:
+        """Get store sorted by given columns (like "min_frets", "nb_pedals"), first column is the primary key, stable for equal rows"""
+        if not columns or not len(self):
+            return self
+
+        # lexsort uses last key as primary key
+        return self.take(np.lexsort([getattr(self, column) for column in reversed(columns)]))
+
+    def to_voicings(self) -> list[Voicing]:
+        return [Voicing.init_from_packed(frets.tobytes(), int(pedal_mask)) for frets, pedal_mask in zip(self.frets, self.pedal_masks)]
+
+
+def count_bits(values: np.ndarray) -> np.ndarray:
+    """Count set bits of each value of an unsigned integer array, of any shape"""
+    counts = np.zeros(values.shape, dtype=np.int64)
+    values = values.copy()
+    while values.any():
+        counts += (values & values.dtype.type(1)).astype(np.int64)
+        values >>= values.dtype.type(1)
+
+    return counts
@@ -1,12 +1,19 @@
 from math import ceil
 
 from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QComboBox
-from PySide6.QtGui import QPainter, QColor, QPen, QFont
-from PySide6.QtCore import Qt, QRect, QPointF
+from PySide6.QtGui import QPainter, QColor, QPen, QFont, QPixmap, QRadialGradient
+from PySide6.QtCore import Qt, QRect, QPointF, QObject, QRunnable, QThreadPool, Signal
 import sys
+from pathlib import Path
+from typing import Callable, Optional
 
 from fretboard.fretboard import *
-from fretboard.notes_utils import convert_int_note_to_str
+from fretboard.notes_utils import convert_int_note_to_str, convert_str_note_to_int
+from fretboard.chord_atlas import ChordAtlas
+from fretboard.chord_generator import ChordGenerator, CHORD_FORMULAS
+from fretboard.voicing_filter import filter_dominated_voicings
+from fretboard.cache import ResultCache
+from fretboard.copedent import Copedent
 
 # Static objects
 initial_key = "E"
@@ -15,13 +22,193 @@ fretboard = Fretboard.init_as_pedal_steel_e9()
 tuning = fretboard.get_tuning_as_str()
 num_strings = len(tuning)
 
+# chords are read from the atlas built with "python -m fretboard.chord_atlas data/chords.atlas", or generated when missing
+chord_atlas_file = Path("data/chords.atlas")
+chord_atlas = ChordAtlas.open(chord_atlas_file) if chord_atlas_file.exists() else None
+result_cache = ResultCache()
+copedent_hash = Copedent.init_from_fretboard(fretboard).get_hash()
+chord_generator = ChordGenerator(fretboard, vectorized=True, cache=result_cache)
+chord_types: list[str] = list(CHORD_FORMULAS.keys())
+modes: list[str] = list(SCALE_INTERVALS.keys())
 
-def generate_scale(key: str):
-    start_fret = 0
-    end_fret = 12
-    fretboard_data = fretboard.generate_major_scale_as_intervals(key, start_fret, end_fret)
+# what is displayed: key, mode and chord type ("" for scale)
+DisplayRequest = tuple[str, str, str]
 
-    return fretboard_data
+
+def generate_scale(key: str, mode: str = "Major"):
+    # all modes in all keys are generated at once
+    scale_grids = result_cache.get_or_compute((copedent_hash, "scale grids"), lambda: fretboard.generate_scale_grids(modes, 0, 12)[1])
+
+    return scale_grids[modes.index(mode), convert_str_note_to_int(key)].tolist()
+
+
+def get_chord_voicings(key: str, chord_type: str) -> list[Voicing]:
+    if chord_atlas is not None and chord_atlas.has_voicings("E9", key, chord_type):
+        return chord_atlas.get_voicings("E9", key, chord_type)
+
+    return filter_dominated_voicings(chord_generator.generate_voicings(CHORD_FORMULAS[chord_type], key))
+
+
+def generate_chord(key: str, chord_type: str, voicing_nb: int = 0):
+    voicings = get_chord_voicings(key, chord_type)
+    if not voicings:
+        return [[None] * 13 for _ in fretboard.tuning]
+
+    voicing = voicings[voicing_nb % len(voicings)]
+    fretboard_data = fretboard.generate_voicing(voicing)
+    pedals_to_apply = [Pedal.init_from_name(pedal) for pedal in voicing.pedals]
+
+    return fretboard.convert_fretboard_scale_to_intervals(key, fretboard_data, pedals_to_apply)
+
+
+def generate_fretboard_data(request: DisplayRequest):
+    key, mode, chord_type = request
+    if chord_type:
+        return generate_chord(key, chord_type)
+
+    return generate_scale(key, mode)
+
+
+class FretboardDataTask(QRunnable):
+    """Compute fretboard data of a request in a worker thread, skipped when it became stale while waiting in queue (None is emitted
+    so the request is not pending anymore)"""
+
+    def __init__(self, request: DisplayRequest, done: Signal, is_stale: Callable[[DisplayRequest], bool]):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.request = request
+        self.done = done
+        self.is_stale = is_stale
+
+    def run(self):
+        if self.is_stale(self.request):
+            self.done.emit(self.request, None)
+            return
+        self.done.emit(self.request, generate_fretboard_data(self.request))
+
+
+class FretboardDataWorker(QObject):
+    """Compute fretboard data in a thread pool and deliver results of the displayed request with the ready signal.
+    Queued requests are cancelled when another one is displayed, neighbouring keys and other modes are prefetched."""
+
+    ready = Signal(object)  # fretboard data of displayed request
+    _done = Signal(object, object)  # request, fretboard data (None when skipped), emitted from worker threads
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.current: Optional[DisplayRequest] = None
+        self.results: dict[DisplayRequest, object] = {}
+        self.pending: dict[DisplayRequest, FretboardDataTask] = {}
+        self.prefetched: set[DisplayRequest] = set()
+        self._done.connect(self.on_done)
+
+    def request(self, request: DisplayRequest):
+        """Display request, immediately when it was already computed"""
+        self.current = request
+        self.prefetched = set(self.get_neighbours(request))
+
+        # cancel queued tasks that are neither displayed nor prefetched anymore, running tasks still complete and fill the cache
+        for pending_request, task in list(self.pending.items()):
+            if pending_request != request and pending_request not in self.prefetched and self.pool.tryTake(task):
+                del self.pending[pending_request]
+
+        if request in self.results:
+            self.ready.emit(self.results[request])
+        else:
+            self._start(request, priority=1)
+        for neighbour in self.prefetched:
+            self._start(neighbour, priority=0)
+
+    @staticmethod
+    def get_neighbours(request: DisplayRequest) -> list[DisplayRequest]:
+        key, mode, chord_type = request
+        key_index = keys.index(key)
+        neighbours = [(keys[(key_index + step) % 12], mode, chord_type) for step in (1, -1)]
+        if not chord_type:
+            neighbours += [(key, other_mode, chord_type) for other_mode in modes if other_mode != mode]
+
+        return neighbours
+
+    def is_stale(self, request: DisplayRequest) -> bool:
+        return request != self.current and request not in self.prefetched
+
+    def on_done(self, request: DisplayRequest, fretboard_data):
+        self.pending.pop(request, None)
+        if fretboard_data is None:
+            # task was skipped as stale, the request is started again when it is displayed or prefetched
+            if request == self.current or request in self.prefetched:
+                self._start(request, priority=1 if request == self.current else 0)
+            return
+        self.results[request] = fretboard_data
+        if request == self.current:
+            self.ready.emit(fretboard_data)
+
+    def _start(self, request: DisplayRequest, priority: int):
+        if request in self.results or request in self.pending:
+            return
+        self.pending[request] = FretboardDataTask(request, self._done, self.is_stale)
+        self.pool.start(self.pending[request], priority)
+
+
+class NoteSpriteCache:
+    """Notes (shadow, dot and interval label) rendered once into pixmaps by (label, dot radius, device pixel ratio), then drawn with plain blits"""
+
+    _sprites: dict[tuple[str, float, float], QPixmap] = {}
+
+    def __init__(self):
+        self._sprites = {}
+
+    def clear(self):
+        self._sprites.clear()
+
+    def get_sprite(self, label: str, dot_radius: float, ratio: float, shadow_offset: QPointF, font: QFont) -> QPixmap:
+        """Get sprite of a note, centered on the dot. Sprites of other sizes are evicted"""
+        key = (label, dot_radius, ratio)
+        if key not in self._sprites:
+            if any(sprite_key[1:] != key[1:] for sprite_key in self._sprites):
+                self._sprites.clear()
+            self._sprites[key] = self._render_sprite(label, dot_radius, ratio, shadow_offset, font)
+
+        return self._sprites[key]
+
+    @staticmethod
+    def get_sprite_half_size(dot_radius: float, shadow_offset: QPointF) -> float:
+        return 1.5 * dot_radius + max(abs(shadow_offset.x()), abs(shadow_offset.y()))
+
+    @staticmethod
+    def _render_sprite(label: str, dot_radius: float, ratio: float, shadow_offset: QPointF, font: QFont) -> QPixmap:
+        half_size = NoteSpriteCache.get_sprite_half_size(dot_radius, shadow_offset)
+        sprite = QPixmap(ceil(2 * half_size * ratio), ceil(2 * half_size * ratio))
+        sprite.setDevicePixelRatio(ratio)
+        sprite.fill(Qt.GlobalColor.transparent)
+        center = QPointF(half_size, half_size)
+
+        painter = QPainter(sprite)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+
+        # blurred shadow, affordable since it is rendered once
+        shadow_radius = 1.5 * dot_radius
+        gradient = QRadialGradient(center + shadow_offset, shadow_radius)
+        gradient.setColorAt(0, QColor(0, 0, 0, 60))
+        gradient.setColorAt(dot_radius / shadow_radius, QColor(0, 0, 0, 35))
+        gradient.setColorAt(1, QColor(0, 0, 0, 0))
+        painter.setBrush(gradient)
+        painter.drawEllipse(center + shadow_offset, shadow_radius, shadow_radius)
+
+        # dot
+        painter.setBrush(QColor("#fa990f"))
+        painter.drawEllipse(center, dot_radius, dot_radius)
+
+        # str
+        painter.setFont(font)
+        painter.setPen(QPen(QColor("black")))
+        painter.drawText(QPointF(center.x() - 0.5 * dot_radius, center.y() + 0.6 * dot_radius), label)
+        painter.end()
+
+        return sprite
 
 
 class FretboardWidget(QWidget):
@@ -30,24 +217,67 @@ class FretboardWidget(QWidget):
     string_spacing: float = 0
     num_frets: int = 12 + 1  # include zero fret
     fretboard_data = None
+    _background: Optional[QPixmap] = None  # static layer (wood, frets, dots, strings, open notes), rendered once per widget size
+    _note_font: Optional[QFont] = None
+    _note_sprites: NoteSpriteCache = NoteSpriteCache()
 
     def __init__(self, parent=None, num_strings=10):
         super().__init__(parent)
         self.num_strings = num_strings
         self.fretboard_data = generate_scale(initial_key)
+        self._background = None
+        self._note_font = None
+        self._note_sprites = NoteSpriteCache()
+
+    def set_fretboard_data(self, fretboard_data):
+        """Display other notes, only the notes layer is repainted"""
+        self.fretboard_data = fretboard_data
+        self.update()
+
+    def invalidate_layers(self):
+        """Render background layer, note font and note sprites again on next paint, they depend on widget size"""
+        self._background = None
+        self._note_font = None
+        self._note_sprites.clear()
+
+    def resizeEvent(self, event):
+        self.invalidate_layers()
+        super().resizeEvent(event)
 
     def paintEvent(self, event):
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.get_background())
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        self.drawFretboard(painter, tuning)
         self.drawNotes(painter, self.fretboard_data)
 
+    def get_background(self) -> QPixmap:
+        ratio = self.devicePixelRatioF()
+        if self._background is None or self._background.devicePixelRatio() != ratio:
+            self._background = QPixmap(self.size() * ratio)
+            self._background.setDevicePixelRatio(ratio)
+            painter = QPainter(self._background)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            self.drawFretboard(painter, tuning)
+            painter.end()
+
+        return self._background
+
+    def get_note_font(self) -> QFont:
+        if self._note_font is None:
+            self._note_font = QFont("Tahoma", ceil(self.height() * 0.0326))
+            self._note_font.setBold(True)
+
+        return self._note_font
+
     def get_fret_spacing(self) -> float:
         return self.width() / (self.num_frets + 1 - 1)
 
     def get_fret_offset(self) -> float:
         return self.width() / 30
 
+    def get_string_spacing(self) -> float:
+        return 1.08 * self.height() / (self.num_strings + 1)
+
     def drawFretboard(self, painter, tuning: list[str]):
         # Draw fretboard
         painter.fillRect(self.rect(), QColor("#a57a39"))
@@ -91,7 +321,7 @@ class FretboardWidget(QWidget):
         painter.drawEllipse(QPointF(x, 2 * height / 3), dotRadius, dotRadius)
 
         # Draw strings
-        self.string_spacing = 1.08 * height / (self.num_strings + 1)
+        self.string_spacing = self.get_string_spacing()
         string_penWidth = width / 400
         pen1 = QPen(QColor("#c8bb93"), string_penWidth)
         pen2 = QPen(QColor("#958963"), string_penWidth * 0.2)
@@ -128,36 +358,20 @@ class FretboardWidget(QWidget):
         height = self.height()
         shadow_offset = QPointF(width * 0.0005, height * 0.005)
         dotRadius = width / 80
-        fontSize: int = ceil(height * 0.0326)
+        ratio = self.devicePixelRatioF()
+        string_spacing = self.get_string_spacing()
+        fret_spacing = self.get_fret_spacing()
+        fret_offset = self.get_fret_offset()
+        font = self.get_note_font()
+        half_size = NoteSpriteCache.get_sprite_half_size(dotRadius, shadow_offset)
 
         for string_i, string_data in enumerate(reversed(fretboard_data)):
             for note_i, string_note in enumerate(string_data):
                 if string_note != None:
-                    y = (string_i + 1) * self.string_spacing - 0.04 * height
-                    x = (note_i + 1) * self.get_fret_spacing() - self.get_fret_offset()
-
-                    # draw shadow
-                    # more shadow to fake blur
-                    painter.setPen(Qt.PenStyle.NoPen)
-                    painter.setBrush(QColor(0, 0, 0, 10))
-                    painter.drawEllipse(QPointF(x, y) + shadow_offset, dotRadius * 1.3, dotRadius * 1.3)
-                    painter.setBrush(QColor(0, 0, 0, 10))
-                    painter.drawEllipse(QPointF(x, y) + shadow_offset, dotRadius * 1.15, dotRadius * 1.15)
-                    painter.setBrush(QColor(0, 0, 0, 25))
-                    painter.drawEllipse(QPointF(x, y) + shadow_offset, dotRadius, dotRadius)
-
-                    # dot
-                    painter.setBrush(QColor("#fa990f"))
-                    painter.setPen(Qt.PenStyle.NoPen)
-                    painter.drawEllipse(QPointF(x, y), dotRadius, dotRadius)
-
-                    # str
-                    font = QFont("Tahoma", fontSize)  # 30
-                    font.setBold(True)
-                    painter.setFont(font)
-                    pen = QPen(QColor("black"))
-                    painter.setPen(pen)
-                    painter.drawText(x - 0.5 * dotRadius, y + 0.6 * dotRadius, string_note)
+                    y = (string_i + 1) * string_spacing - 0.04 * height
+                    x = (note_i + 1) * fret_spacing - fret_offset
+                    sprite = self._note_sprites.get_sprite(string_note, dotRadius, ratio, shadow_offset, font)
+                    painter.drawPixmap(QPointF(x - half_size, y - half_size), sprite)
 
         return
 
@@ -200,22 +414,36 @@ class MainWindow(QMainWindow):
         bottom_layout.addWidget(self.dropdown)
 
         self.dropdown2 = QComboBox()
-        self.dropdown2.addItems(["Major", "Pentatonic Major"])
+        self.dropdown2.addItems(modes)
         self.dropdown2.setFixedSize(int(self.width() * 0.25), int(self.height() * 0.05))
         self.dropdown2.setFont(font)
         self.dropdown2.setCurrentIndex(0)
         self.dropdown2.currentIndexChanged.connect(self.on_mode_change)
         bottom_layout.addWidget(self.dropdown2)
 
+        self.dropdown3 = QComboBox()
+        self.dropdown3.addItems(["Scale"] + chord_types)
+        self.dropdown3.setFixedSize(int(self.width() * 0.1), int(self.height() * 0.05))
+        self.dropdown3.setFont(font)
+        self.dropdown3.setCurrentIndex(0)
+        self.dropdown3.currentIndexChanged.connect(lambda index: self.on_key_change(self.dropdown.currentIndex()))
+        bottom_layout.addWidget(self.dropdown3)
+
         main_layout.addWidget(bottom_bar)
 
+        # fretboard data is computed in background
+        self.worker = FretboardDataWorker(self)
+        self.worker.ready.connect(self.fretboard.set_fretboard_data)
+
     def on_key_change(self, key_index: int):
         key = convert_int_note_to_str(key_index, True)
-        self.fretboard.fretboard_data = generate_scale(key)
-        self.update()
+        chord_index = self.dropdown3.currentIndex()
+        chord_type = chord_types[chord_index - 1] if chord_index > 0 else ""
+        self.worker.request((key, modes[self.dropdown2.currentIndex()], chord_type))
         return
 
     def on_mode_change(self):
+        self.on_key_change(self.dropdown.currentIndex())
         return
 
 